@@ -0,0 +1,45 @@
+"""
+Сравнение пропускной способности WSGI- и ASGI-развёртывания бэкенда.
+
+Поочерёдно поднимает gunicorn с синхронными воркерами (foodgram.wsgi) и с
+uvicorn-воркерами (foodgram.asgi, ASYNC_READ_VIEWS=True) при одинаковом
+числе процессов, нагружает одни и те же эндпоинты чтения через httpload и
+печатает сводку в JSON. Настройки БД берутся из окружения.
+
+Пример:
+    python benchmarks/asgi_vs_wsgi.py -w 2 -c 64 -d 20 --think-time 0.05
+"""
+
+import argparse
+import json
+
+from load_test import add_load_arguments, bench
+
+SERVERS = {
+    "wsgi": {"GUNICORN_WORKER_CLASS": "sync", "ASYNC_READ_VIEWS": "False"},
+    "asgi": {"GUNICORN_WORKER_CLASS": "uvicorn", "ASYNC_READ_VIEWS": "True"},
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-w", "--workers", type=int, default=1)
+    parser.add_argument(
+        "--servers", nargs="+", choices=sorted(SERVERS), default=["wsgi", "asgi"]
+    )
+    add_load_arguments(parser)
+    args = parser.parse_args()
+
+    report = {
+        name: bench({**SERVERS[name], "GUNICORN_WORKERS": str(args.workers)}, args)
+        for name in args.servers
+    }
+    if "wsgi" in report and "asgi" in report and report["wsgi"]["throughput_rps"]:
+        report["asgi_to_wsgi_throughput"] = round(
+            report["asgi"]["throughput_rps"] / report["wsgi"]["throughput_rps"], 2
+        )
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
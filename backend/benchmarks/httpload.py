@@ -0,0 +1,126 @@
+"""
+Простой генератор HTTP-нагрузки без внешних зависимостей.
+
+Каждый из `concurrency` потоков держит своё keep-alive соединение и
+последовательно запрашивает URL-ы по кругу в течение `duration` секунд.
+Параметр `think_time` имитирует медленного клиента: пауза перед каждым
+запросом при открытом соединении.
+
+Пример:
+    python benchmarks/httpload.py http://127.0.0.1:8000/api/recipes/ \
+        -c 50 -d 15 --token <token>
+"""
+
+import argparse
+import http.client
+import json
+import statistics
+import threading
+import time
+from urllib.parse import quote, urlsplit
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def worker(urls, deadline, headers, think_time, results, lock):
+    parts = urlsplit(urls[0])
+    connection = http.client.HTTPConnection(parts.hostname, parts.port or 80)
+    latencies, errors, statuses = [], 0, {}
+    step = 0
+    while time.monotonic() < deadline:
+        if think_time:
+            time.sleep(think_time)
+        url = urlsplit(urls[step % len(urls)])
+        step += 1
+        path = quote(url.path + (f"?{url.query}" if url.query else ""), safe="/?&=")
+        started = time.perf_counter()
+        try:
+            connection.request("GET", path, headers=headers)
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            connection.close()
+            connection = http.client.HTTPConnection(parts.hostname, parts.port or 80)
+            continue
+        latencies.append(time.perf_counter() - started)
+        statuses[response.status] = statuses.get(response.status, 0) + 1
+    connection.close()
+    with lock:
+        results["latencies"].extend(latencies)
+        results["errors"] += errors
+        for code, count in statuses.items():
+            results["statuses"][code] = results["statuses"].get(code, 0) + count
+
+
+def run(urls, concurrency=10, duration=10.0, token=None, think_time=0.0):
+    """Нагружает URL-ы и возвращает сводку: RPS, перцентили задержки, ошибки."""
+    headers = {"Accept": "application/json"}
+    if token:
+        headers["Authorization"] = f"Token {token}"
+    results = {"latencies": [], "errors": 0, "statuses": {}}
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+    threads = [
+        threading.Thread(
+            target=worker,
+            args=(urls, deadline, headers, think_time, results, lock),
+            daemon=True,
+        )
+        for _ in range(concurrency)
+    ]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    latencies = results["latencies"]
+    return {
+        "requests": len(latencies),
+        "errors": results["errors"],
+        "statuses": {str(code): n for code, n in sorted(results["statuses"].items())},
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0,
+        "latency_ms": latency_summary(latencies),
+    }
+
+
+def latency_summary(latencies):
+    """Среднее и перцентили задержки в миллисекундах."""
+    if not latencies:
+        return {"mean": None, "p50": None, "p95": None, "p99": None}
+    return {
+        "mean": round(statistics.fmean(latencies) * 1000, 2),
+        "p50": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99": round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("urls", nargs="+")
+    parser.add_argument("-c", "--concurrency", type=int, default=10)
+    parser.add_argument("-d", "--duration", type=float, default=10.0)
+    parser.add_argument("--token", help="Токен авторизации DRF")
+    parser.add_argument(
+        "--think-time",
+        type=float,
+        default=0.0,
+        help="Пауза клиента перед запросом, сек (медленные клиенты)",
+    )
+    args = parser.parse_args()
+    summary = run(
+        args.urls, args.concurrency, args.duration, args.token, args.think_time
+    )
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Локальный нагрузочный тест конфигураций gunicorn.conf.py.
+
+Для каждого профиля поднимает `gunicorn -c gunicorn.conf.py` с указанными
+переменными GUNICORN_* (имя профиля — класс воркеров), прогревает его и
+нагружает эндпоинты через httpload. Настройки БД берутся из окружения.
+
+Пример:
+    python benchmarks/load_test.py \
+        sync:WORKERS=4 gthread:WORKERS=2,THREADS=8 uvicorn:WORKERS=2 \
+        -c 64 -d 20
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpload
+
+APP_DIR = Path(__file__).resolve().parent.parent / "foodgram"
+
+DEFAULT_PATHS = (
+    "/api/recipes/",
+    "/api/recipes/?limit=6&offset=6",
+    "/api/ingredients/?name=а",
+)
+
+
+def wait_for_port(host, port, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket() as sock:
+            if sock.connect_ex((host, port)) == 0:
+                return
+        time.sleep(0.2)
+    raise RuntimeError(f"Сервер не поднялся на {host}:{port} за {timeout} с")
+
+
+@contextlib.contextmanager
+def gunicorn_server(env, host, port):
+    """Запускает gunicorn с gunicorn.conf.py и переменными `env`."""
+    command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"]
+    env = {
+        **os.environ,
+        "GUNICORN_BIND": f"{host}:{port}",
+        "GUNICORN_LOG_LEVEL": "warning",
+        **env,
+    }
+    process = subprocess.Popen(command, cwd=APP_DIR, env=env)
+    try:
+        wait_for_port(host, port)
+        yield process
+    finally:
+        process.terminate()
+        process.wait(timeout=60)
+
+
+def parse_profile(spec):
+    """«gthread:WORKERS=2,THREADS=8» -> ("gthread:…", {GUNICORN_*: …})."""
+    worker_class, _, options = spec.partition(":")
+    env = {"GUNICORN_WORKER_CLASS": worker_class}
+    for option in filter(None, options.split(",")):
+        key, _, value = option.partition("=")
+        env[f"GUNICORN_{key.upper()}"] = value
+    return spec, env
+
+
+def bench(env, args):
+    urls = [f"http://{args.host}:{args.port}{path}" for path in args.paths]
+    with gunicorn_server(env, args.host, args.port):
+        httpload.run(urls, concurrency=args.concurrency, duration=1, token=args.token)
+        return httpload.run(
+            urls,
+            concurrency=args.concurrency,
+            duration=args.duration,
+            token=args.token,
+            think_time=args.think_time,
+        )
+
+
+def add_load_arguments(parser):
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("-c", "--concurrency", type=int, default=32)
+    parser.add_argument("-d", "--duration", type=float, default=15.0)
+    parser.add_argument("--think-time", type=float, default=0.0)
+    parser.add_argument("--token", help="Токен авторизации DRF")
+    parser.add_argument("--paths", nargs="+", default=list(DEFAULT_PATHS))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "profiles",
+        nargs="*",
+        default=["sync", "gthread", "uvicorn"],
+        help="Профили вида <класс воркеров>[:КЛЮЧ=значение,...]",
+    )
+    add_load_arguments(parser)
+    args = parser.parse_args()
+
+    report = {}
+    for spec in args.profiles:
+        name, env = parse_profile(spec)
+        report[name] = {"env": env, **bench(env, args)}
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
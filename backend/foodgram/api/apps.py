@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.backends.signals import connection_created
 
 
 class ApiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "api"
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        if settings.REQUEST_METRICS:
+            from .metrics import install_execute_wrapper
+
+            connection_created.connect(install_execute_wrapper)
@@ -0,0 +1,242 @@
+"""
+Асинхронные варианты «горячих» эндпоинтов чтения.
+
+Подключаются в api/urls.py при ASYNC_READ_VIEWS=True и рассчитаны на запуск
+под ASGI-сервером (uvicorn), где один воркер обслуживает много медленных
+клиентов одновременно. Формат ответов совпадает с DRF-вьюсетами,
+запросы с изменением данных передаются в синхронные вьюсеты.
+"""
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.utils.translation import gettext as _
+from django.views.decorators.csrf import csrf_exempt
+from recipes.models import Ingredient, Recipe
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import (
+    AuthenticationFailed,
+    NotFound,
+    ParseError,
+)
+from rest_framework.request import Request
+
+from .catalog import acatalog_response, catalog
+from .etags import arecipe_etag, etag_matches, not_modified
+from .fast_serializers import RECIPE_FIELDS, aserialize_recipes, recipe_rows
+from .fieldsets import requested_fields
+from .pagination import PageLimitPagination
+from .renderers import FastJSONRenderer
+from .views import IngredientViewSet, RecipeViewSet, UserViewSet
+
+User = get_user_model()
+
+SAFE_ASYNC_METHODS = ("GET",)
+# Параметры, которые recipe_queryset повторяет сам; с остальными фильтрами
+# RecipeFilter запрос уходит в синхронный вьюсет.
+ASYNC_LIST_PARAMS = frozenset(
+    (
+        "author",
+        "search",
+        "is_favorited",
+        "is_in_shopping_cart",
+        "limit",
+        "offset",
+        "page",
+        "fields",
+        "omit",
+    )
+)
+
+# Значения флагов is_favorited/is_in_shopping_cart, как у BooleanFilter.
+TRUE_VALUES = frozenset(("1", "true"))
+
+recipe_list_fallback = RecipeViewSet.as_view(
+    {"get": "list", "post": "create"}, basename="recipes", detail=False
+)
+recipe_detail_fallback = RecipeViewSet.as_view(
+    {
+        "get": "retrieve",
+        "put": "update",
+        "patch": "partial_update",
+        "delete": "destroy",
+    },
+    basename="recipes",
+    detail=True,
+)
+ingredient_list_fallback = IngredientViewSet.as_view(
+    {"get": "list"}, basename="ingredients", detail=False
+)
+user_me_fallback = UserViewSet.as_view({"get": "me"}, basename="users", detail=False)
+
+
+def json_response(data, status=200):
+    return HttpResponse(
+        FastJSONRenderer().render(data), content_type="application/json", status=status
+    )
+
+
+def image_url(file, request):
+    if not file:
+        return None
+    return request.build_absolute_uri(file.url)
+
+
+def auth_error_response(error):
+    """Ответ 401 как у DRF: тот же текст и заголовок WWW-Authenticate."""
+    response = json_response({"detail": error.detail}, status=error.status_code)
+    response["WWW-Authenticate"] = "Token"
+    return response
+
+
+async def aget_user(request):
+    """
+    Пользователь по заголовку «Authorization: Token <key>» или None без
+    заголовка. Неверный токен и токен неактивного пользователя — ошибка
+    AuthenticationFailed, как в TokenAuthentication.
+    """
+    header = request.headers.get("Authorization", "").split()
+    if not header or header[0].lower() != "token":
+        return None
+    if len(header) == 1:
+        raise AuthenticationFailed(_("Invalid token header. No credentials provided."))
+    if len(header) > 2:
+        raise AuthenticationFailed(
+            _("Invalid token header. Token string should not contain spaces.")
+        )
+    try:
+        token = await Token.objects.select_related("user").aget(key=header[1])
+    except Token.DoesNotExist:
+        raise AuthenticationFailed(_("Invalid token."))
+    if not token.user.is_active:
+        raise AuthenticationFailed(_("User inactive or deleted."))
+    return token.user
+
+
+async def auser_payload(user, request):
+    return {
+        "id": user.id,
+        "email": user.email,
+        "username": user.username,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "is_subscribed": await user.subscriptions.filter(author=user).aexists(),
+        "avatar": image_url(user.avatar, request),
+    }
+
+
+def recipe_queryset(user, params, fields=RECIPE_FIELDS):
+    """Повторяет RecipeViewSet.get_queryset и фильтры list: values()-строки."""
+    queryset = Recipe.objects.all()
+    author = params.get("author")
+    if author:
+        queryset = queryset.filter(author_id=author)
+    search = params.get("search")
+    if search:
+        queryset = queryset.filter(ingredients__name__icontains=search).distinct()
+    if user is not None:
+        if params.get("is_favorited", "").lower() in TRUE_VALUES:
+            queryset = queryset.filter(favorited_by__user=user)
+        if params.get("is_in_shopping_cart", "").lower() in TRUE_VALUES:
+            queryset = queryset.filter(in_shopping_carts__user=user)
+    return recipe_rows(queryset, fields)
+
+
+def sparse_fields(request):
+    """Поля ?fields=/?omit= или None, если их разбор вернёт ошибку."""
+    try:
+        return requested_fields(request.GET, RECIPE_FIELDS)
+    except ParseError:
+        return None
+
+
+@csrf_exempt
+async def recipe_list(request):
+    if request.method not in SAFE_ASYNC_METHODS:
+        return await sync_to_async(recipe_list_fallback)(request)
+
+    author = request.GET.get("author")
+    fields = sparse_fields(request)
+    if (
+        fields is None
+        or not ASYNC_LIST_PARAMS.issuperset(request.GET)
+        or len(request.GET.getlist("author")) > 1
+        or author
+        and not (author.isdigit() and await User.objects.filter(pk=author).aexists())
+    ):
+        # Сложные фильтры и ошибки их валидации — в синхронном вьюсете
+        return await sync_to_async(recipe_list_fallback)(request)
+
+    try:
+        user = await aget_user(request)
+    except AuthenticationFailed as error:
+        return auth_error_response(error)
+    queryset = recipe_queryset(user, request.GET, fields)
+
+    paginator = PageLimitPagination()
+    try:
+        page = await paginator.apaginate_queryset(queryset, Request(request), user)
+    except NotFound as error:
+        return json_response({"detail": error.detail}, 404)
+
+    results = await aserialize_recipes(page, request, user, fields)
+    return json_response(paginator.get_paginated_data(results))
+
+
+@csrf_exempt
+async def recipe_detail(request, pk):
+    if request.method not in SAFE_ASYNC_METHODS:
+        return await sync_to_async(recipe_detail_fallback)(request, pk=pk)
+
+    fields = sparse_fields(request)
+    if fields is None:
+        return await sync_to_async(recipe_detail_fallback)(request, pk=pk)
+
+    try:
+        user = await aget_user(request)
+    except AuthenticationFailed as error:
+        return auth_error_response(error)
+    etag = await arecipe_etag(request, pk, user)
+    if etag is not None and etag_matches(request, etag):
+        return not_modified(etag)
+    rows = [row async for row in recipe_queryset(user, {}, fields).filter(pk=pk)]
+    if not rows:
+        return json_response({"detail": "No Recipe matches the given query."}, 404)
+    response = json_response((await aserialize_recipes(rows, request, user, fields))[0])
+    if etag is not None:
+        response["ETag"] = etag
+    return response
+
+
+@csrf_exempt
+async def ingredient_list(request):
+    if request.method not in SAFE_ASYNC_METHODS:
+        return await sync_to_async(ingredient_list_fallback)(request)
+
+    name = request.GET.get("name")
+    if not name:
+        return await acatalog_response(request)
+    snapshot = (await catalog.acurrent())[2]
+    if snapshot is not None:
+        return json_response(snapshot.search(name))
+    queryset = Ingredient.objects.values("id", "name", "measurement_unit")
+    queryset = queryset.filter(name__istartswith=name)
+    return json_response([item async for item in queryset])
+
+
+@csrf_exempt
+async def user_me(request):
+    if request.method not in SAFE_ASYNC_METHODS or request.GET:
+        # ?fields=/?omit= — в синхронном вьюсете.
+        return await sync_to_async(user_me_fallback)(request)
+
+    try:
+        user = await aget_user(request)
+    except AuthenticationFailed as error:
+        return auth_error_response(error)
+    if user is None:
+        # Как в UserViewSet.me.
+        return json_response(
+            {"detail": "Учетные данные не были предоставлены."}, status=401
+        )
+    return json_response(await auser_payload(user, request))
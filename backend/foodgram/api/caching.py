@@ -0,0 +1,47 @@
+"""
+Кеш представлений рецептов для ответов API.
+
+В кеше хранится относительный URL картинки: абсолютный адрес зависит от
+хоста запроса и достраивается при отдаче.
+"""
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from recipes.models import Recipe
+
+from .singleflight import cached
+
+RECIPE_SHORT_KEY = "recipe:short:{}"
+RECIPE_SHORT_TIMEOUT = 60 * 60
+
+
+def get_recipe_short(recipe_id):
+    """Краткое представление рецепта (как RecipeShortSerializer) или None."""
+
+    def load():
+        row = (
+            Recipe.objects.filter(pk=recipe_id)
+            .values("id", "name", "image", "cooking_time")
+            .first()
+        )
+        if row is None:
+            return None
+        return {
+            **row,
+            "image": default_storage.url(row["image"]) if row["image"] else None,
+        }
+
+    # Популярный рецепт после истечения или сброса ключа пересчитывает
+    # один поток на кеш (на процесс при LocMemCache), см. api/singleflight.py.
+    return cached(RECIPE_SHORT_KEY.format(recipe_id), load, RECIPE_SHORT_TIMEOUT)
+
+
+def render_recipe_short(recipe_id, request):
+    payload = get_recipe_short(recipe_id)
+    if payload is None or payload["image"] is None:
+        return payload
+    return {**payload, "image": request.build_absolute_uri(payload["image"])}
+
+
+def invalidate_recipe(recipe_id):
+    cache.delete(RECIPE_SHORT_KEY.format(recipe_id))
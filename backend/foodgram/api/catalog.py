@@ -0,0 +1,222 @@
+"""
+Справочник ингредиентов целиком (/api/ingredients/ без ?name=) из памяти.
+
+JSON справочника и его сжатые варианты строятся один раз на версию
+справочника и отдаются готовыми байтами — без запросов к БД, сериализации
+и сжатия на каждый запрос. Версия лежит в кеше и увеличивается при
+изменении ингредиентов (api/signals.py); процесс с пустым кешем берёт её
+из заголовка снимка.
+
+Собранный справочник хранится в файле-снимке (api/snapshot.py), который
+воркеры отображают в память: его пишет процесс, изменивший ингредиенты,
+или команда load_ingredients, а остальные воркеры при смене версии
+подхватывают готовый файл. Из того же снимка отвечают поиск по началу
+названия и карточка ингредиента.
+"""
+
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from recipes.models import Ingredient
+
+from . import invalidation, snapshot
+from .compression import available_encodings, choose_encoding, compress
+from .etags import etag_matches, not_modified
+from .renderers import FastJSONRenderer
+
+VERSION_CACHE_KEY = "catalog:version"
+
+
+def bump_version():
+    """Новая версия — только при изменении справочника."""
+    try:
+        return cache.incr(VERSION_CACHE_KEY)
+    except ValueError:
+        # Начальное значение — время: версия, вытесненная из кеша, не
+        # повторится, и старый ETag не совпадёт с новым справочником.
+        cache.add(VERSION_CACHE_KEY, time.time_ns(), timeout=None)
+        return cache.get(VERSION_CACHE_KEY)
+
+
+def source():
+    """
+    Метка БД для заголовка снимка: файл, собранный из другой базы (например,
+    тестовой), не подхватывается.
+    """
+    db = connection.settings_dict
+    label = f"{connection.vendor}|{db['HOST']}|{db['PORT']}|{db['NAME']}"
+    return hashlib.md5(label.encode()).digest()[:8]
+
+
+def stored_version():
+    """
+    Версия из заголовка снимка для процесса с пустым кешем: он подхватывает
+    уже собранный справочник, а не заводит свою версию и не пересобирает
+    общий файл. Без снимка — новая версия.
+    """
+    if settings.INGREDIENT_SNAPSHOT:
+        found = snapshot.read(settings.INGREDIENT_SNAPSHOT_PATH, source())
+        if found is not None:
+            cache.add(VERSION_CACHE_KEY, found.version, timeout=None)
+            return cache.get(VERSION_CACHE_KEY)
+    return bump_version()
+
+
+def current_version():
+    version = cache.get(VERSION_CACHE_KEY)
+    return stored_version() if version is None else version
+
+
+@invalidation.handler("catalog")
+def adopt_version(version):
+    cache.set(VERSION_CACHE_KEY, version, timeout=None)
+
+
+class IngredientCatalog:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        # (версия, {кодировка или None: тело ответа}, снимок или None)
+        self.state = (None, {}, None)
+
+    def render(self, rows):
+        body = FastJSONRenderer().render(rows)
+        bodies = {None: body}
+        if settings.RESPONSE_COMPRESSION:
+            for encoding in available_encodings():
+                bodies[encoding] = compress(body, encoding)
+        return bodies
+
+    def write(self, version):
+        rows = list(Ingredient.objects.values("id", "name", "measurement_unit"))
+        return snapshot.write(
+            settings.INGREDIENT_SNAPSHOT_PATH,
+            snapshot.pack(version, source(), rows, self.render(rows)),
+        )
+
+    def load(self, version):
+        if not settings.INGREDIENT_SNAPSHOT:
+            rows = list(Ingredient.objects.values("id", "name", "measurement_unit"))
+            return version, self.render(rows), None
+        path = settings.INGREDIENT_SNAPSHOT_PATH
+        found = snapshot.read(path, source())
+        if found is None or found.version != version:
+            # Снимок под новую версию собирает один процесс, остальные
+            # дожидаются его и отображают готовый файл.
+            with snapshot.exclusive(path):
+                found = snapshot.read(path, source())
+                if found is None or found.version != version:
+                    found = self.write(version)
+        return version, found.bodies, found
+
+    def current(self):
+        # Версия читается до справочника: изменение во время сборки
+        # приведёт к пересборке на следующем запросе.
+        version = current_version()
+        state = self.state
+        if state[0] == version:
+            return state
+        # Новую версию загружает один поток, остальные пока отдают
+        # предыдущую (stale-while-revalidate); ждут только без неё.
+        if not self.lock.acquire(blocking=state[0] is None):
+            return state
+        try:
+            if self.state[0] != version:
+                self.state = self.load(version)
+            return self.state
+        finally:
+            self.lock.release()
+
+    async def acurrent(self):
+        state = self.state
+        if state[0] is not None and state[0] == await cache.aget(VERSION_CACHE_KEY):
+            return state
+        return await sync_to_async(self.current)()
+
+    def snapshot(self):
+        """Снимок текущей версии или None, если снимки выключены."""
+        return self.current()[2]
+
+    def refresh(self):
+        """Новая версия после изменения ингредиентов и снимок под неё."""
+        if getattr(self.local, "bulk", False):
+            return
+        version = bump_version()
+        if settings.INGREDIENT_SNAPSHOT:
+            with snapshot.exclusive(settings.INGREDIENT_SNAPSHOT_PATH):
+                found = self.write(version)
+            with self.lock:
+                self.state = (version, found.bodies, found)
+        # Остальные процессы переходят на ту же версию и отображают
+        # записанный здесь снимок.
+        invalidation.publish("catalog", version=version)
+
+    @contextmanager
+    def bulk(self):
+        """Пакетная загрузка: один снимок в конце, а не на каждый ингредиент."""
+        self.local.bulk = True
+        try:
+            yield
+        finally:
+            self.local.bulk = False
+            self.refresh()
+
+
+def negotiate(request):
+    """Кодировка ответа: None — без сжатия."""
+    return choose_encoding(request) if settings.RESPONSE_COMPRESSION else None
+
+
+def catalog_etag(version, encoding):
+    """Сильный ETag: своё значение у каждой версии и каждой кодировки."""
+    return f'"catalog-{version}-{encoding or "identity"}"'
+
+
+def response(state, encoding):
+    version, bodies, _ = state
+    if encoding not in bodies:
+        encoding = None
+    response = HttpResponse(bodies[encoding], content_type="application/json")
+    if encoding is not None:
+        response["Content-Encoding"] = encoding
+    response["ETag"] = catalog_etag(version, encoding)
+    patch_vary_headers(response, ("Accept-Encoding",))
+    return response
+
+
+def not_modified_response(version, encoding, request):
+    """304 на If-None-Match с текущим ETag — без справочника и запросов к БД."""
+    etag = catalog_etag(version, encoding)
+    if not etag_matches(request, etag):
+        return None
+    response = not_modified(etag)
+    patch_vary_headers(response, ("Accept-Encoding",))
+    return response
+
+
+def catalog_response(request):
+    encoding = negotiate(request)
+    return not_modified_response(current_version(), encoding, request) or response(
+        catalog.current(), encoding
+    )
+
+
+async def acatalog_response(request):
+    encoding = negotiate(request)
+    version = await cache.aget(VERSION_CACHE_KEY)
+    if version is not None:
+        cached = not_modified_response(version, encoding, request)
+        if cached is not None:
+            return cached
+    return response(await catalog.acurrent(), encoding)
+
+
+catalog = IngredientCatalog()
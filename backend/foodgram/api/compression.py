@@ -0,0 +1,57 @@
+"""
+Сжатие ответов API: выбор кодировки по Accept-Encoding и сжатие тела.
+
+Кодировки и порядок предпочтения — RESPONSE_COMPRESSION_ENCODINGS; brotli
+используется, только если установлен пакет Brotli.
+"""
+
+import gzip
+
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+
+def available_encodings():
+    return [
+        encoding
+        for encoding in settings.RESPONSE_COMPRESSION_ENCODINGS
+        if encoding == "gzip" or encoding == "br" and brotli is not None
+    ]
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding с ненулевым q."""
+    accepted = set()
+    for item in header.split(","):
+        encoding, _, params = item.strip().partition(";")
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(encoding.strip().lower())
+    return accepted
+
+
+def choose_encoding(request):
+    """Первая поддерживаемая кодировка, которую принимает клиент, или None."""
+    accepted = accepted_encodings(request.headers.get("Accept-Encoding", ""))
+    for encoding in available_encodings():
+        if encoding in accepted or "*" in accepted:
+            return encoding
+    return None
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.RESPONSE_COMPRESSION_BR_QUALITY)
+    # mtime=0: одинаковое тело — одинаковые байты (кеши, ETag).
+    return gzip.compress(
+        body, compresslevel=settings.RESPONSE_COMPRESSION_GZIP_LEVEL, mtime=0
+    )
@@ -0,0 +1,71 @@
+"""
+Условные GET-запросы: сильные ETag и ответ 304 до выборки и сериализации.
+
+ETag карточки рецепта складывается из Recipe.updated_at (одно чтение по
+первичному ключу), пользовательской версии (избранное, корзина, подписки
+— см. api/pagination.py) и параметров запроса. ETag справочника
+ингредиентов — версия справочника и кодировка ответа, без запросов к БД
+(см. api/catalog.py).
+"""
+
+import hashlib
+
+from django.http import HttpResponseNotModified
+from django.utils.http import parse_etags
+from recipes.models import Recipe
+
+from .pagination import acurrent_versions, current_versions
+
+
+def etag_matches(request, etag):
+    """If-None-Match совпадает с etag (слабое сравнение, как требует RFC 9110)."""
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return False
+    candidates = parse_etags(header)
+    if candidates == ["*"]:
+        return True
+    etag = etag.removeprefix("W/")
+    return any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+def not_modified(etag):
+    response = HttpResponseNotModified()
+    response["ETag"] = etag
+    return response
+
+
+def user_id_of(user):
+    return user.id if user is not None and user.is_authenticated else None
+
+
+def make_recipe_etag(recipe_id, updated_at, user_version, query):
+    digest = hashlib.md5(
+        f"{recipe_id}|{updated_at.isoformat()}|{user_version}|{query}".encode()
+    ).hexdigest()
+    return f'"{digest}"'
+
+
+def recipe_updated_at(pk):
+    return Recipe.objects.filter(pk=pk).values_list("updated_at", flat=True)
+
+
+def recipe_etag(request, pk, user):
+    """ETag карточки рецепта или None, если рецепта нет."""
+    if not str(pk).isdigit():
+        return None
+    updated_at = recipe_updated_at(pk).first()
+    if updated_at is None:
+        return None
+    _, user_version = current_versions(user_id_of(user))
+    return make_recipe_etag(pk, updated_at, user_version, request.GET.urlencode())
+
+
+async def arecipe_etag(request, pk, user):
+    if not str(pk).isdigit():
+        return None
+    updated_at = await recipe_updated_at(pk).afirst()
+    if updated_at is None:
+        return None
+    _, user_version = await acurrent_versions(user_id_of(user))
+    return make_recipe_etag(pk, updated_at, user_version, request.GET.urlencode())
@@ -0,0 +1,170 @@
+"""
+Быстрое чтение рецептов: ответ RecipeSerializer из values()-строк.
+
+Рецепты с авторами читаются одним values()-запросом, ингредиенты страницы —
+одним запросом, сгруппированным по рецепту; избранное, корзина и подписки
+пользователя — по запросу на страницу вместо запроса на каждый рецепт.
+Модели и поля DRF не создаются; при ?fields=/?omit= не читаются и
+колонки и связи невыбранных полей. Полный вывод побайтно совпадает с
+RecipeSerializer (проверяется в api/tests.py): при изменении сериализатора
+меняйте и этот модуль.
+
+Запросы собираются отдельно от сборки ответа, чтобы тот же код
+использовали асинхронные вьюхи.
+"""
+
+from django.contrib.auth import get_user_model
+from recipes.models import Favourite, Recipe, RecipeIngredientsRelated, ShoppingList
+from users.models import Subscription
+
+from .metrics import track_serializer
+
+User = get_user_model()
+
+# Поля ответа в порядке RecipeSerializer и колонки values() для каждого.
+RECIPE_FIELDS = (
+    "id",
+    "author",
+    "name",
+    "image",
+    "text",
+    "cooking_time",
+    "ingredients",
+    "is_favorited",
+    "is_in_shopping_cart",
+)
+RECIPE_COLUMNS = {
+    "author": (
+        "author_id",
+        "author__email",
+        "author__username",
+        "author__first_name",
+        "author__last_name",
+        "author__avatar",
+    ),
+    "name": ("name",),
+    "image": ("image",),
+    "text": ("text",),
+    "cooking_time": ("cooking_time",),
+}
+
+recipe_image_storage = Recipe._meta.get_field("image").storage
+avatar_storage = User._meta.get_field("avatar").storage
+
+
+def recipe_rows(queryset, fields=RECIPE_FIELDS):
+    """
+    values()-выборка для serialize_recipes из queryset рецептов: только
+    колонки запрошенных полей, id — всегда (нужен пагинации и связям).
+    """
+    columns = ["id"]
+    for name in fields:
+        columns.extend(RECIPE_COLUMNS.get(name, ()))
+    return queryset.select_related(None).prefetch_related(None).values(*columns)
+
+
+def file_url(storage, name, request):
+    """Как ImageField DRF: абсолютный URL или None без файла."""
+    if not name:
+        return None
+    url = storage.url(name)
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+def related_querysets(rows, user, fields=RECIPE_FIELDS):
+    """Запросы к связанным данным страницы для запрошенных полей."""
+    recipe_ids = [row["id"] for row in rows]
+    querysets = {}
+    if "ingredients" in fields:
+        querysets["ingredients"] = (
+            RecipeIngredientsRelated.objects.filter(recipe_id__in=recipe_ids)
+            .order_by("recipe_id", "id")
+            .values_list(
+                "recipe_id",
+                "ingredient_id",
+                "ingredient__name",
+                "ingredient__measurement_unit",
+                "amount",
+            )
+        )
+    if user is None or not user.is_authenticated:
+        return querysets
+    if "is_favorited" in fields:
+        querysets["favorited"] = Favourite.objects.filter(
+            user=user, recipe_id__in=recipe_ids
+        ).values_list("recipe_id", flat=True)
+    if "is_in_shopping_cart" in fields:
+        querysets["in_shopping_cart"] = ShoppingList.objects.filter(
+            user=user, recipe_id__in=recipe_ids
+        ).values_list("recipe_id", flat=True)
+    if "author" in fields:
+        querysets["subscribed"] = Subscription.objects.filter(
+            user=user, author_id__in={row["author_id"] for row in rows} - {None}
+        ).values_list("author_id", flat=True)
+    return querysets
+
+
+def build_recipes(rows, related, request, fields=RECIPE_FIELDS):
+    """Ответ по строкам рецептов и результатам related_querysets."""
+    ingredients = {}
+    for recipe_id, ingredient_id, name, unit, amount in related.get("ingredients", ()):
+        ingredients.setdefault(recipe_id, []).append(
+            {
+                "id": ingredient_id,
+                "name": name,
+                "measurement_unit": unit,
+                "amount": amount,
+            }
+        )
+    favorited = set(related.get("favorited", ()))
+    in_shopping_cart = set(related.get("in_shopping_cart", ()))
+    subscribed = set(related.get("subscribed", ()))
+
+    def author(row):
+        if row["author_id"] is None:
+            return None
+        return {
+            "id": row["author_id"],
+            "email": row["author__email"],
+            "username": row["author__username"],
+            "first_name": row["author__first_name"],
+            "last_name": row["author__last_name"],
+            "is_subscribed": row["author_id"] in subscribed,
+            "avatar": file_url(avatar_storage, row["author__avatar"], request),
+        }
+
+    getters = {
+        "id": lambda row: row["id"],
+        "author": author,
+        "name": lambda row: row["name"],
+        "image": lambda row: file_url(recipe_image_storage, row["image"], request),
+        "text": lambda row: row["text"],
+        "cooking_time": lambda row: row["cooking_time"],
+        "ingredients": lambda row: ingredients.get(row["id"], []),
+        "is_favorited": lambda row: row["id"] in favorited,
+        "is_in_shopping_cart": lambda row: row["id"] in in_shopping_cart,
+    }
+    getters = [(name, getters[name]) for name in fields]
+    with track_serializer():
+        return [{name: getter(row) for name, getter in getters} for row in rows]
+
+
+def serialize_recipes(rows, request, user, fields=RECIPE_FIELDS):
+    rows = list(rows)
+    if not rows:
+        return []
+    related = {
+        name: list(queryset)
+        for name, queryset in related_querysets(rows, user, fields).items()
+    }
+    return build_recipes(rows, related, request, fields)
+
+
+async def aserialize_recipes(rows, request, user, fields=RECIPE_FIELDS):
+    if not rows:
+        return []
+    related = {
+        name: [item async for item in queryset]
+        for name, queryset in related_querysets(rows, user, fields).items()
+    }
+    return build_recipes(rows, related, request, fields)
@@ -0,0 +1,37 @@
+"""
+Разреженные наборы полей: ?fields=id,name,image или ?omit=text,ingredients.
+
+Вьюсеты передают выбранные поля сериализатору и по ним же сужают выборку:
+невыбранные колонки не читаются, связанные данные не подгружаются.
+"""
+
+from rest_framework.exceptions import ParseError
+
+FIELDS_PARAM = "fields"
+OMIT_PARAM = "omit"
+
+
+def parse_names(params, param, available):
+    names = {name.strip() for name in params.get(param, "").split(",")} - {""}
+    unknown = names - set(available)
+    if unknown:
+        raise ParseError(
+            f"Неизвестные поля в {param}: {', '.join(sorted(unknown))}. "
+            f"Доступны: {', '.join(available)}"
+        )
+    return names
+
+
+def requested_fields(params, available):
+    """
+    Поля ответа из available (в их порядке) по параметрам запроса.
+    Без fields и omit возвращает available как есть.
+    """
+    fields = available
+    if params.get(FIELDS_PARAM):
+        names = parse_names(params, FIELDS_PARAM, available)
+        fields = tuple(name for name in fields if name in names)
+    if params.get(OMIT_PARAM):
+        names = parse_names(params, OMIT_PARAM, available)
+        fields = tuple(name for name in fields if name not in names)
+    return fields
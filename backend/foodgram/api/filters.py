@@ -0,0 +1,66 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count
+from django_filters import rest_framework as filters
+from recipes.models import Recipe, RecipeIngredientsRelated
+
+User = get_user_model()
+
+
+class NumberInFilter(filters.BaseInFilter, filters.NumberFilter):
+    """Список id через запятую: ?ingredients=1,2,3."""
+
+
+class RecipeFilter(filters.FilterSet):
+    author = filters.ModelMultipleChoiceFilter(
+        queryset=User.objects.all(), distinct=False
+    )
+    cooking_time = filters.RangeFilter()
+    name = filters.CharFilter(lookup_expr="istartswith")
+    ingredients = NumberInFilter(method="filter_ingredients")
+    exclude_ingredients = NumberInFilter(method="filter_exclude_ingredients")
+    # 1/0 и true/false, как в BooleanWidget.
+    is_favorited = filters.BooleanFilter(method="filter_is_favorited")
+    is_in_shopping_cart = filters.BooleanFilter(method="filter_is_in_shopping_cart")
+
+    class Meta:
+        model = Recipe
+        fields = ("author",)
+
+    def filter_ingredients(self, queryset, name, value):
+        """
+        Рецепты, содержащие все ингредиенты: один сгруппированный
+        семи-джойн по индексу (ingredient, recipe) вместо джойна на каждый id.
+        """
+        ingredient_ids = set(value)
+        if not ingredient_ids:
+            return queryset
+        return queryset.filter(
+            id__in=RecipeIngredientsRelated.objects.filter(
+                ingredient_id__in=ingredient_ids
+            )
+            .values("recipe_id")
+            .annotate(matched=Count("id"))
+            .filter(matched=len(ingredient_ids))
+            .values("recipe_id")
+        )
+
+    def filter_exclude_ingredients(self, queryset, name, value):
+        if not value:
+            return queryset
+        return queryset.exclude(
+            id__in=RecipeIngredientsRelated.objects.filter(
+                ingredient_id__in=value
+            ).values("recipe_id")
+        )
+
+    def filter_is_favorited(self, queryset, name, value):
+        user = self.request.user
+        if value and user.is_authenticated:
+            return queryset.filter(favorited_by__user=user)
+        return queryset
+
+    def filter_is_in_shopping_cart(self, queryset, name, value):
+        user = self.request.user
+        if value and user.is_authenticated:
+            return queryset.filter(in_shopping_carts__user=user)
+        return queryset
@@ -0,0 +1,158 @@
+"""
+Шина инвалидации локальных кешей через PostgreSQL LISTEN/NOTIFY.
+
+Пока кеш у каждого процесса свой (LocMemCache по умолчанию), изменение,
+сделанное одним воркером, не видно другим воркерам и контейнерам. Сигналы
+моделей после коммита публикуют события в канал
+CACHE_INVALIDATION_CHANNEL (pg_notify), а поток-слушатель в каждом воркере
+вызывает для них зарегистрированные обработчики — те чистят ключи своего
+кеша. Свои события слушатель пропускает: процесс уже применил их на месте.
+
+Работает только на PostgreSQL. Слушатель запускается хуком gunicorn
+post_worker_init (gunicorn.conf.py) и держит одно соединение с БД.
+"""
+
+import json
+import logging
+import os
+import select
+import socket
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+# Таймаут ожидания уведомлений: столько слушатель может не замечать stop().
+POLL_TIMEOUT = 5
+MAX_RECONNECT_DELAY = 30
+
+handlers = {}
+listener = None
+listener_lock = threading.Lock()
+
+
+def handler(event):
+    """Регистрирует обработчик события; аргументы — поля события."""
+
+    def register(func):
+        handlers[event] = func
+        return func
+
+    return register
+
+
+def enabled():
+    return settings.CACHE_INVALIDATION_BUS and connection.vendor == "postgresql"
+
+
+def origin():
+    # Считается при каждом вызове: после форка у воркера свой pid.
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def notify(message):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_notify(%s, %s)", [settings.CACHE_INVALIDATION_CHANNEL, message]
+        )
+
+
+def publish(event, **payload):
+    """Сообщает событие остальным процессам после коммита транзакции."""
+    if not enabled():
+        return
+    message = json.dumps({"event": event, "origin": origin(), **payload})
+    transaction.on_commit(lambda: notify(message))
+
+
+def dispatch(message):
+    """Вызывает обработчик события, пришедшего от другого процесса."""
+    try:
+        payload = json.loads(message)
+        event = payload.pop("event")
+        sender = payload.pop("origin")
+    except (ValueError, KeyError, TypeError):
+        logger.warning("Некорректное событие шины инвалидации: %r", message)
+        return
+    func = handlers.get(event)
+    if sender == origin() or func is None:
+        return
+    try:
+        func(**payload)
+    except Exception:
+        logger.exception("Ошибка обработки события %s", event)
+
+
+def reset_local_cache():
+    """
+    События, пришедшие, пока слушатель был отключён, потеряны: локальные
+    кеши сбрасываются целиком. Общие не трогаем — они и так согласованы.
+    """
+    for local in caches.all():
+        if isinstance(local, LocMemCache):
+            local.clear()
+
+
+def notifications(raw, timeout):
+    """Уведомления, пришедшие за timeout секунд (psycopg2 и psycopg 3)."""
+    if hasattr(raw, "poll"):
+        if select.select([raw], [], [], timeout)[0]:
+            raw.poll()
+        while raw.notifies:
+            yield raw.notifies.pop(0).payload
+    else:
+        for notification in raw.notifies(timeout=timeout):
+            yield notification.payload
+
+
+class Listener(threading.Thread):
+    def __init__(self):
+        super().__init__(name="cache-invalidation", daemon=True)
+        self.stopped = threading.Event()
+        self.connected = False
+        self.delay = 1
+
+    def listen(self):
+        channel = connection.ops.quote_name(settings.CACHE_INVALIDATION_CHANNEL)
+        with connection.cursor() as cursor:
+            cursor.execute(f"LISTEN {channel}")
+        if self.connected:
+            reset_local_cache()
+        self.connected = True
+        self.delay = 1
+        while not self.stopped.is_set():
+            for message in notifications(connection.connection, POLL_TIMEOUT):
+                dispatch(message)
+
+    def run(self):
+        while not self.stopped.is_set():
+            try:
+                self.listen()
+            except Exception:
+                logger.exception(
+                    "Слушатель шины инвалидации отключился, повтор через %s с",
+                    self.delay,
+                )
+            finally:
+                connection.close()
+            self.stopped.wait(self.delay)
+            self.delay = min(self.delay * 2, MAX_RECONNECT_DELAY)
+
+    def stop(self):
+        self.stopped.set()
+
+
+def start_listener():
+    """Запускает слушателя в текущем процессе, если он ещё не запущен."""
+    global listener
+    if not enabled():
+        return None
+    with listener_lock:
+        if listener is None or not listener.is_alive():
+            listener = Listener()
+            listener.start()
+        return listener
@@ -0,0 +1,89 @@
+import io
+import statistics
+import time
+import tracemalloc
+
+from api.renderers import FastJSONParser, FastJSONRenderer, orjson
+from api.serializers import IngredientSerializer, RecipeSerializer
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from recipes.models import Ingredient, Recipe
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+
+def measure(func, iterations):
+    """Медиана времени вызова (мкс) и пик памяти одного вызова (КБ)."""
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return statistics.median(timings) * 1_000_000, peak / 1024
+
+
+class Command(BaseCommand):
+    help = (
+        "Микробенчмарк JSON: рендеринг и разбор реальных ответов "
+        "RecipeSerializer и справочника ингредиентов рендерером DRF и "
+        "FastJSONRenderer — время и пик выделенной памяти (tracemalloc)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--recipes", type=int, default=100, help="Рецептов в одном ответе"
+        )
+        parser.add_argument("--iterations", type=int, default=200)
+
+    def handle(self, *args, **options):
+        request = RequestFactory().get("/api/recipes/")
+        request.user = AnonymousUser()
+        recipes = Recipe.objects.select_related("author").prefetch_related(
+            "recipe_ingredients__ingredient"
+        )[: options["recipes"]]
+        payloads = {
+            "recipes": RecipeSerializer(
+                recipes, many=True, context={"request": request}
+            ).data,
+            "ingredients": IngredientSerializer(
+                Ingredient.objects.all(), many=True
+            ).data,
+        }
+        if not payloads["recipes"]:
+            raise CommandError("Нет рецептов: сначала seed_data или seed_benchmark")
+        if orjson is None:
+            self.stdout.write(
+                self.style.WARNING("orjson не установлен: FastJSON = stdlib json")
+            )
+
+        iterations = options["iterations"]
+        renderers = (("DRF", JSONRenderer()), ("FastJSON", FastJSONRenderer()))
+        parsers = (("DRF", JSONParser()), ("FastJSON", FastJSONParser()))
+        for name, data in payloads.items():
+            body = renderers[0][1].render(data)
+            if renderers[1][1].render(data) != body:
+                raise CommandError(f"{name}: вывод рендереров различается")
+            if parsers[1][1].parse(io.BytesIO(body)) != parsers[0][1].parse(
+                io.BytesIO(body)
+            ):
+                raise CommandError(f"{name}: результат парсеров различается")
+            self.stdout.write(f"{name}: {len(data)} объектов, {len(body)} байт")
+            for label, renderer in renderers:
+                micros, peak = measure(lambda: renderer.render(data), iterations)
+                self.stdout.write(
+                    f"  render {label:<9} {micros:10.1f} мкс  пик {peak:9.1f} КБ"
+                )
+            for label, parser in parsers:
+                micros, peak = measure(
+                    lambda: parser.parse(io.BytesIO(body)), iterations
+                )
+                self.stdout.write(
+                    f"  parse  {label:<9} {micros:10.1f} мкс  пик {peak:9.1f} КБ"
+                )
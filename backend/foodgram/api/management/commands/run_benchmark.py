@@ -0,0 +1,243 @@
+import json
+import platform
+import random
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from recipes.management.commands.seed_benchmark import BENCH_PREFIX
+from recipes.models import Favourite, Ingredient, Recipe
+from rest_framework.authtoken.models import Token
+
+SCENARIOS = (
+    "feed",
+    "detail",
+    "search",
+    "favorite",
+    "cart_download",
+    "subscriptions",
+)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples, elapsed):
+    latencies = [sample["latency"] for sample in samples]
+    queries = [sample["queries"] for sample in samples]
+    statuses = {}
+    for sample in samples:
+        statuses[str(sample["status"])] = statuses.get(str(sample["status"]), 0) + 1
+    return {
+        "requests": len(samples),
+        "statuses": dict(sorted(statuses.items())),
+        "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else None,
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies) * 1000, 3),
+            "p50": round(percentile(latencies, 0.50) * 1000, 3),
+            "p95": round(percentile(latencies, 0.95) * 1000, 3),
+            "p99": round(percentile(latencies, 0.99) * 1000, 3),
+        },
+        "queries": {
+            "mean": round(statistics.fmean(queries), 2),
+            "max": max(queries),
+        },
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Сценарный бенчмарк API на данных seed_benchmark: задержки p50/p95/p99, "
+        "пропускная способность и число SQL-запросов в JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=200)
+        parser.add_argument("--warmup", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS)
+        )
+        parser.add_argument("--output", help="Файл для JSON-отчёта")
+        parser.add_argument(
+            "--compare", help="JSON-отчёт предыдущего прогона для сравнения"
+        )
+
+    def handle(self, *args, **options):
+        tokens = dict(
+            Token.objects.filter(user__username__startswith=BENCH_PREFIX)
+            .order_by("user_id")
+            .values_list("user_id", "key")
+        )
+        if not tokens:
+            raise CommandError("Нет данных бенчмарка, сначала запустите seed_benchmark")
+        self.rng = random.Random(options["seed"])
+        self.tokens = tokens
+        self.user_ids = list(tokens)
+        self.recipe_ids = list(
+            Recipe.objects.order_by("id").values_list("id", flat=True)
+        )
+        self.prefixes = sorted(
+            {
+                name[:length]
+                for name in Ingredient.objects.values_list("name", flat=True)[:500]
+                for length in (1, 2, 3)
+            }
+        )
+        self.page_count = max(1, len(self.recipe_ids) // 6)
+
+        report = {
+            "meta": self.meta(options),
+            "scenarios": {},
+        }
+        hosts = [*settings.ALLOWED_HOSTS, "testserver"]
+        with override_settings(ALLOWED_HOSTS=hosts):
+            for name in options["scenarios"]:
+                scenario = getattr(self, f"scenario_{name}")
+                for _ in range(options["warmup"]):
+                    scenario()
+                samples = []
+                started = time.perf_counter()
+                for _ in range(options["iterations"]):
+                    samples.extend(scenario())
+                elapsed = time.perf_counter() - started
+                report["scenarios"][name] = summarize(samples, elapsed)
+
+        text = json.dumps(report, ensure_ascii=False, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                file.write(text)
+        else:
+            self.stdout.write(text)
+        if options["compare"]:
+            self.compare(options["compare"], report)
+
+    def meta(self, options):
+        return {
+            "revision": git_revision(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "seed": options["seed"],
+            "iterations": options["iterations"],
+            "dataset": {
+                "users": len(self.user_ids),
+                "recipes": len(self.recipe_ids),
+            },
+        }
+
+    def request(self, method, path, user_id=None):
+        client = Client()
+        headers = {}
+        if user_id is not None:
+            headers["HTTP_AUTHORIZATION"] = f"Token {self.tokens[user_id]}"
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = getattr(client, method)(path, **headers)
+            latency = time.perf_counter() - started
+        return {
+            "latency": latency,
+            "queries": len(queries),
+            "status": response.status_code,
+        }
+
+    def scenario_feed(self):
+        page = self.rng.randint(1, min(self.page_count, 20))
+        return [
+            self.request(
+                "get",
+                f"/api/recipes/?page={page}&limit=6",
+                self.rng.choice(self.user_ids),
+            )
+        ]
+
+    def scenario_detail(self):
+        recipe_id = self.rng.choice(self.recipe_ids)
+        return [
+            self.request(
+                "get", f"/api/recipes/{recipe_id}/", self.rng.choice(self.user_ids)
+            )
+        ]
+
+    def scenario_search(self):
+        prefix = self.rng.choice(self.prefixes)
+        return [self.request("get", f"/api/ingredients/?name={prefix}")]
+
+    def scenario_favorite(self):
+        # Добавляем и сразу убираем рецепт, чтобы не менять набор данных.
+        user_id = self.rng.choice(self.user_ids)
+        favorited = set(
+            Favourite.objects.filter(user_id=user_id).values_list(
+                "recipe_id", flat=True
+            )
+        )
+        recipe_id = self.rng.choice(
+            [pk for pk in self.recipe_ids if pk not in favorited]
+        )
+        path = f"/api/recipes/{recipe_id}/favorite/"
+        return [
+            self.request("post", path, user_id),
+            self.request("delete", path, user_id),
+        ]
+
+    def scenario_cart_download(self):
+        return [
+            self.request(
+                "get",
+                "/api/recipes/download_shopping_cart/",
+                self.rng.choice(self.user_ids),
+            )
+        ]
+
+    def scenario_subscriptions(self):
+        return [
+            self.request(
+                "get",
+                "/api/users/subscriptions/?page=1&limit=6&recipes_limit=3",
+                self.rng.choice(self.user_ids),
+            )
+        ]
+
+    def compare(self, path, report):
+        with open(path, encoding="utf-8") as file:
+            baseline = json.load(file)
+        self.stdout.write(
+            f"\nСравнение с {baseline['meta'].get('revision')} "
+            f"(текущий {report['meta'].get('revision')}):"
+        )
+        self.stdout.write(
+            f"{'сценарий':<16}{'p50, мс':>18}{'p95, мс':>18}{'запросы':>14}"
+        )
+        for name, current in report["scenarios"].items():
+            previous = baseline["scenarios"].get(name)
+            if previous is None:
+                continue
+            self.stdout.write(
+                f"{name:<16}"
+                f"{previous['latency_ms']['p50']:>8} → {current['latency_ms']['p50']:<7}"
+                f"{previous['latency_ms']['p95']:>8} → {current['latency_ms']['p95']:<7}"
+                f"{previous['queries']['mean']:>6} → {current['queries']['mean']:<5}"
+            )
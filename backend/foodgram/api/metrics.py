@@ -0,0 +1,195 @@
+"""
+Метрики запросов: число SQL-запросов, время в БД, время сериализации,
+размер ответа на проводе (после сжатия).
+
+Счётчики текущего запроса живут в ContextVar, поэтому корректно работают
+и в синхронных вьюхах, и в асинхронных (asgiref копирует контекст в потоки
+sync_to_async). Гистограммы копятся в памяти процесса и отдаются в формате
+Prometheus на /api/metrics (только staff); при нескольких воркерах gunicorn
+каждый воркер отдаёт свои значения.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from rest_framework import serializers
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+_current = ContextVar("request_metrics", default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.query_count = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self._serializer_depth = 0
+
+
+def start_request():
+    """Начинает сбор метрик; возвращает (метрики, токен для finish_request)."""
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def finish_request(token):
+    _current.reset(token)
+
+
+def execute_wrapper(execute, sql, params, many, context):
+    """Обёртка для connection.execute_wrappers: считает запросы и время."""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.query_count += 1
+        metrics.db_time += time.perf_counter() - started
+
+
+def install_execute_wrapper(sender, connection, **kwargs):
+    """Обработчик connection_created: вешает обёртку на новое соединение."""
+    if execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(execute_wrapper)
+
+
+@contextmanager
+def track_serializer():
+    """Учитывает время сериализации; вложенные вызовы не суммируются."""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    metrics._serializer_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics._serializer_depth -= 1
+        if not metrics._serializer_depth:
+            metrics.serializer_time += time.perf_counter() - started
+
+
+class TimedDataMixin:
+    @property
+    def data(self):
+        with track_serializer():
+            return super().data
+
+
+class TimedListSerializer(TimedDataMixin, serializers.ListSerializer):
+    pass
+
+
+class TimedSerializerMixin(TimedDataMixin):
+    """Примесь для сериализаторов: время `.data` попадает в метрики запроса."""
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        meta = getattr(cls, "Meta", None)
+        if meta is not None and not hasattr(meta, "list_serializer_class"):
+            meta.list_serializer_class = TimedListSerializer
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, labels, value):
+        series = self.series.setdefault(labels, [[0] * len(self.buckets), 0.0, 0])
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[0][index] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} histogram",
+        ]
+        for labels, (counts, total, observations) in sorted(self.series.items()):
+            label_text = ",".join(f'{key}="{value}"' for key, value in labels)
+            for bound, count in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{label_text},le="+Inf"}} {observations}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {total}")
+            lines.append(f"{self.name}_count{{{label_text}}} {observations}")
+        return "\n".join(lines)
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {
+            "duration": Histogram(
+                "foodgram_request_duration_seconds",
+                "Время обработки запроса.",
+                DURATION_BUCKETS,
+            ),
+            "queries": Histogram(
+                "foodgram_request_db_queries",
+                "Число SQL-запросов на запрос.",
+                QUERY_BUCKETS,
+            ),
+            "db": Histogram(
+                "foodgram_request_db_seconds",
+                "Суммарное время SQL-запросов.",
+                DURATION_BUCKETS,
+            ),
+            "serializer": Histogram(
+                "foodgram_request_serializer_seconds",
+                "Время сериализации ответа.",
+                DURATION_BUCKETS,
+            ),
+            "size": Histogram(
+                "foodgram_response_wire_size_bytes",
+                "Размер тела ответа после сжатия.",
+                SIZE_BUCKETS,
+            ),
+        }
+
+    def observe(self, view, method, duration, metrics, size):
+        labels = (("view", view), ("method", method))
+        with self.lock:
+            self.histograms["duration"].observe(labels, duration)
+            self.histograms["queries"].observe(labels, metrics.query_count)
+            self.histograms["db"].observe(labels, metrics.db_time)
+            self.histograms["serializer"].observe(labels, metrics.serializer_time)
+            if size is not None:
+                self.histograms["size"].observe(labels, size)
+
+    def render(self):
+        with self.lock:
+            return (
+                "\n".join(h.render() for h in self.histograms.values() if h.series)
+                + "\n"
+            )
+
+
+registry = Registry()
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def metrics_view(request):
+    # Задержки и число запросов по вьюхам — только для staff.
+    if not settings.REQUEST_METRICS:
+        raise Http404
+    return HttpResponse(
+        registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
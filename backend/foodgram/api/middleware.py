@@ -0,0 +1,171 @@
+import json
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import JsonResponse
+from django.utils.cache import patch_vary_headers
+
+from . import metrics, warmup
+from .compression import choose_encoding, compress
+
+logger = logging.getLogger("api.metrics")
+
+
+class HealthCheckMiddleware:
+    """
+    Пробы оркестратора: /healthz — процесс жив, /readyz — воркер прогрет и
+    БД доступна (api/warmup.py). Отвечает раньше остальных middleware: без
+    проверки Host, сессий и метрик, и не обращается к БД на каждой пробе.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if request.path == settings.HEALTH_CHECK_PATH:
+            return probe_response(True, "ok")
+        if request.path == settings.READINESS_CHECK_PATH:
+            return probe_response(*warmup.readiness())
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if request.path == settings.HEALTH_CHECK_PATH:
+            return probe_response(True, "ok")
+        if request.path == settings.READINESS_CHECK_PATH:
+            return probe_response(*await warmup.areadiness())
+        return await self.get_response(request)
+
+
+def probe_response(ok, status):
+    return JsonResponse({"status": status}, status=200 if ok else 503)
+
+
+class RequestMetricsMiddleware:
+    """
+    Собирает метрики каждого запроса (REQUEST_METRICS=True): число SQL-запросов,
+    время в БД, время сериализации и размер ответа после сжатия. Отдаёт их в
+    заголовке Server-Timing, пишет JSON-строкой в лог api.metrics и копит
+    гистограммы для /api/metrics.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_METRICS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request_metrics, token = metrics.start_request()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.finish_request(token)
+        return self.record(request, response, request_metrics, started)
+
+    async def __acall__(self, request):
+        request_metrics, token = metrics.start_request()
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.finish_request(token)
+        return self.record(request, response, request_metrics, started)
+
+    def record(self, request, response, request_metrics, started):
+        duration = time.perf_counter() - started
+        match = request.resolver_match
+        view = match.view_name if match else "unmatched"
+        # Middleware стоит снаружи CompressionMiddleware: размер — сжатый.
+        size = None if response.streaming else len(response.content)
+
+        metrics.registry.observe(view, request.method, duration, request_metrics, size)
+        response["Server-Timing"] = (
+            f"db;dur={request_metrics.db_time * 1000:.2f};"
+            f'desc="{request_metrics.query_count} queries", '
+            f"serializer;dur={request_metrics.serializer_time * 1000:.2f}, "
+            f"total;dur={duration * 1000:.2f}"
+        )
+        logger.info(
+            json.dumps(
+                {
+                    "view": view,
+                    "method": request.method,
+                    "path": request.path,
+                    "status": response.status_code,
+                    "duration_ms": round(duration * 1000, 2),
+                    "queries": request_metrics.query_count,
+                    "db_ms": round(request_metrics.db_time * 1000, 2),
+                    "serializer_ms": round(request_metrics.serializer_time * 1000, 2),
+                    "wire_size": size,
+                },
+                ensure_ascii=False,
+            )
+        )
+        return response
+
+
+class CompressionMiddleware:
+    """
+    Сжимает JSON-ответы не меньше RESPONSE_COMPRESSION_MIN_SIZE байт
+    (RESPONSE_COMPRESSION=True) в brotli или gzip по Accept-Encoding.
+    Уже сжатые ответы (справочник ингредиентов) пропускаются.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.RESPONSE_COMPRESSION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.compress(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.compress(request, await self.get_response(request))
+
+    def compress(self, request, response):
+        if (
+            response.streaming
+            or response.has_header("Content-Encoding")
+            or not response.get("Content-Type", "").startswith("application/json")
+            or len(response.content) < settings.RESPONSE_COMPRESSION_MIN_SIZE
+        ):
+            return response
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = choose_encoding(request)
+        if encoding is None:
+            return response
+        compressed = compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response["Content-Length"] = str(len(compressed))
+        response["Content-Encoding"] = encoding
+        # Как GZipMiddleware: сжатое тело не побайтно равно исходному.
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        return response
@@ -0,0 +1,227 @@
+"""
+Пагинация ?page=N&limit=M, как её запрашивает фронтенд.
+
+Страницы выбираются keyset-поиском: для каждого запроса (SQL выборки и
+limit) в кеше лежит карта «номер страницы → ключ последней строки» и
+count. Если известна граница предыдущей страницы, следующая читается как
+WHERE key < граница LIMIT M — без OFFSET, за время, не зависящее от
+глубины. Иначе — обычный OFFSET, и граница запоминается.
+
+Ключ — единственное уникальное поле сортировки (id рецептов, username
+пользователей); при другой сортировке работает обычный OFFSET. Карты
+сбрасываются версиями: общей (рецепты, пользователи) и пользовательской
+(избранное, корзина, подписки).
+"""
+
+import hashlib
+import math
+import time
+
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import LimitOffsetPagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+GLOBAL_VERSION_KEY = "pagination:version"
+USER_VERSION_KEY = "pagination:version:user:{}"
+PAGES_CACHE_KEY = "pagination:pages:{}"
+PAGES_TIMEOUT = 60 * 60
+
+
+def bump_version(user_id=None):
+    """Сбрасывает карты страниц: все или зависящие от пользователя."""
+    key = GLOBAL_VERSION_KEY if user_id is None else USER_VERSION_KEY.format(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def version_keys(user_id):
+    return [GLOBAL_VERSION_KEY, USER_VERSION_KEY.format(user_id)]
+
+
+def current_versions(user_id):
+    """
+    Общая и пользовательская версии. Отсутствующая (или вытесненная из
+    кеша) версия заводится временем: значения не повторяются.
+    """
+    keys = version_keys(user_id)
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+async def acurrent_versions(user_id):
+    keys = version_keys(user_id)
+    versions = await cache.aget_many(keys)
+    for key in keys:
+        if key not in versions:
+            await cache.aadd(key, time.time_ns(), timeout=None)
+            versions[key] = await cache.aget(key)
+    return [versions[key] for key in keys]
+
+
+def keyset_field(queryset):
+    """(имя поля, по убыванию) для keyset-поиска или None."""
+    query = queryset.query
+    ordering = query.order_by or (
+        queryset.model._meta.ordering if query.default_ordering else ()
+    )
+    if len(ordering) != 1 or not isinstance(ordering[0], str):
+        return None
+    name = ordering[0]
+    descending = name.startswith("-")
+    name = name.lstrip("-")
+    if name == "pk":
+        name = queryset.model._meta.pk.name
+    try:
+        field = queryset.model._meta.get_field(name)
+    except Exception:
+        return None
+    if not (field.primary_key or field.unique) or field.null:
+        return None
+    return field.attname, descending
+
+
+class PageLimitPagination(PageNumberPagination):
+    page_size_query_param = "limit"
+    max_page_size = 100
+    # Старые клиенты с ?offset= получают прежнюю LimitOffset-пагинацию.
+    offset_query_param = LimitOffsetPagination.offset_query_param
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.offset_query_param in request.query_params:
+            return self.delegate(queryset, request, view)
+        self.plan(queryset, request, request.user)
+        if self.count is None:
+            self.count = queryset.count()
+        self.check_page()
+        rows = list(self.page_queryset(queryset))
+        self.remember(rows)
+        return rows
+
+    async def apaginate_queryset(self, queryset, request, user):
+        """
+        Асинхронный вариант для вьюх на async ORM; пользователь передаётся
+        уже аутентифицированным — request.user DRF синхронный.
+        """
+        if self.offset_query_param in request.query_params:
+            self.offset_paginator = LimitOffsetPagination()
+            self.offset_paginator.request = request
+            self.offset_paginator.limit = self.offset_paginator.get_limit(request)
+            self.offset_paginator.offset = self.offset_paginator.get_offset(request)
+            self.offset_paginator.count = await queryset.acount()
+            start = self.offset_paginator.offset
+            end = start + self.offset_paginator.limit
+            return [row async for row in queryset[start:end]]
+        self.plan(queryset, request, user)
+        if self.count is None:
+            self.count = await queryset.acount()
+        self.check_page()
+        rows = [row async for row in self.page_queryset(queryset)]
+        self.remember(rows)
+        return rows
+
+    def delegate(self, queryset, request, view):
+        self.offset_paginator = LimitOffsetPagination()
+        return self.offset_paginator.paginate_queryset(queryset, request, view)
+
+    def plan(self, queryset, request, user):
+        """Номер страницы, лимит и кешированные границы — без запросов к БД."""
+        self.request = request
+        self.offset_paginator = None
+        self.limit = self.get_page_size(request)
+        page = request.query_params.get(self.page_query_param, "1")
+        if not page.isdigit() or int(page) < 1:
+            raise NotFound(
+                self.invalid_page_message.format(page_number=page, message="")
+            )
+        self.page_number = int(page)
+        self.count = None
+        self.pages = {}
+        self.cache_key = None
+        self.keyset = keyset_field(queryset)
+        if self.keyset is None:
+            return
+        try:
+            sql = str(queryset.query)
+        except EmptyResultSet:
+            return
+        user_id = user.id if user is not None and user.is_authenticated else None
+        versions = current_versions(user_id)
+        digest = hashlib.md5(f"{sql}|{self.limit}|{versions}".encode()).hexdigest()
+        self.cache_key = PAGES_CACHE_KEY.format(digest)
+        cached = cache.get(self.cache_key)
+        if cached is not None:
+            self.count, self.pages = cached
+
+    def check_page(self):
+        last_page = max(1, math.ceil(self.count / self.limit))
+        if self.page_number > last_page:
+            raise NotFound(
+                self.invalid_page_message.format(
+                    page_number=self.page_number, message=""
+                )
+            )
+
+    def page_queryset(self, queryset):
+        start = (self.page_number - 1) * self.limit
+        end = start + self.limit
+        boundary = self.pages.get(self.page_number - 1)
+        if self.keyset is None or self.page_number == 1 or boundary is None:
+            return queryset[start:end]
+        name, descending = self.keyset
+        lookup = f"{name}__lt" if descending else f"{name}__gt"
+        return queryset.filter(**{lookup: boundary})[: self.limit]
+
+    def remember(self, rows):
+        if self.cache_key is None or not rows:
+            return
+        name, _ = self.keyset
+        last = rows[-1]
+        boundary = last[name] if isinstance(last, dict) else getattr(last, name)
+        if self.pages.get(self.page_number) != boundary:
+            self.pages[self.page_number] = boundary
+            cache.set(self.cache_key, (self.count, self.pages), PAGES_TIMEOUT)
+
+    def get_next_link(self):
+        if self.page_number * self.limit >= self.count:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.page_query_param,
+            self.page_number + 1,
+        )
+
+    def get_previous_link(self):
+        if self.page_number == 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, self.page_number - 1)
+
+    def get_paginated_data(self, data):
+        if self.offset_paginator is not None:
+            paginator = self.offset_paginator
+            return {
+                "count": paginator.count,
+                "next": paginator.get_next_link(),
+                "previous": paginator.get_previous_link(),
+                "results": data,
+            }
+        return {
+            "count": self.count,
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        }
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
@@ -7,12 +7,16 @@ from django.core.files.base import ContentFile
 from djoser.serializers import UserCreateSerializer
 from recipes.models import (
     Ingredient,
+    MealPlanEntry,
     Recipe,
     RecipeIngredientsRelated,
 )
+from recipes.signals import recipe_ingredients_changed
 from rest_framework import serializers
 from users.models import Subscription
 
+from .metrics import TimedSerializerMixin
+
 User = get_user_model()
 
 # Константы валидации
@@ -20,6 +24,7 @@ AMOUNT_MIN = 1
 AMOUNT_MAX = 32000
 COOKING_TIME_MIN = 1
 COOKING_TIME_MAX = 32000
+BULK_RECIPES_MAX = 500
 
 
 class Base64ImageField(serializers.ImageField):
@@ -31,7 +36,19 @@ class Base64ImageField(serializers.ImageField):
         return super().to_internal_value(data)
 
 
-class CustomUserSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """Необязательный аргумент fields: остальные поля сериализатора убираются."""
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class CustomUserSerializer(
+    SparseFieldsMixin, TimedSerializerMixin, serializers.ModelSerializer
+):
     is_subscribed = serializers.SerializerMethodField()
     avatar = serializers.ImageField(read_only=True)
 
@@ -48,9 +65,12 @@ class CustomUserSerializer(serializers.ModelSerializer):
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, "subscribed"):
+            # Аннотация UserViewSet.get_queryset: без запроса на каждого.
+            return obj.subscribed
         request = self.context.get("request")
         if request and request.user.is_authenticated:
-            request.user.subscriptions.filter(author=obj).exists()
+            return request.user.subscriptions.filter(author=obj).exists()
         return False
 
 
@@ -61,13 +81,13 @@ class CustomUserCreateSerializer(UserCreateSerializer):
         extra_kwargs = {"password": {"write_only": True}}
 
 
-class RecipeShortSerializer(serializers.ModelSerializer):
+class RecipeShortSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Recipe
         fields = ("id", "name", "image", "cooking_time")
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Ingredient
         fields = ("id", "name", "measurement_unit")
@@ -92,10 +112,18 @@ class RecipeIngredientWriteSerializer(serializers.Serializer):
     amount = serializers.IntegerField(min_value=AMOUNT_MIN, max_value=AMOUNT_MAX)
 
 
+class BulkRecipesSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=BULK_RECIPES_MAX,
+    )
+
+
 # --- MAIN RECIPE SERIALIZERS ---
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     ingredients = RecipeIngredientReadSerializer(many=True, source="recipe_ingredients")
     author = CustomUserSerializer(read_only=True)
     image = Base64ImageField()
@@ -190,6 +218,7 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             author=self.context["request"].user, **validated_data
         )
         self.create_ingredients(ingredients_data, recipe)
+        recipe_ingredients_changed.send(sender=Recipe, recipe_id=recipe.id)
         return recipe
 
     def update(self, instance, validated_data):
@@ -206,6 +235,7 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
 
         RecipeIngredientsRelated.objects.filter(recipe=instance).delete()
         self.create_ingredients(ingredients_data, instance)
+        recipe_ingredients_changed.send(sender=Recipe, recipe_id=instance.id)
 
         return instance
 
@@ -213,7 +243,9 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
 # --- SUBSCRIPTIONS ---
 
 
-class SubscriptionSerializer(serializers.ModelSerializer):
+class SubscriptionSerializer(
+    SparseFieldsMixin, TimedSerializerMixin, serializers.ModelSerializer
+):
     email = serializers.EmailField(source="author.email")
     username = serializers.CharField(source="author.username")
     first_name = serializers.CharField(source="author.first_name")
@@ -253,3 +285,32 @@ class SubscriptionSerializer(serializers.ModelSerializer):
 
     def get_recipes_count(self, obj):
         return obj.author.recipes.count()
+
+
+# --- MEAL PLAN ---
+
+
+class MealPlanEntrySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = MealPlanEntry
+        fields = ("id", "recipe", "day", "servings")
+
+    def validate(self, attrs):
+        user = self.context["request"].user
+        recipe = attrs.get("recipe", getattr(self.instance, "recipe", None))
+        day = attrs.get("day", getattr(self.instance, "day", None))
+        duplicates = MealPlanEntry.objects.filter(user=user, recipe=recipe, day=day)
+        if self.instance is not None:
+            duplicates = duplicates.exclude(pk=self.instance.pk)
+        if duplicates.exists():
+            raise serializers.ValidationError(
+                {"errors": "Рецепт уже запланирован на этот день"}
+            )
+        return attrs
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data["recipe"] = RecipeShortSerializer(
+            instance.recipe, context=self.context
+        ).data
+        return data
@@ -0,0 +1,106 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from recipes import feed, matcher, shortlinks
+from recipes.models import Favourite, Ingredient, Recipe, ShoppingList
+from recipes.signals import AUTHOR_CARD_FIELDS, recipe_ingredients_changed
+from users.models import Subscription
+
+from . import invalidation, pagination
+from .caching import invalidate_recipe
+from .catalog import catalog
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def invalidate_recipe_cache(sender, instance, signal, **kwargs):
+    invalidate_recipe(instance.id)
+    invalidation.publish("recipe", recipe_id=instance.id, deleted=signal is post_delete)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(recipe_ingredients_changed)
+def reset_pages(sender, **kwargs):
+    pagination.bump_version()
+
+
+@receiver(post_save, sender=Favourite)
+@receiver(post_delete, sender=Favourite)
+@receiver(post_save, sender=ShoppingList)
+@receiver(post_delete, sender=ShoppingList)
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def reset_user_pages(sender, instance, **kwargs):
+    pagination.bump_version(instance.user_id)
+    invalidation.publish("user_pages", user_id=instance.user_id)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def reset_catalog(sender, **kwargs):
+    # После коммита: иначе другой воркер соберёт старый справочник под
+    # новой версией.
+    transaction.on_commit(catalog.refresh)
+
+
+# --- Шина инвалидации (api/invalidation.py) ---
+# Сигналы выше чистят кеш своего процесса; события ниже повторяют это в
+# остальных процессах. Справочник ингредиентов — событие "catalog"
+# (api/catalog.py).
+
+
+@receiver(recipe_ingredients_changed)
+def announce_recipe_ingredients(sender, recipe_id, **kwargs):
+    invalidation.publish("recipe_ingredients", recipe_id=recipe_id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def reset_author_pages(sender, instance, update_fields=None, **kwargs):
+    # Вход пользователя (last_login) страниц не меняет.
+    if update_fields is None or AUTHOR_CARD_FIELDS & set(update_fields):
+        pagination.bump_version()
+        invalidation.publish("user", user_id=instance.id)
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def announce_subscription(sender, instance, **kwargs):
+    invalidation.publish("subscription", author_id=instance.author_id)
+
+
+@invalidation.handler("recipe")
+def evict_recipe(recipe_id, deleted):
+    invalidate_recipe(recipe_id)
+    pagination.bump_version()
+    if deleted:
+        shortlinks.forget(recipe_id)
+        matcher.index.update(recipe_id)
+
+
+@invalidation.handler("recipe_ingredients")
+def evict_recipe_ingredients(recipe_id):
+    pagination.bump_version()
+    matcher.index.update(recipe_id)
+
+
+@invalidation.handler("user")
+def evict_user(user_id):
+    pagination.bump_version()
+
+
+@invalidation.handler("user_pages")
+def evict_user_pages(user_id):
+    pagination.bump_version(user_id)
+
+
+@invalidation.handler("subscription")
+def evict_celebrities(author_id):
+    # Число подписчиков здесь неизвестно: список знаменитостей
+    # пересчитается при следующем обращении.
+    cache.delete(feed.CELEBRITIES_CACHE_KEY)
@@ -0,0 +1,82 @@
+"""
+Пересчёт промахов кеша одним потоком (single-flight) и
+stale-while-revalidate.
+
+Значение хранится в кеше вместе со сроком свежести и живёт дольше него на
+stale_timeout. Устаревшее или пропавшее значение пересчитывает тот, кто
+взял короткую блокировку в кеше (cache.add атомарен); остальные тем
+временем отдают устаревшее значение, а если его нет (ключ удалён при
+инвалидации) — ждут результат до WAIT_TIMEOUT и только потом считают сами.
+
+Блокировка действует в пределах кеша: с LocMemCache по умолчанию — в
+пределах процесса, и каждый воркер gunicorn пересчитывает значение сам
+(один раз, а не на каждый поток). Один пересчёт на все воркеры и машины
+даёт только общий кеш — Redis или Memcached в CACHE_BACKEND.
+"""
+
+import time
+
+from django.core.cache import cache
+
+LOCK_KEY = "singleflight:lock:{}"
+# Блокировка истекает сама, если пересчитывавший процесс упал.
+LOCK_TIMEOUT = 10
+STALE_TIMEOUT = 60
+WAIT_TIMEOUT = 2
+WAIT_STEP = 0.02
+
+
+def store(key, value, timeout, stale_timeout):
+    if timeout is None:
+        cache.set(key, (None, value), timeout=None)
+    else:
+        cache.set(key, (time.time() + timeout, value), timeout + stale_timeout)
+
+
+def recompute(key, compute, timeout, stale_timeout):
+    try:
+        value = compute()
+        if value is not None:
+            store(key, value, timeout, stale_timeout)
+        return value
+    finally:
+        cache.delete(LOCK_KEY.format(key))
+
+
+def wait(key):
+    """Запись, сохранённая пересчитывающим процессом, или None."""
+    deadline = time.monotonic() + WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_STEP)
+        entry = cache.get(key)
+        if isinstance(entry, tuple):
+            return entry
+        if cache.get(LOCK_KEY.format(key)) is None:
+            # Пересчёт закончился, а значения нет (compute вернул None).
+            return None
+    return None
+
+
+def cached(key, compute, timeout, stale_timeout=STALE_TIMEOUT):
+    """
+    Значение compute() из кеша под ключом key. timeout — срок свежести в
+    секундах (None — бессрочно, до удаления ключа); None не кешируется.
+    """
+    entry = cache.get(key)
+    # Значение не в формате (срок, значение) — промах.
+    if isinstance(entry, tuple):
+        fresh_until, value = entry
+        if fresh_until is None or time.time() < fresh_until:
+            return value
+        if not cache.add(LOCK_KEY.format(key), 1, LOCK_TIMEOUT):
+            return value
+        return recompute(key, compute, timeout, stale_timeout)
+    if cache.add(LOCK_KEY.format(key), 1, LOCK_TIMEOUT):
+        return recompute(key, compute, timeout, stale_timeout)
+    entry = wait(key)
+    if entry is not None:
+        return entry[1]
+    value = compute()
+    if value is not None:
+        store(key, value, timeout, stale_timeout)
+    return value
@@ -0,0 +1,218 @@
+"""
+Снимок справочника ингредиентов в файле, общий для всех воркеров.
+
+Файл отображается в память (mmap) только для чтения: данные лежат в page
+cache один раз на машину, а не в куче каждого воркера, и только что
+запущенный воркер отвечает без запросов к БД. Поиск по id и по началу
+названия — двоичный, прямо по отображённому файлу.
+
+Формат (little-endian):
+    HEADER                 сигнатура, формат, число тел, версия справочника,
+                           метка БД-источника, число записей;
+    BODY × число тел       кодировка, смещение и длина готового JSON
+                           справочника (и его сжатых вариантов);
+    ID_ENTRY × записи      id и смещение записи, по возрастанию id;
+    NAME_ENTRY × записи    смещения записей по возрастанию ключа поиска;
+    записи                 RECORD, затем ключ, название и единица измерения
+                           (UTF-8) — в порядке справочника;
+    тела ответов.
+"""
+
+import bisect
+import mmap
+import os
+import struct
+import tempfile
+from contextlib import contextmanager, suppress
+from operator import itemgetter
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+MAGIC = b"FGIN"
+FORMAT = 2
+HEADER = struct.Struct("<4sHHQ8sI")
+BODY = struct.Struct("<8sII")
+ID_ENTRY = struct.Struct("<II")
+NAME_ENTRY = struct.Struct("<I")
+# id, позиция в справочнике, длины ключа, названия и единицы измерения
+RECORD = struct.Struct("<IIHHH")
+
+
+def search_key(text):
+    """Ключ поиска без учёта регистра, как name__istartswith."""
+    return text.upper().encode()
+
+
+def pack(version, source, rows, bodies):
+    """
+    Байты снимка. source — метка БД (8 байт), rows — словари
+    id/name/measurement_unit в порядке справочника, bodies — {кодировка или
+    None: тело ответа}.
+    """
+    count = len(rows)
+    position = (
+        HEADER.size
+        + BODY.size * len(bodies)
+        + (ID_ENTRY.size + NAME_ENTRY.size) * count
+    )
+    records, offsets, keys = [], [], []
+    for index, row in enumerate(rows):
+        key = search_key(row["name"])
+        name = row["name"].encode()
+        unit = row["measurement_unit"].encode()
+        record = RECORD.pack(row["id"], index, len(key), len(name), len(unit))
+        records.append(record + key + name + unit)
+        offsets.append(position)
+        keys.append(key)
+        position += len(records[-1])
+    table = []
+    for encoding, body in bodies.items():
+        table.append(BODY.pack((encoding or "").encode(), position, len(body)))
+        position += len(body)
+    by_id = sorted(range(count), key=lambda index: rows[index]["id"])
+    # Сортировка устойчива: при равных ключах — порядок справочника.
+    by_name = sorted(range(count), key=keys.__getitem__)
+    return b"".join(
+        (
+            HEADER.pack(MAGIC, FORMAT, len(bodies), version, source, count),
+            *table,
+            *(ID_ENTRY.pack(rows[index]["id"], offsets[index]) for index in by_id),
+            *(NAME_ENTRY.pack(offsets[index]) for index in by_name),
+            *records,
+            *bodies.values(),
+        )
+    )
+
+
+class Snapshot:
+    def __init__(self, buffer):
+        self.buffer = buffer
+        magic, layout, bodies, self.version, self.source, self.count = (
+            HEADER.unpack_from(buffer)
+        )
+        if magic != MAGIC or layout != FORMAT:
+            raise ValueError("Неизвестный формат снимка справочника")
+        self.ids_start = HEADER.size + BODY.size * bodies
+        self.names_start = self.ids_start + ID_ENTRY.size * self.count
+        # Тела — срезы отображения без копирования.
+        view = memoryview(buffer)
+        self.bodies = {}
+        for index in range(bodies):
+            encoding, offset, length = BODY.unpack_from(
+                buffer, HEADER.size + BODY.size * index
+            )
+            encoding = encoding.rstrip(b"\0").decode() or None
+            end = offset + length
+            self.bodies[encoding] = view[offset:end]
+
+    def id_entry(self, index):
+        return ID_ENTRY.unpack_from(self.buffer, self.ids_start + ID_ENTRY.size * index)
+
+    def name_offset(self, index):
+        (offset,) = NAME_ENTRY.unpack_from(
+            self.buffer, self.names_start + NAME_ENTRY.size * index
+        )
+        return offset
+
+    def key(self, offset):
+        key_length = RECORD.unpack_from(self.buffer, offset)[2]
+        start = offset + RECORD.size
+        end = start + key_length
+        return self.buffer[start:end]
+
+    def record(self, offset):
+        """(позиция в справочнике, словарь ингредиента)."""
+        pk, position, key_length, name_length, unit_length = RECORD.unpack_from(
+            self.buffer, offset
+        )
+        start = offset + RECORD.size + key_length
+        middle = start + name_length
+        end = middle + unit_length
+        return position, {
+            "id": pk,
+            "name": self.buffer[start:middle].decode(),
+            "measurement_unit": self.buffer[middle:end].decode(),
+        }
+
+    def get(self, pk):
+        """Ингредиент по id или None."""
+        index = bisect.bisect_left(
+            range(self.count), pk, key=lambda index: self.id_entry(index)[0]
+        )
+        if index < self.count:
+            found, offset = self.id_entry(index)
+            if found == pk:
+                return self.record(offset)[1]
+        return None
+
+    def search(self, prefix):
+        """Ингредиенты, название которых начинается с prefix, в порядке справочника."""
+        prefix = search_key(prefix)
+        start = bisect.bisect_left(
+            range(self.count),
+            prefix,
+            key=lambda index: self.key(self.name_offset(index)),
+        )
+        found = []
+        for index in range(start, self.count):
+            offset = self.name_offset(index)
+            if not self.key(offset).startswith(prefix):
+                break
+            found.append(self.record(offset))
+        return [row for _, row in sorted(found, key=itemgetter(0))]
+
+
+def read(path, source):
+    """
+    Снимок из файла или None, если файла нет, он не читается или собран из
+    другой БД (source — метка из pack).
+    """
+    try:
+        with open(path, "rb") as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        found = Snapshot(buffer)
+    except (ValueError, struct.error):
+        return None
+    return found if found.source == source else None
+
+
+def write(path, data):
+    """
+    Записывает снимок через временный файл и os.replace: читатели видят
+    старый снимок или новый целиком. Возвращает отображение нового файла.
+    """
+    fd, temp = tempfile.mkstemp(
+        dir=os.path.dirname(path) or ".", prefix=".ingredients-"
+    )
+    try:
+        with os.fdopen(fd, "w+b") as file:
+            file.write(data)
+            file.flush()
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        os.chmod(temp, 0o644)
+        os.replace(temp, path)
+    except BaseException:
+        with suppress(FileNotFoundError):
+            os.unlink(temp)
+        raise
+    return Snapshot(buffer)
+
+
+@contextmanager
+def exclusive(path):
+    """Межпроцессная блокировка пересборки снимка (без fcntl — без неё)."""
+    if fcntl is None:  # pragma: no cover
+        yield
+        return
+    with open(f"{path}.lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
@@ -1 +1,1500 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import date
+from decimal import Decimal
+from importlib import import_module
+from io import StringIO
+from unittest import addModuleCleanup, mock, skipUnless
 
+import brotli
+from api import async_views, invalidation, pagination, singleflight, snapshot, warmup
+from api.caching import get_recipe_short
+from api.catalog import VERSION_CACHE_KEY, IngredientCatalog
+from api.fast_serializers import RECIPE_FIELDS, recipe_rows, serialize_recipes
+from api.serializers import RecipeSerializer
+from api.views import RecipeViewSet
+from asgiref.sync import async_to_sync
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser, update_last_login
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.db.models import F
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from recipes import feed, matcher, shortlinks
+from recipes.models import (
+    Favourite,
+    Ingredient,
+    MealPlanEntry,
+    Recipe,
+    RecipeIngredientsRelated,
+    RecipeSimilarity,
+    ShoppingList,
+    ShoppingListTotal,
+    ShortLink,
+    TimelineEntry,
+    UnitConversion,
+)
+from recipes.signals import recipe_ingredients_changed
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+from users.models import Subscription
+
+User = get_user_model()
+
+
+def setUpModule():
+    # Загруженные в тестах картинки — во временный каталог, не в media/.
+    media_root = tempfile.mkdtemp()
+    addModuleCleanup(shutil.rmtree, media_root, ignore_errors=True)
+    override = override_settings(MEDIA_ROOT=media_root)
+    override.enable()
+    addModuleCleanup(override.disable)
+
+
+class FastRecipeSerializerTests(TestCase):
+    """Быстрый путь чтения рецептов побайтно совпадает с RecipeSerializer."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username="author",
+            email="author@example.com",
+            password="pass",
+            first_name="Автор",
+            last_name="Рецептов",
+            avatar="avatars/author.png",
+        )
+        cls.reader = User.objects.create_user(
+            username="reader", email="reader@example.com", password="pass"
+        )
+        Subscription.objects.create(user=cls.reader, author=cls.author)
+        salt, milk, flour = Ingredient.objects.bulk_create(
+            [
+                Ingredient(name="соль", measurement_unit="г"),
+                Ingredient(name="молоко", measurement_unit="мл"),
+                Ingredient(name="мука", measurement_unit="г"),
+            ]
+        )
+        pancakes = Recipe.objects.create(
+            author=cls.author,
+            name="Блины",
+            image="recipes/images/pancakes.png",
+            text="Смешать и пожарить",
+            cooking_time=30,
+        )
+        bread = Recipe.objects.create(
+            author=cls.reader,
+            name="Хлеб",
+            image="recipes/images/bread.png",
+            text="Испечь",
+            cooking_time=90,
+        )
+        Recipe.objects.create(
+            author=None, name="Без автора", image="", text="Нет", cooking_time=1
+        )
+        RecipeIngredientsRelated.objects.bulk_create(
+            [
+                RecipeIngredientsRelated(recipe=pancakes, ingredient=milk, amount=500),
+                RecipeIngredientsRelated(recipe=pancakes, ingredient=flour, amount=200),
+                RecipeIngredientsRelated(recipe=pancakes, ingredient=salt, amount=2),
+                RecipeIngredientsRelated(recipe=bread, ingredient=flour, amount=600),
+            ]
+        )
+        Favourite.objects.create(user=cls.reader, recipe=pancakes)
+        ShoppingList.objects.create(user=cls.reader, recipe=bread)
+
+    def assert_same_output(self, user):
+        request = APIRequestFactory().get("/api/recipes/")
+        request.user = user
+        queryset = RecipeViewSet().get_feed_queryset()
+        expected = JSONRenderer().render(
+            RecipeSerializer(queryset, many=True, context={"request": request}).data
+        )
+        actual = JSONRenderer().render(
+            serialize_recipes(recipe_rows(queryset), request, user)
+        )
+        self.assertEqual(actual, expected)
+
+    def test_anonymous(self):
+        self.assert_same_output(AnonymousUser())
+
+    def test_authenticated(self):
+        self.assert_same_output(self.reader)
+
+    def test_list_endpoint(self):
+        token = Token.objects.create(user=self.reader)
+        response = self.client.get(
+            "/api/recipes/?page=1&limit=2", HTTP_AUTHORIZATION=f"Token {token.key}"
+        )
+        request = response.wsgi_request
+        request.user = self.reader
+        queryset = RecipeViewSet().get_feed_queryset()[:2]
+        expected = RecipeSerializer(
+            queryset, many=True, context={"request": request}
+        ).data
+        self.assertEqual(
+            response.content,
+            JSONRenderer().render(
+                {
+                    "count": 3,
+                    "next": "http://testserver/api/recipes/?limit=2&page=2",
+                    "previous": None,
+                    "results": expected,
+                }
+            ),
+        )
+
+
+class PageLimitPaginationTests(TestCase):
+    """Страницы по границам из кеша совпадают с выборкой через OFFSET."""
+
+    url = "/api/recipes/"
+
+    @classmethod
+    def setUpTestData(cls):
+        Recipe.objects.bulk_create(
+            Recipe(name=f"Рецепт {number}", image="", text="Текст", cooking_time=10)
+            for number in range(7)
+        )
+
+    def setUp(self):
+        pagination.bump_version()
+
+    def expected_ids(self):
+        return list(Recipe.objects.order_by("-id").values_list("id", flat=True))
+
+    def page(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def page_ids(self, page, limit=2):
+        return [recipe["id"] for recipe in self.page(page=page, limit=limit)["results"]]
+
+    def test_login_keeps_pages(self):
+        user = User.objects.create_user(
+            username="login", email="login@example.com", password="pass"
+        )
+        version = cache.get(pagination.GLOBAL_VERSION_KEY)
+        update_last_login(None, user)
+        self.assertEqual(cache.get(pagination.GLOBAL_VERSION_KEY), version)
+
+        user.first_name = "Имя"
+        user.save(update_fields=["first_name"])
+        self.assertNotEqual(cache.get(pagination.GLOBAL_VERSION_KEY), version)
+        version = cache.get(pagination.GLOBAL_VERSION_KEY)
+        user.delete()
+        self.assertNotEqual(cache.get(pagination.GLOBAL_VERSION_KEY), version)
+
+    def test_pages_match_offset(self):
+        ids = self.expected_ids()
+        for page in range(1, 5):
+            start, end = (page - 1) * 2, page * 2
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.page_ids(page), ids[start:end])
+            if page > 1:
+                # Граница предыдущей страницы известна — без OFFSET.
+                self.assertFalse(
+                    any("OFFSET" in query["sql"] for query in queries.captured_queries)
+                )
+        pagination.bump_version()
+        self.assertEqual(self.page_ids(3), ids[4:6])
+        self.assertEqual(self.page(page=4, limit=2)["next"], None)
+
+    def test_out_of_range(self):
+        self.assertEqual(
+            self.client.get(self.url, {"page": 5, "limit": 2}).status_code, 404
+        )
+        self.assertEqual(self.client.get(self.url, {"page": 0}).status_code, 404)
+
+    def test_create_and_delete_reset_pages(self):
+        for page in range(1, 4):
+            self.page_ids(page)
+        Recipe.objects.create(name="Новый", image="", text="Текст", cooking_time=5)
+        ids = self.expected_ids()
+        self.assertEqual(self.page(page=1, limit=2)["count"], 8)
+        self.assertEqual(self.page_ids(2), ids[2:4])
+        self.assertEqual(self.page_ids(3), ids[4:6])
+        Recipe.objects.get(pk=ids[3]).delete()
+        ids = self.expected_ids()
+        self.assertEqual(self.page(page=1, limit=2)["count"], 7)
+        self.assertEqual(self.page_ids(2), ids[2:4])
+        self.assertEqual(self.page_ids(3), ids[4:6])
+
+    def test_offset_delegates_to_limit_offset(self):
+        ids = self.expected_ids()
+        data = self.page(offset=2, limit=3)
+        self.assertEqual([recipe["id"] for recipe in data["results"]], ids[2:5])
+        self.assertEqual(data["count"], 7)
+        self.assertIn("offset=5", data["next"])
+        self.assertNotIn("offset", data["previous"])
+
+
+@override_settings(REQUEST_METRICS=True, INGREDIENT_SNAPSHOT=False)
+class MetricsTests(TestCase):
+    """Метрики отдаются только staff."""
+
+    def setUp(self):
+        patcher = mock.patch("api.middleware.logger")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, user=None):
+        headers = {}
+        if user is not None:
+            token = Token.objects.create(user=user)
+            headers["HTTP_AUTHORIZATION"] = f"Token {token.key}"
+        return self.client.get("/api/metrics", **headers)
+
+    def test_anonymous_denied(self):
+        self.assertEqual(self.get().status_code, 401)
+
+    def test_user_denied(self):
+        user = User.objects.create_user(
+            username="user", email="user@example.com", password="pass"
+        )
+        self.assertEqual(self.get(user).status_code, 403)
+
+    def test_staff_allowed(self):
+        staff = User.objects.create_user(
+            username="staff", email="staff@example.com", password="pass", is_staff=True
+        )
+        self.client.get("/api/ingredients/")
+        response = self.get(staff)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        self.assertIn(b"foodgram_response_wire_size_bytes", response.content)
+
+
+class ConditionalGetTests(TestCase):
+    """Повторный GET с If-None-Match получает 304, изменение — новый ETag."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.recipe = Recipe.objects.create(
+            name="Каша", image="", text="Сварить", cooking_time=20
+        )
+        Ingredient.objects.create(name="овсянка", measurement_unit="г")
+
+    def test_recipe_not_modified(self):
+        url = f"/api/recipes/{self.recipe.id}/"
+        etag = self.client.get(url)["ETag"]
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(response.content, b"")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH='"other"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_recipe_update_changes_etag(self):
+        url = f"/api/recipes/{self.recipe.id}/"
+        etag = self.client.get(url)["ETag"]
+        self.recipe.name = "Овсяная каша"
+        self.recipe.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.json()["name"], "Овсяная каша")
+
+    @override_settings(INGREDIENT_SNAPSHOT=False)
+    def test_catalog_not_modified(self):
+        etag = self.client.get("/api/ingredients/")["ETag"]
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/ingredients/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+
+class InvalidationBusTests(TestCase):
+    """События шины от других процессов чистят локальный кеш."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.recipe = Recipe.objects.create(
+            name="Суп", image="", text="Сварить", cooking_time=40
+        )
+
+    def dispatch(self, origin):
+        invalidation.dispatch(
+            json.dumps(
+                {
+                    "event": "recipe",
+                    "origin": origin,
+                    "recipe_id": self.recipe.id,
+                    "deleted": False,
+                }
+            )
+        )
+
+    def test_foreign_event_evicts(self):
+        get_recipe_short(self.recipe.id)
+        Recipe.objects.filter(pk=self.recipe.id).update(name="Борщ")
+        self.dispatch(invalidation.origin())
+        self.assertEqual(get_recipe_short(self.recipe.id)["name"], "Суп")
+        self.dispatch("other-host:1")
+        self.assertEqual(get_recipe_short(self.recipe.id)["name"], "Борщ")
+
+    def test_malformed_event_ignored(self):
+        with self.assertLogs("api.invalidation", "WARNING"):
+            invalidation.dispatch("not json")
+
+    def test_toggle_announces_user_pages(self):
+        user = User.objects.create_user(
+            username="eater", email="eater@example.com", password="pass"
+        )
+        auth = {"HTTP_AUTHORIZATION": f"Token {Token.objects.create(user=user).key}"}
+        url = f"/api/recipes/{self.recipe.id}/favorite/"
+        event = mock.call("user_pages", user_id=user.id)
+        for method, path, data, code in (
+            ("post", url, None, 201),
+            ("delete", url, None, 204),
+            ("post", "/api/recipes/shopping_cart/bulk/", [self.recipe.id], 200),
+        ):
+            with mock.patch.object(invalidation, "publish") as publish:
+                response = getattr(self.client, method)(
+                    path,
+                    data and {"recipes": data},
+                    content_type="application/json",
+                    **auth,
+                )
+            self.assertEqual(response.status_code, code)
+            self.assertIn(event, publish.call_args_list)
+
+
+@skipUnless(connection.vendor == "postgresql", "LISTEN/NOTIFY — только PostgreSQL")
+class InvalidationListenerTests(TransactionTestCase):
+    def test_listener_receives_notify(self):
+        received = threading.Event()
+        invalidation.handler("test")(lambda: received.set())
+        listener = invalidation.Listener()
+        listener.start()
+        try:
+            for _ in range(50):
+                if listener.connected:
+                    break
+                received.wait(0.1)
+            invalidation.notify(json.dumps({"event": "test", "origin": "other:1"}))
+            self.assertTrue(received.wait(10))
+        finally:
+            listener.stop()
+            listener.join()
+            invalidation.handlers.pop("test")
+
+
+class SingleFlightTests(TestCase):
+    """Промах кеша пересчитывает один поток, остальные ждут или берут старое."""
+
+    key = "tests:singleflight"
+
+    def setUp(self):
+        self.calls = 0
+        self.addCleanup(cache.delete, self.key)
+
+    def compute(self):
+        self.calls += 1
+        time.sleep(0.1)
+        return self.calls
+
+    def run_concurrently(self, count=10):
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    singleflight.cached(self.key, self.compute, 60)
+                )
+            )
+            for _ in range(count)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_miss_computed_once(self):
+        self.assertEqual(self.run_concurrently(), [1] * 10)
+        self.assertEqual(self.calls, 1)
+
+    def test_stale_served_while_recomputing(self):
+        cache.set(self.key, (time.time() - 1, 0), 60)
+        self.assertEqual(sorted(self.run_concurrently()), [0] * 9 + [1])
+        self.assertEqual(singleflight.cached(self.key, self.compute, 60), 1)
+
+
+class IngredientCatalogTests(TestCase):
+    """Снимок справочника собирается один раз и общий для процессов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.bulk_create(
+            [
+                Ingredient(name="молоко", measurement_unit="мл"),
+                Ingredient(name="мука", measurement_unit="г"),
+                Ingredient(name="соль", measurement_unit="г"),
+            ]
+        )
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        override = override_settings(
+            INGREDIENT_SNAPSHOT=True,
+            INGREDIENT_SNAPSHOT_PATH=os.path.join(directory.name, "ingredients"),
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        cache.delete(VERSION_CACHE_KEY)
+        self.addCleanup(cache.delete, VERSION_CACHE_KEY)
+
+    def test_cold_process_reuses_snapshot(self):
+        with mock.patch.object(snapshot, "write", wraps=snapshot.write) as write:
+            version, bodies, _ = IngredientCatalog().current()
+            # Второй процесс: свой пустой кеш и свой объект справочника.
+            cache.delete(VERSION_CACHE_KEY)
+            with self.assertNumQueries(0):
+                state = IngredientCatalog().current()
+        self.assertEqual(write.call_count, 1)
+        self.assertEqual(state[0], version)
+        self.assertEqual(bytes(state[1][None]), bytes(bodies[None]))
+
+    def test_foreign_snapshot_ignored(self):
+        path = settings.INGREDIENT_SNAPSHOT_PATH
+        rows = [{"id": 1, "name": "чужой", "measurement_unit": "г"}]
+        snapshot.write(path, snapshot.pack(1, b"otherdb!", rows, {None: b"[]"}))
+        state = IngredientCatalog().current()
+        self.assertNotEqual(state[0], 1)
+        self.assertEqual(state[2].search("чуж"), [])
+        self.assertEqual(len(json.loads(bytes(state[1][None]))), 3)
+
+    def test_refresh_writes_new_version(self):
+        catalog = IngredientCatalog()
+        version = catalog.current()[0]
+        Ingredient.objects.create(name="сахар", measurement_unit="г")
+        catalog.refresh()
+        cache.delete(VERSION_CACHE_KEY)
+        state = IngredientCatalog().current()
+        self.assertNotEqual(state[0], version)
+        self.assertEqual(state[2].search("сах")[0]["name"], "сахар")
+
+    def test_snapshot_lookup(self):
+        found = IngredientCatalog().snapshot()
+        milk = Ingredient.objects.get(name="молоко")
+        self.assertEqual(
+            found.get(milk.id),
+            {"id": milk.id, "name": "молоко", "measurement_unit": "мл"},
+        )
+        self.assertIsNone(found.get(0))
+        self.assertEqual([row["name"] for row in found.search("МУ")], ["мука"])
+        self.assertEqual(found.search("хлеб"), [])
+        self.assertEqual(
+            json.loads(bytes(found.bodies[None])),
+            list(Ingredient.objects.values("id", "name", "measurement_unit")),
+        )
+
+
+class ToggleUserRecipeTests(TestCase):
+    """Избранное и корзина: коды ответов и повторные запросы."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="cook", email="cook@example.com", password="pass"
+        )
+        cls.recipe = Recipe.objects.create(
+            name="Омлет", image="", text="Взбить", cooking_time=10
+        )
+
+    def setUp(self):
+        token = Token.objects.create(user=self.user)
+        self.client.defaults["HTTP_AUTHORIZATION"] = f"Token {token.key}"
+
+    def test_toggle(self):
+        for action, model in (("favorite", Favourite), ("shopping_cart", ShoppingList)):
+            url = f"/api/recipes/{self.recipe.id}/{action}/"
+            response = self.client.post(url)
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(
+                response.json(),
+                {
+                    "id": self.recipe.id,
+                    "name": "Омлет",
+                    "image": None,
+                    "cooking_time": 10,
+                },
+            )
+            response = self.client.post(url)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("errors", response.json())
+            self.assertEqual(
+                model.objects.filter(user=self.user, recipe=self.recipe).count(), 1
+            )
+            self.assertEqual(self.client.delete(url).status_code, 204)
+            self.assertEqual(self.client.delete(url).status_code, 400)
+            self.assertFalse(model.objects.filter(user=self.user).exists())
+
+    def test_missing_recipe(self):
+        for url in ("/api/recipes/0/favorite/", "/api/recipes/abc/shopping_cart/"):
+            self.assertEqual(self.client.post(url).status_code, 404)
+            self.assertEqual(self.client.delete(url).status_code, 404)
+
+    def test_anonymous(self):
+        del self.client.defaults["HTTP_AUTHORIZATION"]
+        url = f"/api/recipes/{self.recipe.id}/favorite/"
+        self.assertEqual(self.client.post(url).status_code, 401)
+
+
+class BulkUserRecipesTests(TestCase):
+    """Пакетное избранное и корзина: статус по каждому id."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="planner", email="planner@example.com", password="pass"
+        )
+        cls.soup, cls.salad, cls.tea = Recipe.objects.bulk_create(
+            Recipe(name=name, image="", text="Текст", cooking_time=5)
+            for name in ("Суп", "Салат", "Чай")
+        )
+        cls.water = Ingredient.objects.create(name="вода", measurement_unit="мл")
+        RecipeIngredientsRelated.objects.create(
+            recipe=cls.soup, ingredient=cls.water, amount=700
+        )
+
+    def setUp(self):
+        token = Token.objects.create(user=self.user)
+        self.client.defaults["HTTP_AUTHORIZATION"] = f"Token {token.key}"
+
+    def bulk(self, method, action, recipes):
+        response = getattr(self.client, method)(
+            f"/api/recipes/{action}/bulk/",
+            {"recipes": recipes},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        return {item["id"]: item["status"] for item in response.json()["recipes"]}
+
+    def test_favorites(self):
+        self.assertEqual(
+            self.bulk(
+                "post", "favorite", [self.soup.id, self.salad.id, 999999, self.soup.id]
+            ),
+            {self.soup.id: "added", self.salad.id: "added", 999999: "not_found"},
+        )
+        self.assertEqual(
+            self.bulk("post", "favorite", [self.soup.id, self.tea.id]),
+            {self.soup.id: "exists", self.tea.id: "added"},
+        )
+        self.assertEqual(
+            self.bulk("delete", "favorite", [self.salad.id, self.salad.id, 999999]),
+            {self.salad.id: "removed", 999999: "not_found"},
+        )
+        self.assertEqual(
+            self.bulk("delete", "favorite", [self.salad.id]), {self.salad.id: "missing"}
+        )
+        self.assertEqual(
+            set(
+                Favourite.objects.filter(user=self.user).values_list(
+                    "recipe_id", flat=True
+                )
+            ),
+            {self.soup.id, self.tea.id},
+        )
+
+    def test_shopping_cart_updates_totals(self):
+        self.bulk("post", "shopping_cart", [self.soup.id, self.salad.id])
+        self.assertEqual(
+            list(
+                ShoppingListTotal.objects.filter(user=self.user).values_list(
+                    "ingredient_id", "amount"
+                )
+            ),
+            [(self.water.id, 700)],
+        )
+        self.bulk("delete", "shopping_cart", [self.soup.id])
+        self.assertFalse(
+            ShoppingListTotal.objects.filter(user=self.user, amount__gt=0).exists()
+        )
+
+    def test_invalid_payload(self):
+        for recipes in ([], ["abc"], [0], list(range(1, 502))):
+            response = self.client.post(
+                "/api/recipes/favorite/bulk/",
+                {"recipes": recipes},
+                content_type="application/json",
+            )
+            self.assertEqual(response.status_code, 400, recipes[:3])
+
+
+class SparseFieldsetTests(TestCase):
+    """?fields= и ?omit= сужают ответ и выборку; неизвестное поле — 400."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="chef", email="chef@example.com", password="pass"
+        )
+        cls.recipe = Recipe.objects.create(
+            author=cls.user, name="Плов", image="", text="Тушить", cooking_time=90
+        )
+        RecipeIngredientsRelated.objects.create(
+            recipe=cls.recipe,
+            ingredient=Ingredient.objects.create(name="рис", measurement_unit="г"),
+            amount=300,
+        )
+
+    def test_recipe_list_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/recipes/", {"fields": "name,id"})
+        self.assertEqual(
+            response.json()["results"], [{"id": self.recipe.id, "name": "Плов"}]
+        )
+        table = RecipeIngredientsRelated._meta.db_table
+        self.assertFalse(
+            any(table in query["sql"] for query in queries.captured_queries)
+        )
+
+    def test_recipe_detail_omit(self):
+        response = self.client.get(
+            f"/api/recipes/{self.recipe.id}/", {"omit": "text,ingredients"}
+        )
+        self.assertEqual(
+            list(response.json()),
+            [name for name in RECIPE_FIELDS if name not in ("text", "ingredients")],
+        )
+
+    def test_fields_and_omit(self):
+        response = self.client.get(
+            f"/api/recipes/{self.recipe.id}/",
+            {"fields": "id,name,author", "omit": "author"},
+        )
+        self.assertEqual(response.json(), {"id": self.recipe.id, "name": "Плов"})
+
+    def test_user_fields(self):
+        response = self.client.get(
+            f"/api/users/{self.user.id}/", {"fields": "id,username"}
+        )
+        self.assertEqual(response.json(), {"id": self.user.id, "username": "chef"})
+        token = Token.objects.create(user=self.user)
+        response = self.client.get(
+            "/api/users/me/",
+            {"omit": "avatar,is_subscribed"},
+            HTTP_AUTHORIZATION=f"Token {token.key}",
+        )
+        self.assertNotIn("avatar", response.json())
+        self.assertEqual(response.json()["email"], "chef@example.com")
+
+    def test_unknown_field(self):
+        for url, params, name in (
+            ("/api/recipes/", {"fields": "id,calories"}, "calories"),
+            (f"/api/recipes/{self.recipe.id}/", {"omit": "calories"}, "calories"),
+            ("/api/users/", {"fields": "password"}, "password"),
+        ):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 400, url)
+            self.assertIn(name, response.json()["detail"])
+
+
+@override_settings(
+    RESPONSE_COMPRESSION=True,
+    RESPONSE_COMPRESSION_ENCODINGS=["br", "gzip"],
+    INGREDIENT_SNAPSHOT=False,
+)
+class CompressionTests(TestCase):
+    """Сжатие JSON по Accept-Encoding с порогом по размеру."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.long = Recipe.objects.create(
+            name="Щи", image="", text="Варить долго. " * 200, cooking_time=120
+        )
+        cls.short = Recipe.objects.create(
+            name="Тост", image="", text="Поджарить", cooking_time=2
+        )
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f"ингредиент {number}", measurement_unit="г")
+            for number in range(100)
+        )
+
+    def get(self, url, accept_encoding):
+        return self.client.get(url, HTTP_ACCEPT_ENCODING=accept_encoding)
+
+    def decompress(self, response):
+        encoding = response.get("Content-Encoding")
+        if encoding == "br":
+            return brotli.decompress(response.content)
+        if encoding == "gzip":
+            return gzip.decompress(response.content)
+        return response.content
+
+    def test_negotiation(self):
+        url = f"/api/recipes/{self.long.id}/"
+        identity = self.get(url, "identity")
+        self.assertFalse(identity.has_header("Content-Encoding"))
+        for accept, expected in (
+            ("gzip, br", "br"),
+            ("gzip", "gzip"),
+            ("br;q=0, gzip;q=0.5", "gzip"),
+            ("*", "br"),
+            ("gzip;q=0", None),
+        ):
+            response = self.get(url, accept)
+            self.assertEqual(response.get("Content-Encoding"), expected, accept)
+            self.assertEqual(self.decompress(response), identity.content)
+            self.assertIn("Accept-Encoding", response["Vary"])
+        # Сжатое тело не равно исходному побайтно — ETag слабый.
+        self.assertEqual(self.get(url, "gzip")["ETag"], "W/" + identity["ETag"])
+
+    def test_small_response_not_compressed(self):
+        response = self.get(f"/api/recipes/{self.short.id}/", "gzip, br")
+        self.assertLess(len(response.content), 1024)
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_precompressed_catalog(self):
+        identity = self.get("/api/ingredients/", "identity")
+        for encoding in ("br", "gzip"):
+            response = self.get("/api/ingredients/", encoding)
+            self.assertEqual(response["Content-Encoding"], encoding)
+            self.assertEqual(self.decompress(response), identity.content)
+            self.assertNotEqual(response["ETag"], identity["ETag"])
+
+
+class HealthCheckTests(TestCase):
+    """Пробы /healthz и /readyz и переходы состояния прогрева."""
+
+    def setUp(self):
+        for name, value in (
+            ("state", "idle"),
+            ("database_check", warmup.DatabaseCheck()),
+            ("connections", mock.Mock()),
+        ):
+            patcher = mock.patch.object(warmup, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def probe(self, path):
+        response = self.client.get(path)
+        return response.status_code, response.json()["status"]
+
+    def test_healthz_always_ok(self):
+        warmup.state = "warming"
+        with self.assertNumQueries(0):
+            self.assertEqual(self.probe("/healthz"), (200, "ok"))
+
+    def test_readyz_states(self):
+        self.assertEqual(self.probe("/readyz"), (200, "ok"))
+        warmup.state = "warming"
+        self.assertEqual(self.probe("/readyz"), (503, "warming"))
+
+    def test_readyz_database_unavailable(self):
+        with mock.patch.object(
+            warmup.connection, "cursor", side_effect=DatabaseError
+        ) as cursor:
+            self.assertEqual(self.probe("/readyz"), (503, "database unavailable"))
+            # Результат проверки БД переиспользуется в пределах интервала.
+            self.assertEqual(self.probe("/readyz"), (503, "database unavailable"))
+        self.assertEqual(cursor.call_count, 1)
+
+    def test_warm_up(self):
+        seen = []
+
+        def step():
+            seen.append(self.probe("/readyz"))
+
+        def broken():
+            raise RuntimeError
+
+        steps = (("first", step), ("broken", broken), ("last", step))
+        progress = mock.Mock()
+        with mock.patch.object(warmup, "STEPS", steps), self.assertLogs(
+            "api.warmup", "ERROR"
+        ):
+            timings = warmup.warm_up(progress)
+        self.assertEqual(list(timings), ["first", "broken", "last"])
+        self.assertEqual(progress.call_count, 3)
+        self.assertEqual(seen, [(503, "warming")] * 2)
+        self.assertEqual(warmup.state, "ready")
+        self.assertEqual(self.probe("/readyz"), (200, "ok"))
+
+    @override_settings(INGREDIENT_SNAPSHOT=False, WARMUP_FEED_PAGES=1)
+    def test_warm_up_steps(self):
+        Recipe.objects.create(name="Блины", image="", text="Пожарить", cooking_time=20)
+        with self.assertNoLogs("api.warmup", "ERROR"):
+            warmup.warm_up()
+        self.assertEqual(warmup.state, "ready")
+
+
+class ShortLinkTests(TestCase):
+    """Коды коротких ссылок, редирект и get-link."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.recipe = Recipe.objects.create(
+            name="Борщ", image="", text="Сварить", cooking_time=60
+        )
+
+    def setUp(self):
+        shortlinks.cache.clear()
+
+    def test_codes_unique(self):
+        codes = {shortlinks.code_for(recipe_id) for recipe_id in range(1, 20001)}
+        self.assertEqual(len(codes), 20000)
+        self.assertEqual({len(code) for code in codes}, {6})
+        self.assertEqual(len(shortlinks.code_for(shortlinks.MODULUS)), 7)
+        self.assertNotIn(shortlinks.code_for(shortlinks.MODULUS), codes)
+
+    def test_resolve(self):
+        code = shortlinks.get_code(self.recipe.id)
+        self.assertEqual(code, shortlinks.code_for(self.recipe.id))
+        self.assertEqual(shortlinks.resolve(code), self.recipe.id)
+        self.assertIsNone(shortlinks.resolve("zzzzzz"))
+        self.assertIsNone(shortlinks.get_code(0))
+        self.recipe.delete()
+        self.assertIsNone(shortlinks.resolve(code))
+        self.assertFalse(ShortLink.objects.filter(code=code).exists())
+
+    def test_preload_fits_local_cache(self):
+        recipes = Recipe.objects.bulk_create(
+            Recipe(name=f"Рецепт {number}", image="", text="Текст", cooking_time=5)
+            for number in range(30)
+        )
+        ShortLink.objects.bulk_create(
+            ShortLink(code=shortlinks.code_for(recipe.id), recipe=recipe)
+            for recipe in recipes
+        )
+        small = {
+            **settings.CACHES,
+            "shortlinks": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                "LOCATION": "tests-shortlinks",
+                "OPTIONS": {"MAX_ENTRIES": 40},
+            },
+        }
+        with override_settings(CACHES=small):
+            self.addCleanup(shortlinks.cache.clear)
+            shortlinks.preload(1000)
+            keys = [shortlinks.RECIPE_CACHE_KEY.format(recipe.id) for recipe in recipes]
+            cached = shortlinks.cache.get_many(keys)
+        # 40 записей — 10 ссылок прогрева и место для остальных.
+        self.assertEqual(len(cached), 10)
+        self.assertEqual(
+            set(cached),
+            {shortlinks.RECIPE_CACHE_KEY.format(r.id) for r in recipes[-10:]},
+        )
+
+    def test_redirect(self):
+        code = shortlinks.code_for(self.recipe.id)
+        shortlinks.cache.clear()
+        response = self.client.get(f"/s/{code}/")
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response["Location"], f"/recipes/{self.recipe.id}/")
+        self.assertEqual(self.client.get("/s/zzzzzz/").status_code, 404)
+
+    def test_get_link(self):
+        response = self.client.get(f"/api/recipes/{self.recipe.id}/get-link/")
+        self.assertEqual(response.status_code, 200)
+        code = shortlinks.code_for(self.recipe.id)
+        self.assertEqual(
+            response.json(), {"short-link": f"http://testserver/s/{code}/"}
+        )
+        for pk in (0, "abc"):
+            response = self.client.get(f"/api/recipes/{pk}/get-link/")
+            self.assertEqual(response.status_code, 404)
+
+
+class RecipeMatcherTests(TestCase):
+    """Подбор рецептов по кладовой: порядок, max_missing и обновление индекса."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.egg, cls.milk, cls.flour, cls.sugar = Ingredient.objects.bulk_create(
+            Ingredient(name=name, measurement_unit="г")
+            for name in ("яйцо", "молоко", "мука", "сахар")
+        )
+        cls.omelette, cls.pancakes, cls.cake, cls.scramble, cls.candy = (
+            Recipe.objects.bulk_create(
+                Recipe(name=name, image="", text="Текст", cooking_time=10)
+                for name in ("Омлет", "Блины", "Торт", "Болтунья", "Леденец")
+            )
+        )
+        compositions = {
+            cls.omelette: (cls.egg, cls.milk),
+            cls.pancakes: (cls.egg, cls.milk, cls.flour),
+            cls.cake: (cls.egg, cls.flour, cls.sugar),
+            cls.scramble: (cls.egg, cls.flour),
+            cls.candy: (cls.sugar,),
+        }
+        RecipeIngredientsRelated.objects.bulk_create(
+            RecipeIngredientsRelated(recipe=recipe, ingredient=ingredient, amount=1)
+            for recipe, ingredients in compositions.items()
+            for ingredient in ingredients
+        )
+
+    def setUp(self):
+        # Индекс процесса мог остаться от других тестов с другой БД.
+        matcher.RecipeMatcher.bump_version()
+
+    def match(self, pantry, **kwargs):
+        return matcher.index.match([item.id for item in pantry], **kwargs)
+
+    def test_ranking(self):
+        self.assertEqual(
+            self.match([self.egg, self.milk]),
+            [
+                (self.omelette.id, 2, 2),
+                (self.pancakes.id, 2, 3),
+                (self.scramble.id, 1, 2),
+                (self.cake.id, 1, 3),
+            ],
+        )
+
+    def test_max_missing(self):
+        self.assertEqual(
+            [recipe_id for recipe_id, _, _ in self.match([self.egg], max_missing=1)],
+            # Равные по доле — новые рецепты выше.
+            [self.scramble.id, self.omelette.id],
+        )
+        self.assertEqual(
+            self.match([self.egg, self.milk], limit=1, max_missing=0),
+            [(self.omelette.id, 2, 2)],
+        )
+
+    def test_index_follows_changes(self):
+        matcher.index.load()
+        RecipeIngredientsRelated.objects.create(
+            recipe=self.candy, ingredient=self.milk, amount=1
+        )
+        recipe_ingredients_changed.send(sender=Recipe, recipe_id=self.candy.id)
+        self.assertIn((self.candy.id, 2, 2), self.match([self.milk, self.sugar]))
+        self.omelette.delete()
+        self.assertNotIn(
+            self.omelette.id,
+            [recipe_id for recipe_id, _, _ in self.match([self.egg, self.milk])],
+        )
+
+    def test_evicted_version_rebuilds(self):
+        matcher.index.load()
+        # Изменение в другом процессе, а версия вытеснена из кеша.
+        RecipeIngredientsRelated.objects.create(
+            recipe=self.candy, ingredient=self.egg, amount=1
+        )
+        cache.delete(matcher.VERSION_CACHE_KEY)
+        self.assertIn((self.candy.id, 1, 2), self.match([self.egg]))
+
+    def test_endpoint(self):
+        response = self.client.get(
+            "/api/recipes/match/",
+            {"ingredients": f"{self.egg.id},{self.milk.id}", "max_missing": 0},
+        )
+        self.assertEqual(response.status_code, 200)
+        [recipe] = response.json()
+        self.assertEqual(recipe["id"], self.omelette.id)
+        self.assertEqual(
+            (recipe["matched_ingredients"], recipe["total_ingredients"]), (2, 2)
+        )
+        self.assertEqual(self.client.get("/api/recipes/match/").status_code, 400)
+
+
+class AsyncReadViewTests(TestCase):
+    """Асинхронные вьюхи отвечают так же, как синхронные вьюсеты DRF."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="async", email="async@example.com", password="pass"
+        )
+        cls.token = Token.objects.create(user=cls.user)
+        inactive = User.objects.create_user(
+            username="inactive",
+            email="inactive@example.com",
+            password="pass",
+            is_active=False,
+        )
+        cls.inactive_token = Token.objects.create(user=inactive)
+        cls.recipe = Recipe.objects.create(
+            author=cls.user, name="Суп", image="", text="Текст", cooking_time=10
+        )
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def compare(self, view, path, authorization=None, **kwargs):
+        headers = {} if authorization is None else {"authorization": authorization}
+        expected = self.client.get(path, headers=headers)
+        request = self.factory.get(path, headers=headers)
+        response = async_to_sync(view)(request, **kwargs)
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(json.loads(response.content), expected.json())
+        self.assertEqual(
+            response.get("WWW-Authenticate"), expected.get("WWW-Authenticate")
+        )
+        return response
+
+    def test_invalid_token(self):
+        for authorization in ("Token wrong", "Token", "Token a b"):
+            with self.subTest(authorization=authorization):
+                response = self.compare(
+                    async_views.user_me, "/api/users/me/", authorization
+                )
+                self.assertEqual(response.status_code, 401)
+                self.assertEqual(response["WWW-Authenticate"], "Token")
+                self.compare(async_views.recipe_list, "/api/recipes/", authorization)
+                self.compare(
+                    async_views.recipe_detail,
+                    f"/api/recipes/{self.recipe.id}/",
+                    authorization,
+                    pk=self.recipe.id,
+                )
+
+    def test_inactive_user(self):
+        authorization = f"Token {self.inactive_token.key}"
+        response = self.compare(async_views.user_me, "/api/users/me/", authorization)
+        self.assertEqual(response.status_code, 401)
+        self.compare(async_views.recipe_list, "/api/recipes/", authorization)
+
+    def test_me(self):
+        self.compare(async_views.user_me, "/api/users/me/")
+        response = self.compare(
+            async_views.user_me, "/api/users/me/", f"token {self.token.key}"
+        )
+        self.assertEqual(json.loads(response.content)["id"], self.user.id)
+        Subscription.objects.create(user=self.user, author=self.user)
+        response = self.compare(
+            async_views.user_me, "/api/users/me/", f"Token {self.token.key}"
+        )
+        self.assertIs(json.loads(response.content)["is_subscribed"], True)
+
+    def test_recipes_with_token(self):
+        authorization = f"Token {self.token.key}"
+        self.compare(async_views.recipe_list, "/api/recipes/", authorization)
+        self.compare(
+            async_views.recipe_detail,
+            f"/api/recipes/{self.recipe.id}/",
+            authorization,
+            pk=self.recipe.id,
+        )
+
+
+class MealPlanTests(TestCase):
+    """План питания поддерживает суммы ShoppingListTotal и сводный список."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="planner", email="planner@example.com", password="pass"
+        )
+        cls.token = Token.objects.create(user=cls.user)
+        cls.flour, cls.egg = Ingredient.objects.bulk_create(
+            [
+                Ingredient(name="мука", measurement_unit="г"),
+                Ingredient(name="яйцо", measurement_unit="шт"),
+            ]
+        )
+        cls.soup, cls.bread = Recipe.objects.bulk_create(
+            Recipe(name=name, image="", text="Текст", cooking_time=10)
+            for name in ("Суп", "Хлеб")
+        )
+        RecipeIngredientsRelated.objects.bulk_create(
+            [
+                RecipeIngredientsRelated(
+                    recipe=cls.soup, ingredient=cls.flour, amount=100
+                ),
+                RecipeIngredientsRelated(recipe=cls.soup, ingredient=cls.egg, amount=2),
+                RecipeIngredientsRelated(
+                    recipe=cls.bread, ingredient=cls.flour, amount=200
+                ),
+            ]
+        )
+
+    def setUp(self):
+        self.client.defaults["HTTP_AUTHORIZATION"] = f"Token {self.token.key}"
+
+    def totals(self):
+        return {
+            (row.day and row.day.isoformat(), row.ingredient_id): row.amount
+            for row in ShoppingListTotal.objects.filter(user=self.user)
+        }
+
+    def test_entry_updates_totals(self):
+        response = self.client.post(
+            "/api/meal-plan/",
+            {"recipe": self.soup.id, "day": "2026-10-20", "servings": "2"},
+        )
+        self.assertEqual(response.status_code, 201)
+        entry = response.json()["id"]
+        self.assertEqual(
+            self.totals(),
+            {("2026-10-20", self.flour.id): 200, ("2026-10-20", self.egg.id): 4},
+        )
+
+        url = f"/api/meal-plan/{entry}/"
+        response = self.client.patch(
+            url, {"servings": "1.5"}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.totals(),
+            {("2026-10-20", self.flour.id): 150, ("2026-10-20", self.egg.id): 3},
+        )
+
+        response = self.client.patch(
+            url, {"day": "2026-10-21"}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.totals(),
+            {("2026-10-21", self.flour.id): 150, ("2026-10-21", self.egg.id): 3},
+        )
+
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertEqual(self.totals(), {})
+
+    def test_shopping_list(self):
+        ShoppingList.objects.create(user=self.user, recipe=self.bread)
+        MealPlanEntry.objects.create(
+            user=self.user, recipe=self.soup, day=date(2026, 10, 20), servings=2
+        )
+
+        def amounts(**params):
+            response = self.client.get("/api/meal-plan/shopping-list/", params)
+            self.assertEqual(response.status_code, 200)
+            return {
+                item["name"]: Decimal(str(item["amount"]))
+                for item in response.json()["ingredients"]
+            }
+
+        period = {"start": "2026-10-20", "end": "2026-10-26"}
+        self.assertEqual(amounts(**period), {"мука": 400, "яйцо": 4})
+        self.assertEqual(amounts(**period, cart="0"), {"мука": 200, "яйцо": 4})
+        self.assertEqual(amounts(start="2026-10-21"), {"мука": 200})
+        response = self.client.get(
+            "/api/meal-plan/shopping-list/",
+            {"start": "2026-10-22", "end": "2026-10-21"},
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class UnitConversionTests(TestCase):
+    """Канонические единицы ингредиентов и слияние строк списка покупок."""
+
+    def units(self, ingredient):
+        ingredient.refresh_from_db()
+        return ingredient.canonical_unit, ingredient.unit_factor
+
+    def test_canonical_unit_on_save(self):
+        kilograms = Ingredient.objects.create(name="сахар", measurement_unit="кг")
+        self.assertEqual(self.units(kilograms), ("г", 1000))
+        bunch = Ingredient.objects.create(name="укроп", measurement_unit="пучок")
+        self.assertEqual(self.units(bunch), ("пучок", 1))
+
+    def test_conversion_change_repoints_ingredients(self):
+        bunch = Ingredient.objects.create(name="укроп", measurement_unit="пучок")
+        sprig = Ingredient.objects.create(name="петрушка", measurement_unit="веточка")
+        conversion = UnitConversion.objects.create(
+            unit="пучок", canonical_unit="веточка", factor=10
+        )
+        self.assertEqual(self.units(bunch), ("веточка", 10))
+
+        conversion.unit = "веточка"
+        conversion.canonical_unit = "пучок"
+        conversion.factor = Decimal("0.1")
+        conversion.save()
+        self.assertEqual(self.units(bunch), ("пучок", 1))
+        self.assertEqual(self.units(sprig), ("пучок", Decimal("0.1")))
+
+        conversion.delete()
+        self.assertEqual(self.units(sprig), ("веточка", 1))
+
+    def test_migration_loads_conversions(self):
+        liters = Ingredient.objects.create(name="вода", measurement_unit="л")
+        bunch = Ingredient.objects.create(name="укроп", measurement_unit="пучок")
+        UnitConversion.objects.all().delete()
+        Ingredient.objects.update(canonical_unit="", unit_factor=1)
+        migration = import_module("recipes.migrations.0005_unit_conversion")
+        migration.load_conversions(django_apps, None)
+        self.assertEqual(self.units(liters), ("мл", 1000))
+        self.assertEqual(self.units(bunch), ("пучок", 1))
+
+    def test_download_merges_units(self):
+        user = User.objects.create_user(
+            username="buyer", email="buyer@example.com", password="pass"
+        )
+        token = Token.objects.create(user=user)
+        grams = Ingredient.objects.create(name="мука", measurement_unit="г")
+        kilograms = Ingredient.objects.create(name="мука", measurement_unit="кг")
+        pie, bread = Recipe.objects.bulk_create(
+            Recipe(name=name, image="", text="Текст", cooking_time=10)
+            for name in ("Пирог", "Хлеб")
+        )
+        RecipeIngredientsRelated.objects.bulk_create(
+            [
+                RecipeIngredientsRelated(recipe=pie, ingredient=grams, amount=250),
+                RecipeIngredientsRelated(recipe=bread, ingredient=kilograms, amount=2),
+            ]
+        )
+        ShoppingList.objects.create(user=user, recipe=pie)
+        ShoppingList.objects.create(user=user, recipe=bread)
+        response = self.client.get(
+            "/api/recipes/download_shopping_cart/",
+            HTTP_AUTHORIZATION=f"Token {token.key}",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.content.decode(), "Список покупок:\n\n- мука (2250 г)\n"
+        )
+
+
+class FeedTests(TestCase):
+    """Лента подписок: fan-out при записи, знаменитости при чтении, курсор."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader, cls.other, cls.author, cls.star = (
+            User.objects.create_user(
+                username=name, email=f"{name}@example.com", password="pass"
+            )
+            for name in ("reader", "other", "author", "star")
+        )
+        cls.token = Token.objects.create(user=cls.reader)
+
+    def setUp(self):
+        cache.delete(feed.CELEBRITIES_CACHE_KEY)
+
+    def publish(self, author, count=1):
+        return [
+            Recipe.objects.create(
+                author=author, name="Рецепт", image="", text="Текст", cooking_time=5
+            ).id
+            for _ in range(count)
+        ]
+
+    def timeline(self, user):
+        return set(
+            TimelineEntry.objects.filter(user=user).values_list("recipe_id", flat=True)
+        )
+
+    def test_fan_out_on_create(self):
+        Subscription.objects.create(user=self.reader, author=self.author)
+        ids = self.publish(self.author, 2)
+        self.assertEqual(self.timeline(self.reader), set(ids))
+        self.assertEqual(self.timeline(self.other), set())
+
+    def test_backfill_and_clear(self):
+        ids = self.publish(self.author, 2)
+        subscription = Subscription.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.timeline(self.reader), set(ids))
+        self.assertEqual(feed.page(self.reader.id, 10), sorted(ids, reverse=True))
+        subscription.delete()
+        self.assertEqual(self.timeline(self.reader), set())
+        self.assertEqual(feed.page(self.reader.id, 10), [])
+
+    @override_settings(FEED_CELEBRITY_THRESHOLD=1)
+    def test_celebrity_merged_at_read(self):
+        Subscription.objects.create(user=self.reader, author=self.author)
+        Subscription.objects.create(user=self.reader, author=self.star)
+        Subscription.objects.create(user=self.other, author=self.star)
+        self.assertEqual(feed.celebrity_ids(), {self.star.id})
+
+        author_ids = self.publish(self.author)
+        star_ids = self.publish(self.star, 2)
+        self.assertEqual(self.timeline(self.reader), set(author_ids))
+        self.assertEqual(
+            feed.page(self.reader.id, 10), sorted(author_ids + star_ids, reverse=True)
+        )
+        self.assertEqual(feed.page(self.reader.id, 2), sorted(star_ids, reverse=True))
+
+        # Автор опустился до порога — его рецепты снова в лентах.
+        Subscription.objects.get(user=self.other, author=self.star).delete()
+        self.assertEqual(feed.celebrity_ids(), set())
+        self.assertEqual(self.timeline(self.reader), set(author_ids + star_ids))
+
+    def test_cursor_pagination(self):
+        Subscription.objects.create(user=self.reader, author=self.author)
+        ids = sorted(self.publish(self.author, 5), reverse=True)
+        self.client.defaults["HTTP_AUTHORIZATION"] = f"Token {self.token.key}"
+
+        response = self.client.get("/api/recipes/feed/", {"limit": 2})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([recipe["id"] for recipe in data["results"]], ids[:2])
+        self.assertIn(f"cursor={ids[1]}", data["next"])
+
+        # Новый рецепт не сдвигает следующие страницы.
+        self.publish(self.author)
+        pages = []
+        while data["next"]:
+            data = self.client.get(data["next"]).json()
+            pages.append([recipe["id"] for recipe in data["results"]])
+        self.assertEqual(pages, [ids[2:4], ids[4:]])
+
+        self.client.defaults.pop("HTTP_AUTHORIZATION")
+        self.assertEqual(self.client.get("/api/recipes/feed/").status_code, 401)
+
+
+class RecipeFilterTests(TestCase):
+    """Фильтры списка рецептов: ингредиенты, время готовки и флаги."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="filter", email="filter@example.com", password="pass"
+        )
+        cls.token = Token.objects.create(user=cls.user)
+        cls.egg, cls.milk, cls.salt = Ingredient.objects.bulk_create(
+            Ingredient(name=name, measurement_unit="г")
+            for name in ("яйцо", "молоко", "соль")
+        )
+        cls.omelette, cls.porridge, cls.soup, cls.tea = Recipe.objects.bulk_create(
+            Recipe(name=name, image="", text="Текст", cooking_time=time)
+            for name, time in (("Омлет", 10), ("Каша", 20), ("Суп", 40), ("Чай", 60))
+        )
+        RecipeIngredientsRelated.objects.bulk_create(
+            RecipeIngredientsRelated(recipe=recipe, ingredient=ingredient, amount=1)
+            for recipe, ingredient in (
+                (cls.omelette, cls.egg),
+                (cls.omelette, cls.milk),
+                (cls.porridge, cls.milk),
+                (cls.soup, cls.egg),
+                (cls.soup, cls.salt),
+            )
+        )
+        Favourite.objects.create(user=cls.user, recipe=cls.omelette)
+        ShoppingList.objects.create(user=cls.user, recipe=cls.porridge)
+
+    def ids(self, params, authorized=True):
+        headers = {"authorization": f"Token {self.token.key}"} if authorized else {}
+        response = self.client.get(
+            "/api/recipes/", {"limit": 100, **params}, headers=headers
+        )
+        self.assertEqual(response.status_code, 200)
+        return {recipe["id"] for recipe in response.json()["results"]}
+
+    def test_ingredients_contains_all(self):
+        ingredients = f"{self.egg.id},{self.milk.id}"
+        self.assertEqual(self.ids({"ingredients": ingredients}), {self.omelette.id})
+        self.assertEqual(
+            self.ids({"ingredients": self.egg.id}), {self.omelette.id, self.soup.id}
+        )
+
+    def test_exclude_ingredients(self):
+        self.assertEqual(
+            self.ids({"exclude_ingredients": f"{self.egg.id},{self.salt.id}"}),
+            {self.porridge.id, self.tea.id},
+        )
+
+    def test_cooking_time_range(self):
+        self.assertEqual(
+            self.ids({"cooking_time_min": 15, "cooking_time_max": 40}),
+            {self.porridge.id, self.soup.id},
+        )
+
+    def test_flags(self):
+        everything = {self.omelette.id, self.porridge.id, self.soup.id, self.tea.id}
+        for value in ("1", "true", "True"):
+            with self.subTest(value=value):
+                self.assertEqual(self.ids({"is_favorited": value}), {self.omelette.id})
+                self.assertEqual(
+                    self.ids({"is_in_shopping_cart": value}), {self.porridge.id}
+                )
+        for value in ("0", "false"):
+            with self.subTest(value=value):
+                self.assertEqual(self.ids({"is_favorited": value}), everything)
+
+    def test_flags_anonymous(self):
+        everything = {self.omelette.id, self.porridge.id, self.soup.id, self.tea.id}
+        self.assertEqual(self.ids({"is_favorited": "1"}, authorized=False), everything)
+        self.assertEqual(
+            self.ids({"is_in_shopping_cart": "true"}, authorized=False), everything
+        )
+
+    def test_async_flags(self):
+        request = RequestFactory().get(
+            "/api/recipes/",
+            {"is_favorited": "true"},
+            headers={"authorization": f"Token {self.token.key}"},
+        )
+        response = async_to_sync(async_views.recipe_list)(request)
+        self.assertEqual(
+            [recipe["id"] for recipe in json.loads(response.content)["results"]],
+            [self.omelette.id],
+        )
+
+
+class RecommendationTests(TestCase):
+    """Похожие рецепты: расчёт compute_recommendations и эндпоинт."""
+
+    @classmethod
+    def setUpTestData(cls):
+        egg, milk, flour, sugar, salt = Ingredient.objects.bulk_create(
+            Ingredient(name=name, measurement_unit="г")
+            for name in ("яйцо", "молоко", "мука", "сахар", "соль")
+        )
+        cls.pancakes, cls.waffles, cls.omelette, cls.bread, cls.water = (
+            Recipe.objects.bulk_create(
+                Recipe(name=name, image="", text="Текст", cooking_time=10)
+                for name in ("Блины", "Вафли", "Омлет", "Хлеб", "Вода")
+            )
+        )
+        compositions = {
+            cls.pancakes: (egg, milk, flour),
+            cls.waffles: (egg, milk, sugar),
+            cls.omelette: (egg, salt),
+            cls.bread: (sugar, salt),
+        }
+        RecipeIngredientsRelated.objects.bulk_create(
+            RecipeIngredientsRelated(recipe=recipe, ingredient=ingredient, amount=1)
+            for recipe, ingredients in compositions.items()
+            for ingredient in ingredients
+        )
+
+    def compute(self, **options):
+        call_command("compute_recommendations", stdout=StringIO(), **options)
+
+    def similar(self, recipe):
+        return list(
+            RecipeSimilarity.objects.filter(recipe=recipe)
+            .order_by("-score")
+            .values_list("similar_id", flat=True)
+        )
+
+    def test_top_k_order(self):
+        self.compute()
+        self.assertEqual(
+            self.similar(self.pancakes), [self.waffles.id, self.omelette.id]
+        )
+        self.assertEqual(self.similar(self.bread), [self.omelette.id, self.waffles.id])
+        self.assertEqual(self.similar(self.water), [])
+        self.compute(top_k=1)
+        self.assertEqual(self.similar(self.pancakes), [self.waffles.id])
+
+    def test_never_recommends_itself(self):
+        self.compute()
+        self.assertTrue(RecipeSimilarity.objects.exists())
+        self.assertFalse(RecipeSimilarity.objects.filter(recipe=F("similar")).exists())
+
+    def test_endpoint(self):
+        url = "/api/recipes/{}/recommendations/"
+        # Без рассчитанных пар — пустой список, а не ошибка.
+        response = self.client.get(url.format(self.pancakes.id))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [])
+        self.assertEqual(self.client.get(url.format(999999)).status_code, 404)
+
+        self.compute()
+        response = self.client.get(url.format(self.pancakes.id))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [recipe["id"] for recipe in response.json()],
+            [self.waffles.id, self.omelette.id],
+        )
+        self.assertEqual(
+            set(response.json()[0]), {"id", "name", "image", "cooking_time"}
+        )
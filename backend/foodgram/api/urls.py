@@ -1,17 +1,38 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 from users.views import UserAvatarView
 
-from . import views
+from . import async_views, metrics, views
 
 router = DefaultRouter()
 router.register("ingredients", views.IngredientViewSet, basename="ingredients")
 router.register("recipes", views.RecipeViewSet, basename="recipes")
 router.register("users", views.UserViewSet, basename="users")
+router.register("meal-plan", views.MealPlanViewSet, basename="meal-plan")
 
 urlpatterns = [
     path("", include(router.urls)),
     path("auth/", include("djoser.urls")),
     path("auth/", include("djoser.urls.authtoken")),
     path("users/me/avatar/", UserAvatarView.as_view(), name="user-avatar"),
+    path("metrics", metrics.metrics_view, name="metrics"),
 ]
+
+if settings.ASYNC_READ_VIEWS:
+    # Под ASGI «горячие» GET-запросы обслуживают асинхронные вьюхи,
+    # остальные методы они передают в синхронные вьюсеты.
+    urlpatterns = [
+        path("recipes/", async_views.recipe_list, name="async-recipes-list"),
+        path(
+            "recipes/<int:pk>/",
+            async_views.recipe_detail,
+            name="async-recipes-detail",
+        ),
+        path(
+            "ingredients/",
+            async_views.ingredient_list,
+            name="async-ingredients-list",
+        ),
+        path("users/me/", async_views.user_me, name="async-users-me"),
+    ] + urlpatterns
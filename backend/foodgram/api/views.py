@@ -1,25 +1,48 @@
+from datetime import date, timedelta
 from http import HTTPStatus
 
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
-from django.db.models import Sum
-from django.http import HttpResponse
-from django.shortcuts import get_object_or_404
+from django.db.models import Exists, F, OuterRef, Prefetch, Q, Sum
+from django.http import Http404, HttpResponse
+from django.utils.dateparse import parse_date
 from django_filters.rest_framework import DjangoFilterBackend
-from recipes.models import Ingredient, Recipe, RecipeIngredientsRelated, ShoppingList
+from recipes import feed, matcher, shortlinks
+from recipes.models import (
+    Favourite,
+    Ingredient,
+    MealPlanEntry,
+    Recipe,
+    RecipeIngredientsRelated,
+    RecipeSimilarity,
+    ShoppingList,
+    ShoppingListTotal,
+)
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ParseError
 from rest_framework.filters import SearchFilter
+from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from users.models import Subscription
 
+from . import invalidation, pagination
+from .caching import render_recipe_short
+from .catalog import catalog, catalog_response
+from .etags import etag_matches, not_modified, recipe_etag
+from .fast_serializers import RECIPE_FIELDS, recipe_rows, serialize_recipes
+from .fieldsets import requested_fields
+from .filters import RecipeFilter
 from .permissions import IsAuthorOrReadOnly
 from .serializers import (
+    BulkRecipesSerializer,
     CustomUserCreateSerializer,
     CustomUserSerializer,
     IngredientSerializer,
+    MealPlanEntrySerializer,
     RecipeSerializer,
     RecipeShortSerializer,
     RecipeWriteSerializer,
@@ -28,11 +51,31 @@ from .serializers import (
 
 User = get_user_model()
 
+FEED_LIMIT = 6
+FEED_LIMIT_MAX = 100
+MATCH_LIMIT_MAX = 100
+RECOMMENDATIONS_LIMIT = 10
+
+
+def reset_user_pages(user_id):
+    """
+    Сброс страниц пользователя после изменения избранного или корзины
+    сырым SQL менеджера, который минует сигналы, — здесь и в остальных
+    процессах.
+    """
+    pagination.bump_version(user_id)
+    invalidation.publish("user_pages", user_id=user_id)
+
+
+def format_amount(value):
+    """Количество без лишних нулей: 3.00 → 3, 1.50 → 1.5."""
+    return f"{value:.2f}".rstrip("0").rstrip(".")
+
 
 class RecipeViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthorOrReadOnly]
     filter_backends = [DjangoFilterBackend, SearchFilter]
-    filterset_fields = ["author"]
+    filterset_class = RecipeFilter
     search_fields = ["ingredients__name"]
 
     def create(self, request, *args, **kwargs):
@@ -51,25 +94,56 @@ class RecipeViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         self.perform_update(serializer)
         read_serializer = RecipeSerializer(
-            serializer.instance, context=self.get_serializer_context()
+            self.get_feed_queryset().get(pk=instance.pk),
+            context=self.get_serializer_context(),
         )
         return Response(read_serializer.data)
 
     def get_queryset(self):
-        queryset = Recipe.objects.select_related("author").prefetch_related(
-            "recipe_ingredients__ingredient"
+        if self.action in ["update", "partial_update", "destroy"]:
+            # Для проверки прав и записи достаточно id и автора
+            return Recipe.objects.only("id", "author_id")
+        if self.action not in ["list", "retrieve"]:
+            return Recipe.objects.only("id")
+
+        # Фильтры списка — в RecipeFilter.
+        return self.get_feed_queryset()
+
+    def get_feed_queryset(self):
+        return Recipe.objects.select_related("author").prefetch_related(
+            Prefetch(
+                "recipe_ingredients",
+                queryset=RecipeIngredientsRelated.objects.select_related(
+                    "ingredient"
+                ).order_by("id"),
+            )
         )
-        user = self.request.user
-        is_favorited = self.request.query_params.get("is_favorited")
-        is_in_shopping_cart = self.request.query_params.get("is_in_shopping_cart")
-
-        if user.is_authenticated:
-            if is_favorited == "1":
-                queryset = queryset.filter(favorited_by__user=user)
-            if is_in_shopping_cart == "1":
-                queryset = queryset.filter(in_shopping_carts__user=user)
 
-        return queryset
+    def list(self, request, *args, **kwargs):
+        # Чтение — без моделей и полей DRF, см. api/fast_serializers.py.
+        fields = requested_fields(request.query_params, RECIPE_FIELDS)
+        rows = recipe_rows(self.filter_queryset(self.get_queryset()), fields)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(
+                serialize_recipes(page, request, request.user, fields)
+            )
+        return Response(serialize_recipes(rows, request, request.user, fields))
+
+    def retrieve(self, request, *args, **kwargs):
+        etag = None
+        if request.accepted_renderer.format == "json":
+            # Повторный запрос неизменённой карточки — 304 до выборки.
+            etag = recipe_etag(request, kwargs["pk"], request.user)
+            if etag is not None and etag_matches(request, etag):
+                return not_modified(etag)
+        fields = requested_fields(request.query_params, RECIPE_FIELDS)
+        queryset = recipe_rows(self.filter_queryset(self.get_queryset()), fields)
+        row = get_object_or_404(queryset, pk=kwargs["pk"])
+        response = Response(serialize_recipes([row], request, request.user, fields)[0])
+        if etag is not None:
+            response["ETag"] = etag
+        return response
 
     def get_serializer_class(self):
         if self.action in ["create", "update", "partial_update"]:
@@ -79,81 +153,198 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
-    @action(
-        detail=True, methods=["post", "delete"], permission_classes=[IsAuthenticated]
-    )
-    def favorite(self, request, pk=None):
-        recipe = get_object_or_404(Recipe, pk=pk)
+    def toggle_user_recipe(self, request, pk, model, exists_error, missing_error):
+        """
+        Добавление/удаление рецепта в избранном или корзине одним запросом
+        к БД; краткое представление рецепта берётся из кеша.
+        """
+        if not pk.isdigit():
+            raise Http404
+        recipe_id = int(pk)
 
         if request.method == "POST":
-            obj, created = request.user.favorites.get_or_create(recipe=recipe)
-            if not created:
+            if model.objects.add(request.user.id, recipe_id):
+                reset_user_pages(request.user.id)
                 return Response(
-                    {"errors": "Рецепт уже в избранном"},
-                    status=status.HTTP_400_BAD_REQUEST,
+                    render_recipe_short(recipe_id, request),
+                    status=status.HTTP_201_CREATED,
                 )
-
-            # Вернуть краткий рецепт в ответе
-            serializer = RecipeShortSerializer(recipe, context={"request": request})
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            # Строка не вставлена: рецепта нет или он уже добавлен
+            get_object_or_404(Recipe.objects.only("id"), pk=recipe_id)
+            return Response(
+                {"errors": exists_error}, status=status.HTTP_400_BAD_REQUEST
+            )
 
         # DELETE-запрос
-        deleted, _ = request.user.favorites.filter(recipe=recipe).delete()
-        if deleted:
+        if model.objects.remove(request.user.id, recipe_id):
+            reset_user_pages(request.user.id)
             return Response(status=status.HTTP_204_NO_CONTENT)
+        get_object_or_404(Recipe.objects.only("id"), pk=recipe_id)
+        return Response({"errors": missing_error}, status=status.HTTP_400_BAD_REQUEST)
 
-        return Response(
-            {"errors": "Рецепт не найден в избранном"},
-            status=HTTPStatus.BAD_REQUEST,
+    @action(
+        detail=True, methods=["post", "delete"], permission_classes=[IsAuthenticated]
+    )
+    def favorite(self, request, pk=None):
+        return self.toggle_user_recipe(
+            request,
+            pk,
+            Favourite,
+            "Рецепт уже в избранном",
+            "Рецепт не найден в избранном",
         )
 
     @action(
         detail=True, methods=["post", "delete"], permission_classes=[IsAuthenticated]
     )
     def shopping_cart(self, request, pk=None):
-        recipe = get_object_or_404(Recipe, pk=pk)
+        return self.toggle_user_recipe(
+            request,
+            pk,
+            ShoppingList,
+            "Рецепт уже в списке покупок",
+            "Рецепт не найден в списке покупок",
+        )
 
+    def bulk_user_recipes(self, request, model):
+        """Пакетное добавление/удаление: один HTTP-запрос вместо сотен."""
+        serializer = BulkRecipesSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = serializer.validated_data["recipes"]
         if request.method == "POST":
-            obj, created = ShoppingList.objects.get_or_create(
-                user=request.user, recipe=recipe
-            )
-            if not created:
-                return Response(
-                    {"errors": "Рецепт уже в списке покупок"},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
+            results = model.objects.add_many(request.user.id, recipe_ids)
+        else:
+            results = model.objects.remove_many(request.user.id, recipe_ids)
+        reset_user_pages(request.user.id)
+        return Response(
+            {
+                "recipes": [
+                    {"id": recipe_id, "status": result}
+                    for recipe_id, result in results.items()
+                ]
+            }
+        )
 
-            # Возвращаем сериализованный рецепт в формате короткого описания
-            from .serializers import RecipeShortSerializer
+    @action(
+        detail=False,
+        methods=["post", "delete"],
+        url_path="favorite/bulk",
+        permission_classes=[IsAuthenticated],
+    )
+    def favorite_bulk(self, request):
+        return self.bulk_user_recipes(request, Favourite)
 
-            serializer = RecipeShortSerializer(recipe, context={"request": request})
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+    @action(
+        detail=False,
+        methods=["post", "delete"],
+        url_path="shopping_cart/bulk",
+        permission_classes=[IsAuthenticated],
+    )
+    def shopping_cart_bulk(self, request):
+        return self.bulk_user_recipes(request, ShoppingList)
 
-        # DELETE-запрос
-        deleted, _ = request.user.shopping_cart.filter(recipe=recipe).delete()
+    @action(detail=False, methods=["get"], permission_classes=[IsAuthenticated])
+    def feed(self, request):
+        """
+        Рецепты авторов из подписок, новые сверху. Keyset-пагинация:
+        ?cursor=<id последнего рецепта предыдущей страницы>&limit=N.
+        """
+        limit = request.query_params.get("limit", "")
+        limit = (
+            min(max(int(limit), 1), FEED_LIMIT_MAX) if limit.isdigit() else FEED_LIMIT
+        )
+        cursor = request.query_params.get("cursor", "")
+        ids = feed.page(
+            request.user.id, limit, int(cursor) if cursor.isdigit() else None
+        )
+        fields = requested_fields(request.query_params, RECIPE_FIELDS)
+        rows = {
+            row["id"]: row
+            for row in recipe_rows(Recipe.objects.filter(id__in=ids), fields)
+        }
+        results = serialize_recipes(
+            [rows[pk] for pk in ids if pk in rows], request, request.user, fields
+        )
+        next_url = None
+        if len(ids) == limit:
+            next_url = replace_query_param(
+                request.build_absolute_uri(), "cursor", ids[-1]
+            )
+        return Response({"next": next_url, "results": results})
 
-        if deleted:
-            return Response(status=status.HTTP_204_NO_CONTENT)
-        return Response(
-            {"errors": "Рецепт не найден в списке покупок"},
-            status=status.HTTP_400_BAD_REQUEST,
+    @action(detail=False, methods=["get"], permission_classes=[AllowAny])
+    def match(self, request):
+        """
+        Что приготовить из имеющегося: ?ingredients=1,2,3[&max_missing=N]
+        [&limit=N]. Рецепты ранжируются по числу недостающих ингредиентов.
+        """
+        pantry = request.query_params.get("ingredients", "").split(",")
+        pantry = [int(pk) for pk in pantry if pk.strip().isdigit()]
+        if not pantry:
+            return Response(
+                {"errors": "Укажите id ингредиентов: ?ingredients=1,2,3"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        limit = request.query_params.get("limit", "")
+        limit = min(max(int(limit), 1), MATCH_LIMIT_MAX) if limit.isdigit() else 20
+        max_missing = request.query_params.get("max_missing", "")
+        matches = matcher.index.match(
+            pantry,
+            limit=limit,
+            max_missing=int(max_missing) if max_missing.isdigit() else None,
+        )
+        recipes = Recipe.objects.only(*RecipeShortSerializer.Meta.fields).in_bulk(
+            [recipe_id for recipe_id, _, _ in matches]
         )
+        results = []
+        for recipe_id, matched, total in matches:
+            if recipe_id not in recipes:
+                continue
+            data = RecipeShortSerializer(
+                recipes[recipe_id], context={"request": request}
+            ).data
+            data["matched_ingredients"] = matched
+            data["total_ingredients"] = total
+            results.append(data)
+        return Response(results)
+
+    @action(detail=True, methods=["get"], permission_classes=[AllowAny])
+    def recommendations(self, request, pk=None):
+        """Похожие рецепты: одно чтение по индексу (recipe, -score)."""
+        if not pk.isdigit():
+            raise Http404
+        similar = list(
+            RecipeSimilarity.objects.filter(recipe_id=int(pk))
+            .select_related("similar")
+            .only(
+                "score",
+                *(f"similar__{field}" for field in RecipeShortSerializer.Meta.fields),
+            )
+            .order_by("-score")[:RECOMMENDATIONS_LIMIT]
+        )
+        if not similar:
+            get_object_or_404(Recipe.objects.only("id"), pk=int(pk))
+        serializer = RecipeShortSerializer(
+            [row.similar for row in similar], many=True, context={"request": request}
+        )
+        return Response(serializer.data)
 
     @action(detail=False, methods=["get"], permission_classes=[IsAuthenticated])
     def download_shopping_cart(self, request):
+        # Суммы поддерживаются инкрементально при изменении корзины; единицы
+        # переводятся в канонические прямо в SQL, до группировки.
         ingredients = (
-            RecipeIngredientsRelated.objects.filter(
-                recipe__in=ShoppingList.objects.filter(user=request.user).values_list(
-                    "recipe_id", flat=True
-                )
-            )
-            .values("ingredient__name", "ingredient__measurement_unit")
-            .annotate(total=Sum("amount"))
+            ShoppingListTotal.objects.filter(user=request.user, day__isnull=True)
+            .values("ingredient__name", "ingredient__canonical_unit")
+            .annotate(total=Sum(F("amount") * F("ingredient__unit_factor")))
+            .order_by("ingredient__name")
         )
 
         shopping_list = "Список покупок:\n\n"
         for item in ingredients:
-            shopping_list += f"- {item['ingredient__name']} ({item['total']} {item['ingredient__measurement_unit']})\n"
+            amount = format_amount(item["total"])
+            unit = item["ingredient__canonical_unit"]
+            shopping_list += f"- {item['ingredient__name']} ({amount} {unit})\n"
 
         return HttpResponse(
             shopping_list,
@@ -166,14 +357,13 @@ class RecipeViewSet(viewsets.ModelViewSet):
         detail=True, methods=["get"], url_path="get-link", permission_classes=[AllowAny]
     )
     def get_link(self, request, pk=None):
-        try:
-            recipe = self.get_object()
-            short_link = request.build_absolute_uri(f"/recipes/{recipe.id}/")
-            return Response({"short-link": short_link}, status=status.HTTP_200_OK)
-        except Recipe.DoesNotExist:
+        code = shortlinks.get_code(int(pk)) if pk.isdigit() else None
+        if code is None:
             return Response(
                 {"detail": "Recipe not found"}, status=status.HTTP_404_NOT_FOUND
             )
+        short_link = request.build_absolute_uri(f"/s/{code}/")
+        return Response({"short-link": short_link}, status=status.HTTP_200_OK)
 
 
 class UserViewSet(viewsets.ModelViewSet):
@@ -181,6 +371,33 @@ class UserViewSet(viewsets.ModelViewSet):
     serializer_class = CustomUserSerializer
     http_method_names = ["get", "post", "patch", "put", "delete"]
 
+    def get_queryset(self):
+        if self.action not in ["list", "retrieve"]:
+            return User.objects.all()
+        # Только колонки запрошенных полей; is_subscribed — аннотацией.
+        fields = requested_fields(
+            self.request.query_params, CustomUserSerializer.Meta.fields
+        )
+        queryset = User.objects.only(
+            "id", *(name for name in fields if name != "is_subscribed")
+        )
+        if "is_subscribed" in fields and self.request.user.is_authenticated:
+            queryset = queryset.annotate(
+                subscribed=Exists(
+                    Subscription.objects.filter(
+                        user=self.request.user, author=OuterRef("pk")
+                    )
+                )
+            )
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action in ["list", "retrieve", "me"]:
+            kwargs["fields"] = requested_fields(
+                self.request.query_params, CustomUserSerializer.Meta.fields
+            )
+        return super().get_serializer(*args, **kwargs)
+
     def get_serializer_class(self):
         if self.action == "create":
             return CustomUserCreateSerializer
@@ -230,6 +447,9 @@ class UserViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=["get"], permission_classes=[IsAuthenticated])
     def subscriptions(self, request):
+        fields = requested_fields(
+            request.query_params, SubscriptionSerializer.Meta.fields
+        )
         queryset = User.objects.filter(subscribers__user=request.user)
 
         page = self.paginate_queryset(queryset)
@@ -241,6 +461,7 @@ class UserViewSet(viewsets.ModelViewSet):
                 [subscription_map[user.id] for user in page],
                 many=True,
                 context={"request": request},
+                fields=fields,
             )
             return self.get_paginated_response(serializer.data)
 
@@ -248,6 +469,7 @@ class UserViewSet(viewsets.ModelViewSet):
             [subscription_map[user.id] for user in queryset],
             many=True,
             context={"request": request},
+            fields=fields,
         )
         return Response(serializer.data)
 
@@ -305,6 +527,13 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     pagination_class = None
 
     def list(self, request, *args, **kwargs):
+        name = request.query_params.get("name")
+        if not name and request.accepted_renderer.format == "json":
+            # Весь справочник — готовыми байтами, см. api/catalog.py.
+            return catalog_response(request)
+        snapshot = catalog.snapshot()
+        if name and snapshot is not None:
+            return Response(snapshot.search(name))
         queryset = self.filter_queryset(self.get_queryset())
         page = self.paginate_queryset(queryset)
         if page is not None:
@@ -314,9 +543,85 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
 
+    def retrieve(self, request, *args, **kwargs):
+        snapshot = catalog.snapshot()
+        pk = str(kwargs[self.lookup_field])
+        ingredient = None
+        if snapshot is not None and pk.isdigit():
+            ingredient = snapshot.get(int(pk))
+        if ingredient is None:
+            return super().retrieve(request, *args, **kwargs)
+        return Response(ingredient)
+
     def get_queryset(self):
         queryset = Ingredient.objects.all()
         name = self.request.query_params.get("name")
         if name:
             queryset = queryset.filter(name__istartswith=name)
         return queryset
+
+
+class MealPlanViewSet(viewsets.ModelViewSet):
+    serializer_class = MealPlanEntrySerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = None
+    http_method_names = ["get", "post", "patch", "delete"]
+
+    def get_queryset(self):
+        queryset = MealPlanEntry.objects.filter(user=self.request.user)
+        if self.action == "list":
+            start, end = self.get_period()
+            queryset = queryset.filter(day__range=(start, end)).select_related("recipe")
+        return queryset
+
+    def get_period(self):
+        """Период из ?start=&end= (ГГГГ-ММ-ДД); по умолчанию — 7 дней с сегодня."""
+        params = self.request.query_params
+        try:
+            start = parse_date(params["start"]) if "start" in params else date.today()
+            end = (
+                parse_date(params["end"])
+                if "end" in params
+                else start and start + timedelta(days=6)
+            )
+        except ValueError:
+            start = None
+        if start is None or end is None:
+            raise ParseError("Неверная дата")
+        if end < start:
+            raise ParseError("Конец периода раньше начала")
+        return start, end
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+    @action(detail=False, methods=["get"], url_path="shopping-list")
+    def shopping_list(self, request):
+        """
+        Сводный список покупок на период: корзина плюс план питания с учётом
+        множителей порций. Читает готовые суммы, рецепты не пересчитываются.
+        """
+        start, end = self.get_period()
+        days = Q(day__range=(start, end))
+        if request.query_params.get("cart", "1") == "1":
+            days |= Q(day__isnull=True)
+        ingredients = (
+            ShoppingListTotal.objects.filter(days, user=request.user)
+            .values("ingredient__name", "ingredient__canonical_unit")
+            .annotate(total=Sum(F("amount") * F("ingredient__unit_factor")))
+            .order_by("ingredient__name")
+        )
+        return Response(
+            {
+                "start": start,
+                "end": end,
+                "ingredients": [
+                    {
+                        "name": item["ingredient__name"],
+                        "measurement_unit": item["ingredient__canonical_unit"],
+                        "amount": item["total"],
+                    }
+                    for item in ingredients
+                ],
+            }
+        )
@@ -0,0 +1,147 @@
+"""
+Прогрев воркера перед приёмом трафика и состояние готовности.
+
+Хук gunicorn post_worker_init (gunicorn.conf.py) вызывает warm_up() до того,
+как воркер начнёт принимать соединения: загружаются справочник
+ингредиентов и индекс подбора рецептов, первые страницы списка рецептов
+проходят через полный стек вьюхи (импорты, сериализаторы, кеш страниц) и в
+кеш попадают короткие ссылки. Пробы /healthz и /readyz обслуживает HealthCheckMiddleware
+(api/middleware.py); БД она проверяет не чаще раза в
+READINESS_DB_CHECK_INTERVAL секунд.
+"""
+
+import logging
+import threading
+import time
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, connection, connections
+from django.test import RequestFactory
+from django.urls import resolve
+from recipes import feed, matcher, shortlinks
+
+from .catalog import catalog
+
+logger = logging.getLogger(__name__)
+
+RECIPES_PATH = "/api/recipes/"
+
+# idle — прогрев не запускался (runserver, тесты), warming, ready.
+state = "idle"
+
+
+def internal_host():
+    """Хост из ALLOWED_HOSTS для внутренних запросов прогрева."""
+    for host in settings.ALLOWED_HOSTS:
+        host = host.lstrip(".")
+        if host and host != "*":
+            return host
+    return "localhost"
+
+
+def warm_catalog():
+    catalog.current()
+
+
+def warm_matcher():
+    matcher.index.load()
+
+
+def warm_feed():
+    view = resolve(RECIPES_PATH).func
+    if iscoroutinefunction(view):
+        view = async_to_sync(view)
+    factory = RequestFactory(HTTP_HOST=internal_host())
+    for page in range(1, settings.WARMUP_FEED_PAGES + 1):
+        response = view(factory.get(RECIPES_PATH, {"page": page}))
+        if hasattr(response, "render"):
+            response.render()
+    feed.celebrity_ids()
+
+
+def warm_short_links():
+    shortlinks.preload(settings.WARMUP_SHORT_LINKS)
+
+
+STEPS = (
+    ("catalog", warm_catalog),
+    ("matcher", warm_matcher),
+    ("feed", warm_feed),
+    ("short_links", warm_short_links),
+)
+
+
+def warm_up(progress=None):
+    """
+    Прогревает процесс и возвращает {шаг: секунды}. Ошибка шага не
+    останавливает прогрев; progress вызывается после каждого шага.
+    """
+    global state
+    state = "warming"
+    timings = {}
+    try:
+        for name, step in STEPS:
+            started = time.perf_counter()
+            try:
+                step()
+            except Exception:
+                logger.exception("Прогрев: шаг %s не удался", name)
+            timings[name] = round(time.perf_counter() - started, 3)
+            if progress is not None:
+                progress()
+    finally:
+        # Запросы gthread-воркера идут в других потоках: соединения
+        # главного потока им не достанутся.
+        connections.close_all()
+        state = "ready"
+    logger.info("Прогрев завершён: %s", timings)
+    return timings
+
+
+class DatabaseCheck:
+    """Доступность БД; результат переиспользуется до истечения интервала."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checked_at = None
+        self.ok = False
+
+    def fresh(self):
+        return (
+            self.checked_at is not None
+            and time.monotonic() - self.checked_at
+            < settings.READINESS_DB_CHECK_INTERVAL
+        )
+
+    def __call__(self):
+        if self.fresh():
+            return self.ok
+        with self.lock:
+            if not self.fresh():
+                try:
+                    with connection.cursor() as cursor:
+                        cursor.execute("SELECT 1")
+                    self.ok = True
+                except DatabaseError:
+                    self.ok = False
+                self.checked_at = time.monotonic()
+            return self.ok
+
+
+database_check = DatabaseCheck()
+
+
+def readiness():
+    """(готов ли воркер, статус) для /readyz."""
+    if state == "warming":
+        return False, "warming"
+    if not database_check():
+        return False, "database unavailable"
+    return True, "ok"
+
+
+async def areadiness():
+    if state == "warming" or database_check.fresh():
+        return readiness()
+    return await sync_to_async(readiness)()
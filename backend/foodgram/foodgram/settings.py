@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
 import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -34,7 +35,16 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.IsAuthenticatedOrReadOnly",
     ],
     "DEFAULT_FILTER_BACKENDS": ["django_filters.rest_framework.DjangoFilterBackend"],
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",  # ← вот это ключевое изменение
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "api.renderers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+    "DEFAULT_PAGINATION_CLASS": "api.pagination.PageLimitPagination",
     "PAGE_SIZE": 6,
 }
 
@@ -74,6 +84,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.middleware.HealthCheckMiddleware",
+    "api.middleware.RequestMetricsMiddleware",
+    "api.middleware.CompressionMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -102,6 +115,67 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "foodgram.wsgi.application"
+ASGI_APPLICATION = "foodgram.asgi.application"
+
+# Метрики запросов: заголовок Server-Timing, лог api.metrics и /api/metrics
+REQUEST_METRICS = os.getenv("REQUEST_METRICS", "False") == "True"
+
+# Сжатие JSON-ответов API (brotli — при установленном пакете Brotli)
+RESPONSE_COMPRESSION = os.getenv("RESPONSE_COMPRESSION", "True") == "True"
+RESPONSE_COMPRESSION_MIN_SIZE = int(os.getenv("RESPONSE_COMPRESSION_MIN_SIZE", 1024))
+RESPONSE_COMPRESSION_ENCODINGS = os.getenv(
+    "RESPONSE_COMPRESSION_ENCODINGS", "br,gzip"
+).split(",")
+RESPONSE_COMPRESSION_GZIP_LEVEL = int(os.getenv("RESPONSE_COMPRESSION_GZIP_LEVEL", 6))
+RESPONSE_COMPRESSION_BR_QUALITY = int(os.getenv("RESPONSE_COMPRESSION_BR_QUALITY", 5))
+
+# Снимок справочника ингредиентов, общий для воркеров (api/snapshot.py).
+# По умолчанию — в /dev/shm: файл живёт в памяти, а не на диске.
+INGREDIENT_SNAPSHOT = os.getenv("INGREDIENT_SNAPSHOT", "True") == "True"
+INGREDIENT_SNAPSHOT_PATH = os.getenv(
+    "INGREDIENT_SNAPSHOT_PATH",
+    os.path.join(
+        "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(),
+        "foodgram-ingredients.bin",
+    ),
+)
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "api.metrics": {
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": False,
+        },
+        "api.invalidation": {
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": False,
+        },
+        "api.warmup": {
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": False,
+        },
+    },
+}
+
+# Прогрев воркера перед приёмом трафика и пробы готовности (api/warmup.py)
+WARMUP = os.getenv("WARMUP", "True") == "True"
+WARMUP_FEED_PAGES = int(os.getenv("WARMUP_FEED_PAGES", 2))
+# Не больше, чем помещается в локальный кеш ссылок (recipes/shortlinks.py).
+WARMUP_SHORT_LINKS = int(os.getenv("WARMUP_SHORT_LINKS", 10000))
+HEALTH_CHECK_PATH = "/healthz"
+READINESS_CHECK_PATH = "/readyz"
+READINESS_DB_CHECK_INTERVAL = int(os.getenv("READINESS_DB_CHECK_INTERVAL", 10))
+
+# Асинхронные вьюхи чтения (api/async_views.py) — включать при запуске под ASGI
+ASYNC_READ_VIEWS = os.getenv("ASYNC_READ_VIEWS", "False") == "True"
 
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
@@ -117,6 +191,47 @@ DATABASES = {
     }
 }
 
+LOCMEM_CACHE = "django.core.cache.backends.locmem.LocMemCache"
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", LOCMEM_CACHE)
+SHORT_LINK_CACHE_BACKEND = os.getenv("SHORT_LINK_CACHE_BACKEND", LOCMEM_CACHE)
+
+CACHES = {
+    "default": {
+        "BACKEND": CACHE_BACKEND,
+        "LOCATION": os.getenv("CACHE_LOCATION", "foodgram"),
+        # Лимит записей понимает только LocMemCache; клиенты Redis и
+        # Memcached получили бы его как параметр соединения.
+        "OPTIONS": (
+            {"MAX_ENTRIES": int(os.getenv("CACHE_MAX_ENTRIES", 10_000))}
+            if CACHE_BACKEND == LOCMEM_CACHE
+            else {}
+        ),
+    },
+    # Короткие ссылки (recipes/shortlinks.py) — в своём кеше: их много, и
+    # они не должны вытеснять версии и служебные ключи кеша по умолчанию.
+    "shortlinks": {
+        "BACKEND": SHORT_LINK_CACHE_BACKEND,
+        "LOCATION": os.getenv("SHORT_LINK_CACHE_LOCATION", "foodgram-shortlinks"),
+        "TIMEOUT": None,
+        # Две записи на ссылку: код → id и id → код.
+        "OPTIONS": (
+            {"MAX_ENTRIES": int(os.getenv("SHORT_LINK_CACHE_SIZE", 100_000))}
+            if SHORT_LINK_CACHE_BACKEND == LOCMEM_CACHE
+            else {}
+        ),
+    },
+}
+
+# Шина инвалидации локальных кешей между воркерами и контейнерами через
+# PostgreSQL LISTEN/NOTIFY (api/invalidation.py). С общим кешем
+# (CACHE_BACKEND) её можно выключить.
+CACHE_INVALIDATION_BUS = os.getenv("CACHE_INVALIDATION_BUS", "True") == "True"
+CACHE_INVALIDATION_CHANNEL = os.getenv("CACHE_INVALIDATION_CHANNEL", "foodgram_cache")
+
+# Авторы с большим числом подписчиков не раскладывают рецепты по лентам
+# при публикации: их рецепты подмешиваются в ленту при чтении.
+FEED_CELEBRITY_THRESHOLD = int(os.getenv("FEED_CELEBRITY_THRESHOLD", 1000))
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -0,0 +1,109 @@
+"""
+Конфигурация gunicorn для бэкенда Foodgram.
+
+Все параметры задаются переменными окружения GUNICORN_*; значения по
+умолчанию рассчитаны от числа доступных контейнеру CPU. Запуск:
+
+    gunicorn -c gunicorn.conf.py
+
+Модель воркеров (GUNICORN_WORKER_CLASS):
+    sync     — процесс на запрос, 2 * CPU + 1 воркеров;
+    gthread  — CPU + 1 процессов по GUNICORN_THREADS потоков (по умолчанию);
+    uvicorn  — ASGI-воркеры (foodgram.asgi) с асинхронными вьюхами чтения.
+"""
+
+import gc
+import os
+
+WORKER_CLASSES = {
+    "sync": "sync",
+    "gthread": "gthread",
+    "uvicorn": "uvicorn.workers.UvicornWorker",
+}
+
+
+def env_int(name, default):
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def env_bool(name, default):
+    value = os.getenv(name)
+    if not value:
+        return default
+    return value.lower() in ("1", "true", "yes", "on")
+
+
+def available_cpus():
+    """Число CPU, доступных процессу (учитывает cpuset контейнера)."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+cpus = available_cpus()
+worker_kind = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+if worker_kind not in WORKER_CLASSES:
+    raise RuntimeError(
+        f"GUNICORN_WORKER_CLASS={worker_kind!r}: ожидается одно из "
+        f"{', '.join(WORKER_CLASSES)}"
+    )
+
+default_workers = {"sync": 2 * cpus + 1, "gthread": cpus + 1, "uvicorn": cpus}
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+worker_class = WORKER_CLASSES[worker_kind]
+workers = env_int("GUNICORN_WORKERS", default_workers[worker_kind])
+threads = env_int("GUNICORN_THREADS", 4 if worker_kind == "gthread" else 1)
+
+if worker_kind == "uvicorn":
+    wsgi_app = "foodgram.asgi:application"
+    os.environ.setdefault("ASYNC_READ_VIEWS", "True")
+else:
+    wsgi_app = "foodgram.wsgi:application"
+
+# Код приложения импортируется в мастере один раз и разделяется
+# воркерами через copy-on-write.
+preload_app = env_bool("GUNICORN_PRELOAD", True)
+
+# Плавный перезапуск воркеров: джиттер не даёт им уйти на рестарт разом.
+max_requests = env_int("GUNICORN_MAX_REQUESTS", 1000)
+max_requests_jitter = env_int("GUNICORN_MAX_REQUESTS_JITTER", 100)
+timeout = env_int("GUNICORN_TIMEOUT", 30)
+graceful_timeout = env_int("GUNICORN_GRACEFUL_TIMEOUT", 30)
+keepalive = env_int("GUNICORN_KEEPALIVE", 5)
+
+# Heartbeat-файлы воркеров держим в памяти, а не на overlay-FS контейнера.
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
+
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+accesslog = "-" if env_bool("GUNICORN_ACCESS_LOG", False) else None
+errorlog = "-"
+
+
+def when_ready(server):
+    if not server.cfg.preload_app:
+        return
+    from django.db import connections
+
+    # Соединения с БД, открытые при импорте приложения в мастере,
+    # закрываем до форка, чтобы воркеры не делили один сокет.
+    connections.close_all()
+    # Объекты, созданные при импорте, переносим в постоянное поколение:
+    # сборщик мусора не будет трогать их страницы в воркерах.
+    gc.freeze()
+
+
+def post_worker_init(worker):
+    # Слушатель шины инвалидации кешей (api/invalidation.py): свой в каждом
+    # воркере, поток и соединение с БД после форка не наследуются.
+    from api.invalidation import start_listener
+    from api.warmup import warm_up
+    from django.conf import settings
+
+    start_listener()
+    # Прогрев до приёма соединений; notify — чтобы мастер не счёл воркер
+    # зависшим, пока идёт прогрев.
+    if settings.WARMUP:
+        warm_up(progress=worker.notify)
@@ -3,14 +3,19 @@ from django.contrib import admin
 from .models import (
     Favourite,
     Ingredient,
+    MealPlanEntry,
     Recipe,
     RecipeIngredientsRelated,
+    RecipeSimilarity,
     ShoppingList,
+    ShortLink,
+    UnitConversion,
 )
+from .signals import recipe_ingredients_changed
 
 
 class IngredientAdmin(admin.ModelAdmin):
-    list_display = ("name", "measurement_unit")
+    list_display = ("name", "measurement_unit", "canonical_unit", "unit_factor")
     search_fields = ("name",)
 
 
@@ -26,6 +31,10 @@ class RecipeAdmin(admin.ModelAdmin):
     inlines = [RecipeIngredientsRelatedInline]
     readonly_fields = ("favorites_count",)
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        recipe_ingredients_changed.send(sender=Recipe, recipe_id=form.instance.id)
+
     def favorites_count(self, obj):
         return obj.favourites.count()
 
@@ -43,8 +52,35 @@ class FavouriteAdmin(admin.ModelAdmin):
     search_fields = ("user__username", "recipe__name")
 
 
+class MealPlanEntryAdmin(admin.ModelAdmin):
+    list_display = ("user", "day", "recipe", "servings")
+    list_filter = ("day",)
+    search_fields = ("user__username", "recipe__name")
+    raw_id_fields = ("user", "recipe")
+
+
+class UnitConversionAdmin(admin.ModelAdmin):
+    list_display = ("unit", "canonical_unit", "factor")
+    search_fields = ("unit", "canonical_unit")
+
+
+class RecipeSimilarityAdmin(admin.ModelAdmin):
+    list_display = ("recipe", "similar", "score")
+    raw_id_fields = ("recipe", "similar")
+
+
+class ShortLinkAdmin(admin.ModelAdmin):
+    list_display = ("code", "recipe")
+    search_fields = ("code",)
+    raw_id_fields = ("recipe",)
+
+
 admin.site.register(Ingredient, IngredientAdmin)
 admin.site.register(Recipe, RecipeAdmin)
 admin.site.register(RecipeIngredientsRelated)
 admin.site.register(ShoppingList, ShoppingListAdmin)
 admin.site.register(Favourite, FavouriteAdmin)
+admin.site.register(MealPlanEntry, MealPlanEntryAdmin)
+admin.site.register(RecipeSimilarity, RecipeSimilarityAdmin)
+admin.site.register(ShortLink, ShortLinkAdmin)
+admin.site.register(UnitConversion, UnitConversionAdmin)
@@ -0,0 +1,119 @@
+"""
+Лента рецептов авторов, на которых подписан пользователь.
+
+Fan-out-on-write: при публикации рецепт одним INSERT ... SELECT
+раскладывается в TimelineEntry всех подписчиков автора, а чтение ленты —
+диапазонный проход по индексу (user, recipe) с keyset-пагинацией по id.
+Авторы, у которых подписчиков больше FEED_CELEBRITY_THRESHOLD, так не
+пишут: их рецепты подмешиваются при чтении (fan-out-on-read). Множество
+таких авторов кешируется и сбрасывается, когда автор пересекает порог.
+"""
+
+from api.singleflight import cached
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from users.models import Subscription
+
+from .models import Recipe, TimelineEntry
+
+CELEBRITIES_CACHE_KEY = "feed:celebrities"
+
+
+def celebrity_ids():
+    """Авторы, чьи рецепты подмешиваются в ленту при чтении."""
+    # После сброса списка его пересчитывает один поток на кеш
+    # (api/singleflight.py).
+    return cached(CELEBRITIES_CACHE_KEY, load_celebrity_ids, timeout=None)
+
+
+def load_celebrity_ids():
+    return set(
+        Subscription.objects.order_by()
+        .values("author_id")
+        .annotate(followers=Count("id"))
+        .filter(followers__gt=settings.FEED_CELEBRITY_THRESHOLD)
+        .values_list("author_id", flat=True)
+    )
+
+
+def followers_count(author_id):
+    return Subscription.objects.filter(author_id=author_id).count()
+
+
+def insert_entries(where, params):
+    """Раскладывает рецепты авторов по лентам их подписчиков."""
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {quote(TimelineEntry._meta.db_table)} "
+            f"(user_id, recipe_id, author_id) "
+            f"SELECT s.user_id, r.id, r.author_id "
+            f"FROM {quote(Subscription._meta.db_table)} s "
+            f"JOIN {quote(Recipe._meta.db_table)} r ON r.author_id = s.author_id "
+            f"WHERE {where} ON CONFLICT DO NOTHING",
+            params,
+        )
+
+
+def fan_out(recipe_id, author_id):
+    """Новый рецепт — в ленты всех подписчиков автора."""
+    if author_id is None or author_id in celebrity_ids():
+        return
+    insert_entries("r.id = %s", [recipe_id])
+
+
+def subscribed(user_id, author_id):
+    followers = followers_count(author_id)
+    if followers > settings.FEED_CELEBRITY_THRESHOLD:
+        if followers == settings.FEED_CELEBRITY_THRESHOLD + 1:
+            cache.delete(CELEBRITIES_CACHE_KEY)
+        return
+    insert_entries("s.user_id = %s AND s.author_id = %s", [user_id, author_id])
+
+
+def unsubscribed(user_id, author_id):
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+    if followers_count(author_id) == settings.FEED_CELEBRITY_THRESHOLD:
+        # Автор вернулся к fan-out-on-write: дописываем рецепты, которые
+        # раньше подмешивались при чтении.
+        cache.delete(CELEBRITIES_CACHE_KEY)
+        insert_entries("s.author_id = %s", [author_id])
+
+
+def rebuild():
+    """Полная пересборка лент, например после массовой загрузки данных."""
+    cache.delete(CELEBRITIES_CACHE_KEY)
+    TimelineEntry.objects.all().delete()
+    celebrities = list(celebrity_ids())
+    if celebrities:
+        placeholders = ", ".join(["%s"] * len(celebrities))
+        insert_entries(f"s.author_id NOT IN ({placeholders})", celebrities)
+    else:
+        insert_entries("1 = 1", [])
+
+
+def page(user_id, limit, before=None):
+    """id рецептов ленты по убыванию, меньше before, не больше limit."""
+    entries = TimelineEntry.objects.filter(user_id=user_id)
+    if before is not None:
+        entries = entries.filter(recipe_id__lt=before)
+    ids = list(
+        entries.order_by("-recipe_id").values_list("recipe_id", flat=True)[:limit]
+    )
+    celebrities = celebrity_ids()
+    if not celebrities:
+        return ids
+    followed = list(
+        Subscription.objects.filter(
+            user_id=user_id, author_id__in=celebrities
+        ).values_list("author_id", flat=True)
+    )
+    if not followed:
+        return ids
+    recipes = Recipe.objects.filter(author_id__in=followed)
+    if before is not None:
+        recipes = recipes.filter(id__lt=before)
+    ids.extend(recipes.order_by("-id").values_list("id", flat=True)[:limit])
+    return sorted(set(ids), reverse=True)[:limit]
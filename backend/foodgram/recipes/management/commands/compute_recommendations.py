@@ -0,0 +1,188 @@
+import itertools
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from recipes.models import (
+    Favourite,
+    Recipe,
+    RecipeIngredientsRelated,
+    RecipeSimilarity,
+    ShoppingList,
+)
+from scipy import sparse
+
+
+def normalize_rows(matrix):
+    """Строки единичной длины: произведение строк даёт косинусное сходство."""
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.diags(1 / norms) @ matrix
+
+
+def binary_matrix(rows, cols, shape):
+    matrix = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=shape
+    )
+    matrix.sum_duplicates()
+    matrix.data[:] = 1
+    return matrix
+
+
+def matrix_rows(recipe_ids, pairs):
+    """
+    Строки матрицы для пар (recipe_id, ...) и сами пары. Пары рецептов, которых
+    нет в recipe_ids, отбрасываются: searchsorted отдал бы им соседнюю строку.
+    """
+    rows = np.searchsorted(recipe_ids, pairs[:, 0])
+    found = rows < len(recipe_ids)
+    found[found] = recipe_ids[rows[found]] == pairs[found, 0]
+    return rows[found], pairs[found]
+
+
+def repeatable_read():
+    """Все чтения текущей транзакции — из одного снимка БД (PostgreSQL)."""
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчёт похожих рецептов: косинусное сходство по совместному "
+        "добавлению в избранное и корзины и по общим ингредиентам (с весом "
+        "IDF). Для каждого рецепта сохраняется top-K соседей."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top-k", type=int, default=10)
+        parser.add_argument(
+            "--interactions-weight",
+            type=float,
+            default=0.7,
+            help="Вес сходства по избранному и корзинам",
+        )
+        parser.add_argument(
+            "--ingredients-weight",
+            type=float,
+            default=0.3,
+            help="Вес сходства по ингредиентам",
+        )
+        parser.add_argument("--min-score", type=float, default=0.01)
+        parser.add_argument(
+            "--block-size",
+            type=int,
+            default=2048,
+            help="Сколько рецептов обрабатывать за одно умножение матриц",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        # Рецепты и связи читаются из одного снимка: рецепт, созданный между
+        # запросами, не сдвинет строки матриц.
+        with transaction.atomic():
+            repeatable_read()
+            recipe_ids = np.fromiter(
+                Recipe.objects.order_by("id").values_list("id", flat=True),
+                dtype=np.int64,
+            )
+            if not len(recipe_ids):
+                self.stdout.write("Нет рецептов")
+                return
+            interactions = self.interaction_matrix(recipe_ids)
+            ingredients = self.ingredient_matrix(recipe_ids)
+        self.stdout.write(
+            f"Матрицы: {interactions.shape[1]} пользователей, "
+            f"{ingredients.shape[1]} ингредиентов, {len(recipe_ids)} рецептов"
+        )
+
+        rows = self.neighbours(recipe_ids, interactions, ingredients, options)
+        saved = 0
+        with transaction.atomic():
+            # Рецепты, удалённые во время расчёта, не сохраняем: вставка
+            # упала бы на внешнем ключе.
+            existing = set(Recipe.objects.values_list("id", flat=True))
+            rows = (row for row in rows if row[0] in existing and row[1] in existing)
+            RecipeSimilarity.objects.all().delete()
+            while batch := list(itertools.islice(rows, options["batch_size"])):
+                RecipeSimilarity.objects.bulk_create(
+                    RecipeSimilarity(recipe_id=recipe, similar_id=similar, score=score)
+                    for recipe, similar, score in batch
+                )
+                saved += len(batch)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Сохранено {saved} пар за {time.monotonic() - started:.1f} с"
+            )
+        )
+
+    def interaction_matrix(self, recipe_ids):
+        """Рецепты × пользователи: 1, если рецепт в избранном или корзине."""
+        pairs = [
+            np.array(
+                list(model.objects.values_list("recipe_id", "user_id")),
+                dtype=np.int64,
+            ).reshape(-1, 2)
+            for model in (Favourite, ShoppingList)
+        ]
+        rows, pairs = matrix_rows(recipe_ids, np.concatenate(pairs))
+        users, user_index = np.unique(pairs[:, 1], return_inverse=True)
+        matrix = binary_matrix(
+            rows,
+            user_index,
+            (len(recipe_ids), len(users)),
+        )
+        return normalize_rows(matrix).tocsr()
+
+    def ingredient_matrix(self, recipe_ids):
+        """Рецепты × ингредиенты с весом IDF: соль и вода почти не влияют."""
+        pairs = np.array(
+            list(
+                RecipeIngredientsRelated.objects.values_list(
+                    "recipe_id", "ingredient_id"
+                )
+            ),
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        rows, pairs = matrix_rows(recipe_ids, pairs)
+        ingredients, ingredient_index = np.unique(pairs[:, 1], return_inverse=True)
+        matrix = binary_matrix(
+            rows,
+            ingredient_index,
+            (len(recipe_ids), len(ingredients)),
+        )
+        document_frequency = np.bincount(matrix.indices, minlength=matrix.shape[1])
+        idf = np.log(len(recipe_ids) / np.maximum(document_frequency, 1)).astype(
+            np.float32
+        )
+        return normalize_rows(matrix @ sparse.diags(idf)).tocsr()
+
+    def neighbours(self, recipe_ids, interactions, ingredients, options):
+        """Пары (рецепт, сосед, сходство) — top-K по каждой строке."""
+        top_k = options["top_k"]
+        interactions_t = interactions.T.tocsr()
+        ingredients_t = ingredients.T.tocsr()
+        block_size = options["block_size"]
+        for start in range(0, len(recipe_ids), block_size):
+            stop = min(start + block_size, len(recipe_ids))
+            # Блок строк матрицы сходства — разреженное произведение.
+            block = (
+                options["interactions_weight"]
+                * (interactions[start:stop] @ interactions_t)
+                + options["ingredients_weight"]
+                * (ingredients[start:stop] @ ingredients_t)
+            ).tocsr()
+            for offset in range(stop - start):
+                row = start + offset
+                begin, end = block.indptr[offset], block.indptr[offset + 1]
+                columns = block.indices[begin:end]
+                scores = block.data[begin:end]
+                keep = (columns != row) & (scores >= options["min_score"])
+                columns, scores = columns[keep], scores[keep]
+                if len(scores) > top_k:
+                    best = np.argpartition(-scores, top_k)[:top_k]
+                    columns, scores = columns[best], scores[best]
+                for column, score in zip(columns, scores):
+                    yield int(recipe_ids[row]), int(recipe_ids[column]), float(score)
@@ -0,0 +1,52 @@
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+from recipes import shortlinks
+from recipes.models import Recipe, ShortLink
+
+
+class Command(BaseCommand):
+    help = "Создание коротких ссылок для рецептов, у которых их ещё нет"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--warm-cache",
+            action="store_true",
+            help="Загрузить все коды в общий кеш редиректа (SHORT_LINK_CACHE_BACKEND)",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        created = 0
+        last_id = 0
+        while True:
+            recipe_ids = list(
+                Recipe.objects.filter(id__gt=last_id, short_link__isnull=True)
+                .order_by("id")
+                .values_list("id", flat=True)[:batch_size]
+            )
+            if not recipe_ids:
+                break
+            ShortLink.objects.bulk_create(
+                [
+                    ShortLink(code=shortlinks.code_for(recipe_id), recipe_id=recipe_id)
+                    for recipe_id in recipe_ids
+                ],
+                ignore_conflicts=True,
+            )
+            created += len(recipe_ids)
+            last_id = recipe_ids[-1]
+
+        if options["warm_cache"]:
+            if isinstance(caches["shortlinks"], LocMemCache):
+                # Кеш процесса команды исчезнет вместе с ней.
+                self.stdout.write(
+                    self.style.WARNING(
+                        "Кеш коротких ссылок локальный: прогрев пропущен"
+                    )
+                )
+            else:
+                shortlinks.preload(None)
+
+        self.stdout.write(self.style.SUCCESS(f"Создано коротких ссылок: {created}"))
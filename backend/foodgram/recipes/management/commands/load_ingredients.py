@@ -1,6 +1,7 @@
 import csv
 import os
 
+from api.catalog import catalog
 from django.conf import settings
 from django.core.management.base import BaseCommand
 from django.db import IntegrityError
@@ -23,7 +24,8 @@ class Command(BaseCommand):
         skipped = 0
 
         try:
-            with open(path, "r", encoding="utf-8") as file:
+            # Снимок справочника (api/snapshot.py) пишется один раз в конце.
+            with catalog.bulk(), open(path, "r", encoding="utf-8") as file:
                 reader = csv.reader(file)
                 for row in reader:
                     if len(row) != 2:
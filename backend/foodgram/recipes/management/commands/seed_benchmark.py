@@ -0,0 +1,170 @@
+import io
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from PIL import Image
+from recipes import feed, matcher
+from recipes.models import (
+    Favourite,
+    Ingredient,
+    Recipe,
+    RecipeIngredientsRelated,
+    ShoppingList,
+    ShoppingListTotal,
+)
+from rest_framework.authtoken.models import Token
+from users.models import Subscription, User
+
+BENCH_PREFIX = "bench_"
+BENCH_PASSWORD = "bench-password"
+BENCH_IMAGE = "recipes/images/bench.png"
+
+
+def ensure_image(name):
+    """Создаёт в хранилище картинку-заглушку для сгенерированных рецептов."""
+    if default_storage.exists(name):
+        return
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64), (200, 120, 40)).save(buffer, "PNG")
+    default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполнение БД данными для бенчмарка: пользователи, рецепты, избранное, "
+        "корзины и подписки. Ингредиенты — из data/ingredients.csv."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=50)
+        parser.add_argument("--recipes-per-user", type=int, default=10)
+        parser.add_argument("--ingredients-per-recipe", type=int, default=8)
+        parser.add_argument("--favorites-per-user", type=int, default=20)
+        parser.add_argument("--cart-per-user", type=int, default=5)
+        parser.add_argument("--subscriptions-per-user", type=int, default=10)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--flush",
+            action="store_true",
+            help="Удалить ранее созданных пользователей бенчмарка и их данные",
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+
+        if options["flush"]:
+            deleted, _ = User.objects.filter(username__startswith=BENCH_PREFIX).delete()
+            self.stdout.write(f"Удалено объектов: {deleted}")
+        if User.objects.filter(username__startswith=BENCH_PREFIX).exists():
+            self.stdout.write(
+                self.style.ERROR("Данные бенчмарка уже есть, запустите с --flush")
+            )
+            return
+        if not Ingredient.objects.exists():
+            call_command("load_ingredients", stdout=self.stdout)
+        ingredient_ids = list(
+            Ingredient.objects.order_by("id").values_list("id", flat=True)
+        )
+        if not ingredient_ids:
+            self.stdout.write(self.style.ERROR("Нет ингредиентов для рецептов"))
+            return
+
+        ensure_image(BENCH_IMAGE)
+        with transaction.atomic():
+            users = self.create_users(options["users"])
+            recipe_ids = self.create_recipes(
+                rng,
+                users,
+                ingredient_ids,
+                options["recipes_per_user"],
+                options["ingredients_per_recipe"],
+            )
+            self.create_relations(rng, users, recipe_ids, options)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Создано: пользователей {len(users)}, рецептов {len(recipe_ids)}"
+            )
+        )
+
+    def create_users(self, count):
+        password = make_password(BENCH_PASSWORD)
+        User.objects.bulk_create(
+            User(
+                username=f"{BENCH_PREFIX}{index}",
+                email=f"{BENCH_PREFIX}{index}@example.com",
+                first_name="Bench",
+                last_name=f"User{index}",
+                password=password,
+            )
+            for index in range(count)
+        )
+        # На бэкендах без RETURNING у bulk_create нет первичных ключей.
+        users = list(
+            User.objects.filter(username__startswith=BENCH_PREFIX).order_by("id")
+        )
+        Token.objects.bulk_create(
+            Token(user=user, key=Token.generate_key()) for user in users
+        )
+        return users
+
+    def create_recipes(self, rng, users, ingredient_ids, per_user, per_recipe):
+        Recipe.objects.bulk_create(
+            Recipe(
+                author=user,
+                name=f"Рецепт {user.username}-{index}",
+                image=BENCH_IMAGE,
+                text=f"Описание рецепта {index} пользователя {user.username}.",
+                cooking_time=rng.randint(5, 180),
+            )
+            for user in users
+            for index in range(per_user)
+        )
+        recipe_ids = list(
+            Recipe.objects.filter(author__in=users)
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        per_recipe = min(per_recipe, len(ingredient_ids))
+        RecipeIngredientsRelated.objects.bulk_create(
+            (
+                RecipeIngredientsRelated(
+                    recipe_id=recipe_id,
+                    ingredient_id=ingredient_id,
+                    amount=rng.randint(1, 500),
+                )
+                for recipe_id in recipe_ids
+                for ingredient_id in rng.sample(ingredient_ids, per_recipe)
+            ),
+            batch_size=1000,
+        )
+        return recipe_ids
+
+    def create_relations(self, rng, users, recipe_ids, options):
+        favorites, carts, subscriptions = [], [], []
+        for user in users:
+            for recipe_id in rng.sample(
+                recipe_ids, min(options["favorites_per_user"], len(recipe_ids))
+            ):
+                favorites.append(Favourite(user=user, recipe_id=recipe_id))
+            for recipe_id in rng.sample(
+                recipe_ids, min(options["cart_per_user"], len(recipe_ids))
+            ):
+                carts.append(ShoppingList(user=user, recipe_id=recipe_id))
+            authors = [author for author in users if author.id != user.id]
+            for author in rng.sample(
+                authors, min(options["subscriptions_per_user"], len(authors))
+            ):
+                subscriptions.append(Subscription(user=user, author=author))
+        Favourite.objects.bulk_create(favorites, batch_size=1000)
+        ShoppingList.objects.bulk_create(carts, batch_size=1000)
+        Subscription.objects.bulk_create(subscriptions, batch_size=1000)
+        # bulk_create обходит менеджер корзины — суммы считаем разом.
+        ShoppingListTotal.objects.rebuild(user.id for user in users)
+        feed.rebuild()
+        matcher.RecipeMatcher.bump_version()
@@ -0,0 +1,356 @@
+import io
+import itertools
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from recipes import feed, matcher
+from recipes.management.commands.seed_benchmark import ensure_image
+from recipes.models import (
+    Favourite,
+    Ingredient,
+    Recipe,
+    RecipeIngredientsRelated,
+    ShoppingList,
+    ShoppingListTotal,
+    TimelineEntry,
+)
+from users.models import Subscription, User
+
+SEED_PREFIX = "seed_"
+SEED_IMAGE = "recipes/images/seed.png"
+
+
+def zipf_cum_weights(size, alpha):
+    """Накопленные веса распределения Ципфа для rng.choices."""
+    return list(itertools.accumulate(1 / (rank + 1) ** alpha for rank in range(size)))
+
+
+def copy_value(value):
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+class RowWriter:
+    """
+    Потоковая запись строк пачками: COPY FROM STDIN на PostgreSQL,
+    многострочный INSERT через executemany на остальных СУБД.
+    """
+
+    def __init__(self, model, fields, batch_size, use_copy):
+        self.model = model
+        self.fields = fields
+        self.batch_size = batch_size
+        self.use_copy = use_copy
+        self.written = 0
+
+    def write(self, rows):
+        rows = iter(rows)
+        while batch := list(itertools.islice(rows, self.batch_size)):
+            if self.use_copy:
+                self.copy(batch)
+            else:
+                self.insert(batch)
+            self.written += len(batch)
+
+    def columns(self):
+        return ", ".join(
+            connection.ops.quote_name(self.model._meta.get_field(name).column)
+            for name in self.fields
+        )
+
+    def insert(self, batch):
+        # executemany без создания экземпляров моделей: на порядок быстрее
+        # bulk_create для миллионов строк.
+        placeholders = ", ".join(["%s"] * len(self.fields))
+        sql = (
+            f"INSERT INTO {connection.ops.quote_name(self.model._meta.db_table)} "
+            f"({self.columns()}) VALUES ({placeholders})"
+        )
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(sql, batch)
+
+    def copy(self, batch):
+        buffer = io.StringIO()
+        for row in batch:
+            buffer.write("\t".join(copy_value(value) for value in row))
+            buffer.write("\n")
+        buffer.seek(0)
+        sql = (
+            f"COPY {connection.ops.quote_name(self.model._meta.db_table)} "
+            f"({self.columns()}) FROM STDIN"
+        )
+        with connection.cursor() as cursor:
+            raw = cursor.cursor
+            if hasattr(raw, "copy_expert"):
+                raw.copy_expert(sql, buffer)
+            else:
+                with raw.copy(sql) as copy:
+                    copy.write(buffer.getvalue())
+
+
+class Command(BaseCommand):
+    help = (
+        "Быстрая генерация большого синтетического набора данных: пользователи, "
+        "рецепты, состав рецептов, подписки, избранное и корзины. Детерминирован "
+        "по --seed; пишет пачками через COPY (PostgreSQL) или INSERT."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10_000)
+        parser.add_argument("--recipes", type=int, default=100_000)
+        parser.add_argument(
+            "--author-alpha",
+            type=float,
+            default=1.1,
+            help="Показатель Ципфа для числа рецептов у автора",
+        )
+        parser.add_argument(
+            "--ingredients-mean",
+            type=float,
+            default=8,
+            help="Среднее число ингредиентов в рецепте",
+        )
+        parser.add_argument("--ingredients-sd", type=float, default=3)
+        parser.add_argument(
+            "--follows-mean",
+            type=float,
+            default=15,
+            help="Среднее число подписок пользователя (экспоненциальное)",
+        )
+        parser.add_argument(
+            "--follow-alpha",
+            type=float,
+            default=1.2,
+            help="Показатель Ципфа популярности авторов у подписчиков",
+        )
+        parser.add_argument("--favorites-mean", type=float, default=10)
+        parser.add_argument("--cart-mean", type=float, default=3)
+        parser.add_argument(
+            "--recipe-alpha",
+            type=float,
+            default=0.9,
+            help="Показатель Ципфа популярности рецептов в избранном и корзинах",
+        )
+        parser.add_argument("--batch-size", type=int, default=50_000)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--method",
+            choices=("auto", "copy", "insert"),
+            default="auto",
+            help="auto — COPY на PostgreSQL, иначе INSERT пачками",
+        )
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.options = options
+        use_copy = options["method"] == "copy" or (
+            options["method"] == "auto" and connection.vendor == "postgresql"
+        )
+        if use_copy and connection.vendor != "postgresql":
+            raise CommandError("COPY доступен только для PostgreSQL")
+        self.use_copy = use_copy
+
+        if not Ingredient.objects.exists():
+            call_command("load_ingredients", stdout=self.stdout)
+        self.ingredient_ids = list(
+            Ingredient.objects.order_by("id").values_list("id", flat=True)
+        )
+        if User.objects.filter(username__startswith=SEED_PREFIX).exists():
+            raise CommandError(
+                "Сгенерированные пользователи уже есть; удалите их перед запуском"
+            )
+        ensure_image(SEED_IMAGE)
+
+        first_user = (User.objects.aggregate(Max("id"))["id__max"] or 0) + 1
+        first_recipe = (Recipe.objects.aggregate(Max("id"))["id__max"] or 0) + 1
+        user_ids = range(first_user, first_user + options["users"])
+        recipe_ids = range(first_recipe, first_recipe + options["recipes"])
+
+        started = time.monotonic()
+        self.run_stage(
+            User,
+            (
+                "id",
+                "password",
+                "is_superuser",
+                "username",
+                "first_name",
+                "last_name",
+                "email",
+                "is_staff",
+                "is_active",
+                "date_joined",
+            ),
+            self.user_rows(user_ids),
+        )
+        self.run_stage(
+            Recipe,
+            ("id", "author_id", "name", "image", "text", "cooking_time", "updated_at"),
+            self.recipe_rows(user_ids, recipe_ids),
+        )
+        self.reset_sequences()
+        self.run_stage(
+            RecipeIngredientsRelated,
+            ("recipe_id", "ingredient_id", "amount"),
+            self.ingredient_rows(recipe_ids),
+        )
+        self.run_stage(
+            Subscription, ("user_id", "author_id"), self.subscription_rows(user_ids)
+        )
+        self.run_stage(
+            Favourite,
+            ("user_id", "recipe_id"),
+            self.user_recipe_rows(user_ids, recipe_ids, options["favorites_mean"]),
+        )
+        self.run_stage(
+            ShoppingList,
+            ("user_id", "recipe_id"),
+            self.user_recipe_rows(user_ids, recipe_ids, options["cart_mean"]),
+        )
+        self.rebuild_totals()
+        self.rebuild_timelines()
+        # Индексы подбора в воркерах пересоберутся при следующем запросе.
+        matcher.RecipeMatcher.bump_version()
+        self.stdout.write(
+            self.style.SUCCESS(f"Готово за {time.monotonic() - started:.1f} с")
+        )
+
+    def run_stage(self, model, fields, rows):
+        started = time.monotonic()
+        writer = RowWriter(model, fields, self.options["batch_size"], self.use_copy)
+        writer.write(rows)
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f"{model._meta.verbose_name_plural}: {writer.written} строк "
+            f"за {elapsed:.1f} с ({writer.written / max(elapsed, 1e-9):,.0f} строк/с)"
+        )
+
+    def rebuild_totals(self):
+        # Корзины писались в обход менеджера — пересчитываем суммы целиком.
+        started = time.monotonic()
+        with transaction.atomic():
+            ShoppingListTotal.objects.rebuild()
+        self.stdout.write(
+            f"{ShoppingListTotal._meta.verbose_name_plural}: пересчитаны "
+            f"за {time.monotonic() - started:.1f} с"
+        )
+
+    def rebuild_timelines(self):
+        # Подписки и рецепты писались без сигналов — ленты собираем разом.
+        started = time.monotonic()
+        with transaction.atomic():
+            feed.rebuild()
+        self.stdout.write(
+            f"{TimelineEntry._meta.verbose_name_plural}: собрана "
+            f"за {time.monotonic() - started:.1f} с"
+        )
+
+    def reset_sequences(self):
+        # Первичные ключи задавались явно — сдвигаем последовательности.
+        statements = connection.ops.sequence_reset_sql(no_style(), [User, Recipe])
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+
+    def user_rows(self, user_ids):
+        password = make_password(None)
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        for user_id in user_ids:
+            name = f"{SEED_PREFIX}{user_id}"
+            yield (
+                user_id,
+                password,
+                False,
+                name,
+                "Seed",
+                f"User{user_id}",
+                f"{name}@example.com",
+                False,
+                True,
+                now,
+            )
+
+    def recipe_rows(self, user_ids, recipe_ids):
+        rng = self.rng
+        # Авторы в случайном порядке, число рецептов у них — по Ципфу.
+        authors = list(user_ids)
+        rng.shuffle(authors)
+        cum_weights = zipf_cum_weights(len(authors), self.options["author_alpha"])
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        batch = self.options["batch_size"]
+        for start in range(0, len(recipe_ids), batch):
+            end = start + batch
+            chunk = recipe_ids[start:end]
+            for recipe_id, author_id in zip(
+                chunk, rng.choices(authors, cum_weights=cum_weights, k=len(chunk))
+            ):
+                yield (
+                    recipe_id,
+                    author_id,
+                    f"Рецепт {recipe_id}",
+                    SEED_IMAGE,
+                    f"Описание рецепта {recipe_id}.",
+                    rng.randint(5, 240),
+                    now,
+                )
+
+    def ingredient_rows(self, recipe_ids):
+        rng = self.rng
+        mean = self.options["ingredients_mean"]
+        sd = self.options["ingredients_sd"]
+        limit = len(self.ingredient_ids)
+        for recipe_id in recipe_ids:
+            count = min(limit, max(1, round(rng.gauss(mean, sd))))
+            for ingredient_id in rng.sample(self.ingredient_ids, count):
+                yield recipe_id, ingredient_id, rng.randint(1, 1000)
+
+    def subscription_rows(self, user_ids):
+        rng = self.rng
+        # Популярность авторов по Ципфу даёт «звёзд» с огромным числом подписчиков.
+        authors = list(user_ids)
+        rng.shuffle(authors)
+        cum_weights = zipf_cum_weights(len(authors), self.options["follow_alpha"])
+        mean = self.options["follows_mean"]
+        for user_id in user_ids:
+            count = min(len(authors) - 1, int(rng.expovariate(1 / mean)))
+            followed = set()
+            while len(followed) < count:
+                for author_id in rng.choices(
+                    authors, cum_weights=cum_weights, k=count - len(followed)
+                ):
+                    if author_id != user_id:
+                        followed.add(author_id)
+            for author_id in sorted(followed):
+                yield user_id, author_id
+
+    def user_recipe_rows(self, user_ids, recipe_ids, mean):
+        rng = self.rng
+        recipes = list(recipe_ids)
+        rng.shuffle(recipes)
+        cum_weights = zipf_cum_weights(len(recipes), self.options["recipe_alpha"])
+        for user_id in user_ids:
+            count = min(len(recipes), int(rng.expovariate(1 / mean)))
+            chosen = set()
+            while len(chosen) < count:
+                chosen.update(
+                    rng.choices(recipes, cum_weights=cum_weights, k=count - len(chosen))
+                )
+            for recipe_id in sorted(chosen):
+                yield user_id, recipe_id
@@ -0,0 +1,142 @@
+"""
+Подбор рецептов по имеющимся ингредиентам («что приготовить»).
+
+Индекс живёт в памяти процесса: у каждого рецепта отсортированный массив
+id ингредиентов, у каждого ингредиента — отсортированный массив id
+рецептов (инвертированный индекс). Запрос проходит только по спискам
+ингредиентов из кладовой и считает совпадения, без GROUP BY в БД.
+
+Изменения рецептов в своём процессе применяются к индексу точечно. Другие
+воркеры узнают о них по версии в кеше и пересобирают индекс при следующем
+запросе. Первый раз индекс собирается при прогреве воркера (api/warmup.py).
+"""
+
+import heapq
+import threading
+import time
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+
+from django.core.cache import cache
+
+from .models import RecipeIngredientsRelated
+
+VERSION_CACHE_KEY = "matcher:version"
+
+
+def typed_array(values=()):
+    return array("q", values)
+
+
+class RecipeMatcher:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.recipes = None  # recipe_id -> array id ингредиентов
+        self.postings = {}  # ingredient_id -> array id рецептов
+        self.version = None
+
+    def build(self):
+        recipes = {}
+        rows = (
+            RecipeIngredientsRelated.objects.order_by("recipe_id", "ingredient_id")
+            .values_list("recipe_id", "ingredient_id")
+            .iterator(chunk_size=10_000)
+        )
+        for recipe_id, ingredient_id in rows:
+            ingredients = recipes.get(recipe_id)
+            if ingredients is None:
+                ingredients = recipes[recipe_id] = typed_array()
+            ingredients.append(ingredient_id)
+        postings = {}
+        # Рецепты обходятся по возрастанию id — списки сразу отсортированы.
+        for recipe_id in sorted(recipes):
+            for ingredient_id in recipes[recipe_id]:
+                posting = postings.get(ingredient_id)
+                if posting is None:
+                    posting = postings[ingredient_id] = typed_array()
+                posting.append(recipe_id)
+        self.recipes, self.postings = recipes, postings
+
+    def ensure_fresh(self):
+        """Вызывается под блокировкой: пересборка, если индекс устарел."""
+        version = cache.get(VERSION_CACHE_KEY)
+        if version is None:
+            version = self.bump_version()
+        if self.recipes is None or version != self.version:
+            self.build()
+            self.version = version
+
+    @staticmethod
+    def bump_version():
+        try:
+            return cache.incr(VERSION_CACHE_KEY)
+        except ValueError:
+            # Начальное значение — время: версия, вытесненная из кеша, не
+            # совпадёт с версией уже собранного индекса.
+            cache.add(VERSION_CACHE_KEY, time.time_ns(), timeout=None)
+            return cache.get(VERSION_CACHE_KEY)
+
+    def load(self):
+        """Собирает индекс заранее, чтобы не строить его внутри запроса."""
+        with self.lock:
+            self.ensure_fresh()
+
+    def _remove(self, recipe_id):
+        for ingredient_id in self.recipes.pop(recipe_id, ()):
+            posting = self.postings[ingredient_id]
+            del posting[bisect_left(posting, recipe_id)]
+            if not posting:
+                del self.postings[ingredient_id]
+
+    def update(self, recipe_id):
+        """Перечитывает состав одного рецепта (нет строк — рецепт удалён)."""
+        ingredient_ids = sorted(
+            RecipeIngredientsRelated.objects.filter(recipe_id=recipe_id).values_list(
+                "ingredient_id", flat=True
+            )
+        )
+        with self.lock:
+            version = self.bump_version()
+            if self.recipes is None or version != self.version + 1:
+                # Индекс не собран или отстал от других процессов — он и так
+                # пересоберётся при следующем запросе.
+                return
+            self._remove(recipe_id)
+            if ingredient_ids:
+                self.recipes[recipe_id] = typed_array(ingredient_ids)
+                for ingredient_id in ingredient_ids:
+                    insort(
+                        self.postings.setdefault(ingredient_id, typed_array()),
+                        recipe_id,
+                    )
+            self.version = version
+
+    def match(self, pantry, limit=20, max_missing=None):
+        """
+        Рецепты, отсортированные по числу недостающих ингредиентов, затем по
+        доле имеющихся. Возвращает [(recipe_id, совпало, всего), ...].
+        """
+        with self.lock:
+            self.ensure_fresh()
+            hits = Counter()
+            for ingredient_id in set(pantry):
+                hits.update(self.postings.get(ingredient_id, ()))
+            candidates = (
+                (len(self.recipes[recipe_id]) - matched, recipe_id, matched)
+                for recipe_id, matched in hits.items()
+            )
+            if max_missing is not None:
+                candidates = (item for item in candidates if item[0] <= max_missing)
+            best = heapq.nsmallest(
+                limit,
+                candidates,
+                key=lambda item: (item[0], -item[2] / (item[0] + item[2]), -item[1]),
+            )
+        return [
+            (recipe_id, matched, missing + matched)
+            for missing, recipe_id, matched in best
+        ]
+
+
+index = RecipeMatcher()
@@ -0,0 +1,158 @@
+# Generated by Django 5.2.1 on 2026-10-19 17:18
+
+import django.core.validators
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def fill_cart_totals(apps, schema_editor):
+    """Суммы для уже существующих корзин; план питания пока пуст."""
+    RecipeIngredientsRelated = apps.get_model("recipes", "RecipeIngredientsRelated")
+    ShoppingListTotal = apps.get_model("recipes", "ShoppingListTotal")
+    rows = (
+        RecipeIngredientsRelated.objects.filter(recipe__in_shopping_carts__isnull=False)
+        .values("recipe__in_shopping_carts__user_id", "ingredient_id")
+        .annotate(total=Sum("amount"))
+        .order_by()
+    )
+    ShoppingListTotal.objects.bulk_create(
+        (
+            ShoppingListTotal(
+                user_id=row["recipe__in_shopping_carts__user_id"],
+                ingredient_id=row["ingredient_id"],
+                amount=row["total"],
+            )
+            for row in rows.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0003_shortlink"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MealPlanEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField(verbose_name="День")),
+                (
+                    "servings",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=1,
+                        help_text="Во сколько раз увеличить количества ингредиентов рецепта",
+                        max_digits=5,
+                        validators=[
+                            django.core.validators.MinValueValidator(Decimal("0.25")),
+                            django.core.validators.MaxValueValidator(Decimal("100")),
+                        ],
+                        verbose_name="Множитель порций",
+                    ),
+                ),
+                (
+                    "recipe",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="meal_plan_entries",
+                        to="recipes.recipe",
+                        verbose_name="Рецепт",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="meal_plan",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Пользователь",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "План питания",
+                "verbose_name_plural": "План питания",
+                "ordering": ["day", "id"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("user", "day", "recipe"), name="unique_meal_plan_entry"
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="ShoppingListTotal",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "day",
+                    models.DateField(blank=True, null=True, verbose_name="День плана"),
+                ),
+                (
+                    "amount",
+                    models.DecimalField(
+                        decimal_places=2, max_digits=14, verbose_name="Количество"
+                    ),
+                ),
+                (
+                    "ingredient",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="recipes.ingredient",
+                        verbose_name="Ингредиент",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="shopping_totals",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Пользователь",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Сумма ингредиента",
+                "verbose_name_plural": "Суммы ингредиентов",
+                "constraints": [
+                    models.UniqueConstraint(
+                        condition=models.Q(("day__isnull", True)),
+                        fields=("user", "ingredient"),
+                        name="unique_cart_total",
+                    ),
+                    models.UniqueConstraint(
+                        condition=models.Q(("day__isnull", False)),
+                        fields=("user", "day", "ingredient"),
+                        name="unique_meal_plan_total",
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(fill_cart_totals, migrations.RunPython.noop),
+    ]
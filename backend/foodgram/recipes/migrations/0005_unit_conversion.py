@@ -0,0 +1,116 @@
+# Generated by Django 5.2.1 on 2026-10-19 17:20
+
+import django.core.validators
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import F
+
+# Единица: (каноническая единица, сколько канонических единиц в одной).
+# Объём не переводится в массу: плотность у продуктов разная.
+CONVERSIONS = {
+    "г": ("г", "1"),
+    "кг": ("г", "1000"),
+    "мг": ("г", "0.001"),
+    "мл": ("мл", "1"),
+    "л": ("мл", "1000"),
+    "стакан": ("мл", "250"),
+    "ст. л.": ("мл", "15"),
+    "ч. л.": ("мл", "5"),
+    "капля": ("мл", "0.05"),
+    "шт.": ("шт.", "1"),
+    "шт": ("шт.", "1"),
+    "штука": ("шт.", "1"),
+}
+
+
+def load_conversions(apps, schema_editor):
+    UnitConversion = apps.get_model("recipes", "UnitConversion")
+    Ingredient = apps.get_model("recipes", "Ingredient")
+    UnitConversion.objects.bulk_create(
+        UnitConversion(unit=unit, canonical_unit=canonical, factor=Decimal(factor))
+        for unit, (canonical, factor) in CONVERSIONS.items()
+    )
+    for unit, (canonical, factor) in CONVERSIONS.items():
+        Ingredient.objects.filter(measurement_unit=unit).update(
+            canonical_unit=canonical, unit_factor=Decimal(factor)
+        )
+    Ingredient.objects.filter(canonical_unit="").update(
+        canonical_unit=F("measurement_unit")
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0004_meal_plan"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UnitConversion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "unit",
+                    models.CharField(
+                        max_length=200, unique=True, verbose_name="Единица измерения"
+                    ),
+                ),
+                (
+                    "canonical_unit",
+                    models.CharField(
+                        max_length=200, verbose_name="Каноническая единица"
+                    ),
+                ),
+                (
+                    "factor",
+                    models.DecimalField(
+                        decimal_places=6,
+                        help_text="Сколько канонических единиц в одной исходной",
+                        max_digits=14,
+                        validators=[
+                            django.core.validators.MinValueValidator(
+                                Decimal("0.000001")
+                            )
+                        ],
+                        verbose_name="Множитель",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Перевод единиц",
+                "verbose_name_plural": "Переводы единиц",
+                "ordering": ["canonical_unit", "unit"],
+            },
+        ),
+        migrations.AddField(
+            model_name="ingredient",
+            name="canonical_unit",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                max_length=200,
+                verbose_name="Каноническая единица",
+            ),
+        ),
+        migrations.AddField(
+            model_name="ingredient",
+            name="unit_factor",
+            field=models.DecimalField(
+                decimal_places=6,
+                default=1,
+                editable=False,
+                max_digits=14,
+                verbose_name="Множитель к канонической единице",
+            ),
+        ),
+        migrations.RunPython(load_conversions, migrations.RunPython.noop),
+    ]
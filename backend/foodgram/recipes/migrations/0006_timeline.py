@@ -0,0 +1,109 @@
+# Generated by Django 5.2.1 on 2026-10-19 17:22
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_timelines(apps, schema_editor):
+    """Ленты по существующим подпискам, кроме авторов-«знаменитостей»."""
+    Recipe = apps.get_model("recipes", "Recipe")
+    Subscription = apps.get_model("users", "Subscription")
+    TimelineEntry = apps.get_model("recipes", "TimelineEntry")
+    celebrities = (
+        Subscription.objects.order_by()
+        .values("author_id")
+        .annotate(followers=Count("id"))
+        .filter(followers__gt=settings.FEED_CELEBRITY_THRESHOLD)
+        .values("author_id")
+    )
+    rows = (
+        Recipe.objects.filter(author__subscribers__isnull=False)
+        .exclude(author_id__in=celebrities)
+        .values_list("author__subscribers__user_id", "id", "author_id")
+    )
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=user_id, recipe_id=recipe_id, author_id=author_id)
+            for user_id, recipe_id, author_id in rows.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0005_unit_conversion"),
+        ("users", "0002_alter_subscription_options_alter_user_options"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TimelineEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Запись ленты",
+                "verbose_name_plural": "Лента подписок",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(fields=["author", "-id"], name="recipe_author_id_idx"),
+        ),
+        migrations.AddField(
+            model_name="timelineentry",
+            name="author",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to=settings.AUTH_USER_MODEL,
+                verbose_name="Автор",
+            ),
+        ),
+        migrations.AddField(
+            model_name="timelineentry",
+            name="recipe",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="recipes.recipe",
+                verbose_name="Рецепт",
+            ),
+        ),
+        migrations.AddField(
+            model_name="timelineentry",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="timeline",
+                to=settings.AUTH_USER_MODEL,
+                verbose_name="Подписчик",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="timelineentry",
+            index=models.Index(
+                fields=["user", "author"], name="timeline_user_author_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="timelineentry",
+            constraint=models.UniqueConstraint(
+                fields=("user", "recipe"), name="unique_timeline_entry"
+            ),
+        ),
+        migrations.RunPython(fill_timelines, migrations.RunPython.noop),
+    ]
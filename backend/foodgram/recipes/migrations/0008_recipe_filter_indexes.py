@@ -0,0 +1,25 @@
+# Generated by Django 5.2.1 on 2026-10-19 17:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0007_recipe_similarity"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(fields=["cooking_time"], name="recipe_cooking_time_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="recipeingredientsrelated",
+            index=models.Index(
+                fields=["ingredient", "recipe"], name="ingredient_recipe_idx"
+            ),
+        ),
+    ]
@@ -1,5 +1,7 @@
+from decimal import Decimal
+
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import connection, models, transaction
 from users.models import User
 
 # Константы для валидации
@@ -7,6 +9,43 @@ COOKING_TIME_MIN = 1
 COOKING_TIME_MAX = 32000
 AMOUNT_MIN = 1
 AMOUNT_MAX = 32000
+SERVINGS_MIN = Decimal("0.25")
+SERVINGS_MAX = Decimal("100")
+# Остаток меньше этого считается нулём (погрешность float на SQLite).
+TOTAL_EPSILON = Decimal("0.005")
+
+
+class UnitConversionManager(models.Manager):
+    def canonical(self, unit):
+        """(каноническая единица, множитель) для единицы измерения."""
+        conversion = (
+            self.filter(unit=unit).values_list("canonical_unit", "factor").first()
+        )
+        return conversion or (unit, Decimal(1))
+
+
+class UnitConversion(models.Model):
+    """Перевод единицы измерения в каноническую: 1 кг = 1000 г."""
+
+    unit = models.CharField("Единица измерения", max_length=200, unique=True)
+    canonical_unit = models.CharField("Каноническая единица", max_length=200)
+    factor = models.DecimalField(
+        "Множитель",
+        max_digits=14,
+        decimal_places=6,
+        validators=[MinValueValidator(Decimal("0.000001"))],
+        help_text="Сколько канонических единиц в одной исходной",
+    )
+
+    objects = UnitConversionManager()
+
+    class Meta:
+        ordering = ["canonical_unit", "unit"]
+        verbose_name = "Перевод единиц"
+        verbose_name_plural = "Переводы единиц"
+
+    def __str__(self):
+        return f"1 {self.unit} = {self.factor.normalize()} {self.canonical_unit}"
 
 
 class Ingredient(models.Model):
@@ -20,6 +59,17 @@ class Ingredient(models.Model):
         max_length=200,
         help_text="Обязательно, укажите единицу измерения",
     )
+    # Денормализовано из UnitConversion, чтобы суммировать в одном запросе.
+    canonical_unit = models.CharField(
+        "Каноническая единица", max_length=200, blank=True, editable=False
+    )
+    unit_factor = models.DecimalField(
+        "Множитель к канонической единице",
+        max_digits=14,
+        decimal_places=6,
+        default=1,
+        editable=False,
+    )
 
     class Meta:
         ordering = ["name"]
@@ -34,6 +84,19 @@ class Ingredient(models.Model):
     def __str__(self):
         return f"{self.name} ({self.measurement_unit})"
 
+    def save(self, *args, **kwargs):
+        self.canonical_unit, self.unit_factor = UnitConversion.objects.canonical(
+            self.measurement_unit
+        )
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "measurement_unit" in update_fields:
+            kwargs["update_fields"] = {
+                *update_fields,
+                "canonical_unit",
+                "unit_factor",
+            }
+        super().save(*args, **kwargs)
+
 
 class Recipe(models.Model):
     name = models.CharField(
@@ -70,11 +133,19 @@ class Recipe(models.Model):
         verbose_name="Автор",
         null=True,
     )
+    # Меняется при любом изменении карточки рецепта, в том числе состава,
+    # автора и названий ингредиентов (recipes/signals.py): основа ETag.
+    updated_at = models.DateTimeField("Изменён", auto_now=True)
 
     class Meta:
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
         ordering = ["-id"]
+        indexes = [
+            # Свежие рецепты автора для ленты подписок.
+            models.Index(fields=["author", "-id"], name="recipe_author_id_idx"),
+            models.Index(fields=["cooking_time"], name="recipe_cooking_time_idx"),
+        ]
 
     def __str__(self):
         return self.name
@@ -107,6 +178,11 @@ class RecipeIngredientsRelated(models.Model):
                 fields=("recipe", "ingredient"), name="unique_recipe_ingredient"
             )
         ]
+        indexes = [
+            # Обратный порядок для фильтра «содержит все ингредиенты»:
+            # семи-джойн читает только индекс.
+            models.Index(fields=["ingredient", "recipe"], name="ingredient_recipe_idx"),
+        ]
 
     def __str__(self):
         ingredient_name = self.ingredient.name if self.ingredient else "???"
@@ -114,6 +190,138 @@ class RecipeIngredientsRelated(models.Model):
         return f"{self.amount} x {ingredient_name} для {recipe_name}"
 
 
+class UserRecipeManager(models.Manager):
+    """Добавление и удаление связи пользователь–рецепт одним SQL-запросом."""
+
+    def add(self, user_id, recipe_id):
+        """
+        Вставляет связь, если рецепт существует и связи ещё нет.
+        Возвращает True, если строка добавлена.
+        """
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        recipe_table = connection.ops.quote_name(Recipe._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} (user_id, recipe_id) "
+                f"SELECT %s, id FROM {recipe_table} WHERE id = %s "
+                "ON CONFLICT DO NOTHING RETURNING recipe_id",
+                [user_id, recipe_id],
+            )
+            return cursor.fetchone() is not None
+
+    def remove(self, user_id, recipe_id):
+        """Удаляет связь; возвращает True, если она была."""
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {table} WHERE user_id = %s AND recipe_id = %s "
+                "RETURNING recipe_id",
+                [user_id, recipe_id],
+            )
+            return cursor.fetchone() is not None
+
+    def add_many(self, user_id, recipe_ids):
+        """
+        Добавляет пачку рецептов. Возвращает {recipe_id: статус}, где статус —
+        added, exists или not_found.
+        """
+        recipe_ids = list(dict.fromkeys(recipe_ids))
+        found = set(
+            Recipe.objects.filter(id__in=recipe_ids).values_list("id", flat=True)
+        )
+        present = set(
+            self.filter(user_id=user_id, recipe_id__in=recipe_ids).values_list(
+                "recipe_id", flat=True
+            )
+        )
+        # Гонку с параллельным добавлением гасит ignore_conflicts.
+        self.bulk_create(
+            [
+                self.model(user_id=user_id, recipe_id=recipe_id)
+                for recipe_id in recipe_ids
+                if recipe_id in found and recipe_id not in present
+            ],
+            ignore_conflicts=True,
+        )
+        return {
+            recipe_id: (
+                "not_found"
+                if recipe_id not in found
+                else "exists" if recipe_id in present else "added"
+            )
+            for recipe_id in recipe_ids
+        }
+
+    def remove_many(self, user_id, recipe_ids):
+        """
+        Удаляет пачку рецептов. Возвращает {recipe_id: статус}, где статус —
+        removed, missing (не был добавлен) или not_found.
+        """
+        recipe_ids = list(dict.fromkeys(recipe_ids))
+        if not recipe_ids:
+            return {}
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        placeholders = ", ".join(["%s"] * len(recipe_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {table} WHERE user_id = %s "
+                f"AND recipe_id IN ({placeholders}) RETURNING recipe_id",
+                [user_id, *recipe_ids],
+            )
+            removed = {row[0] for row in cursor.fetchall()}
+        found = removed
+        if len(removed) < len(recipe_ids):
+            found = removed | set(
+                Recipe.objects.filter(
+                    id__in=[pk for pk in recipe_ids if pk not in removed]
+                ).values_list("id", flat=True)
+            )
+        return {
+            recipe_id: (
+                "removed"
+                if recipe_id in removed
+                else "missing" if recipe_id in found else "not_found"
+            )
+            for recipe_id in recipe_ids
+        }
+
+
+class ShoppingListManager(UserRecipeManager):
+    """Корзина: каждое изменение сразу применяется к суммам ингредиентов."""
+
+    def add(self, user_id, recipe_id):
+        with transaction.atomic():
+            added = super().add(user_id, recipe_id)
+            if added:
+                ShoppingListTotal.objects.apply(user_id, [recipe_id], 1)
+        return added
+
+    def remove(self, user_id, recipe_id):
+        with transaction.atomic():
+            removed = super().remove(user_id, recipe_id)
+            if removed:
+                ShoppingListTotal.objects.apply(user_id, [recipe_id], -1)
+        return removed
+
+    def add_many(self, user_id, recipe_ids):
+        with transaction.atomic():
+            results = super().add_many(user_id, recipe_ids)
+            ShoppingListTotal.objects.apply(
+                user_id, [pk for pk, result in results.items() if result == "added"], 1
+            )
+        return results
+
+    def remove_many(self, user_id, recipe_ids):
+        with transaction.atomic():
+            results = super().remove_many(user_id, recipe_ids)
+            ShoppingListTotal.objects.apply(
+                user_id,
+                [pk for pk, result in results.items() if result == "removed"],
+                -1,
+            )
+        return results
+
+
 class AbstractUserRecipeModel(models.Model):
     user = models.ForeignKey(
         User,
@@ -126,6 +334,8 @@ class AbstractUserRecipeModel(models.Model):
         verbose_name="Рецепт",
     )
 
+    objects = UserRecipeManager()
+
     class Meta:
         abstract = True
         constraints = [
@@ -152,6 +362,8 @@ class ShoppingList(AbstractUserRecipeModel):
         related_name="in_shopping_carts",
     )
 
+    objects = ShoppingListManager()
+
     class Meta(AbstractUserRecipeModel.Meta):
         verbose_name = "Список покупок"
         verbose_name_plural = "Списки покупок"
@@ -190,3 +402,258 @@ class Favourite(AbstractUserRecipeModel):
 
     def __str__(self):
         return f"{self.user.username} - избранное: {self.recipe.name}"
+
+
+class MealPlanEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name="Пользователь",
+        related_name="meal_plan",
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        verbose_name="Рецепт",
+        related_name="meal_plan_entries",
+    )
+    day = models.DateField("День")
+    servings = models.DecimalField(
+        "Множитель порций",
+        max_digits=5,
+        decimal_places=2,
+        default=1,
+        validators=[
+            MinValueValidator(SERVINGS_MIN),
+            MaxValueValidator(SERVINGS_MAX),
+        ],
+        help_text="Во сколько раз увеличить количества ингредиентов рецепта",
+    )
+
+    class Meta:
+        ordering = ["day", "id"]
+        verbose_name = "План питания"
+        verbose_name_plural = "План питания"
+        constraints = [
+            models.UniqueConstraint(
+                fields=("user", "day", "recipe"), name="unique_meal_plan_entry"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.day}: {self.recipe.name}"
+
+
+class ShoppingListTotalManager(models.Manager):
+    """
+    Инкрементальные суммы ингредиентов по корзине и плану питания.
+
+    Изменение корзины или плана применяется одним INSERT ... SELECT ...
+    ON CONFLICT DO UPDATE с нужным множителем, поэтому список покупок
+    читается готовым, без пересчёта по всем рецептам.
+    """
+
+    def apply(self, user_id, recipe_ids, multiplier, day=None):
+        """Прибавляет ингредиенты рецептов, умноженные на multiplier."""
+        if not recipe_ids:
+            return
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        related_table = connection.ops.quote_name(
+            RecipeIngredientsRelated._meta.db_table
+        )
+        placeholders = ", ".join(["%s"] * len(recipe_ids))
+        # Условия совпадают с частичными уникальными индексами модели.
+        target = (
+            "(user_id, ingredient_id) WHERE day IS NULL"
+            if day is None
+            else "(user_id, day, ingredient_id) WHERE day IS NOT NULL"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} (user_id, day, ingredient_id, amount) "
+                f"SELECT %s, %s, ingredient_id, SUM(amount) * %s "
+                f"FROM {related_table} WHERE recipe_id IN ({placeholders}) "
+                f"GROUP BY ingredient_id "
+                f"ON CONFLICT {target} "
+                f"DO UPDATE SET amount = {table}.amount + excluded.amount",
+                [user_id, day, multiplier, *recipe_ids],
+            )
+            if multiplier < 0:
+                cursor.execute(
+                    f"DELETE FROM {table} WHERE user_id = %s AND amount < %s",
+                    [user_id, TOTAL_EPSILON],
+                )
+
+    def rebuild(self, user_ids=None):
+        """Полный пересчёт сумм пользователей (или всех при user_ids=None)."""
+        if user_ids is not None:
+            user_ids = list(user_ids)
+            if not user_ids:
+                return
+        quote = connection.ops.quote_name
+        table = quote(self.model._meta.db_table)
+        where, params = "", []
+        if user_ids is not None:
+            where = f"WHERE user_id IN ({', '.join(['%s'] * len(user_ids))})"
+            params = user_ids
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {table} {where}", params)
+            cursor.execute(
+                f"INSERT INTO {table} (user_id, day, ingredient_id, amount) "
+                f"SELECT e.user_id, e.day, ri.ingredient_id, "
+                f"SUM(ri.amount * e.servings) "
+                f"FROM (SELECT user_id, NULL AS day, recipe_id, 1 AS servings "
+                f"FROM {quote(ShoppingList._meta.db_table)} {where} "
+                f"UNION ALL SELECT user_id, day, recipe_id, servings "
+                f"FROM {quote(MealPlanEntry._meta.db_table)} {where}) e "
+                f"JOIN {quote(RecipeIngredientsRelated._meta.db_table)} ri "
+                f"ON ri.recipe_id = e.recipe_id "
+                f"GROUP BY e.user_id, e.day, ri.ingredient_id",
+                params * 2,
+            )
+
+    def users_with_recipe(self, recipe_id):
+        """Пользователи, у которых рецепт в корзине или в плане питания."""
+        return set(
+            ShoppingList.objects.filter(recipe_id=recipe_id).values_list(
+                "user_id", flat=True
+            )
+        ) | set(
+            MealPlanEntry.objects.filter(recipe_id=recipe_id).values_list(
+                "user_id", flat=True
+            )
+        )
+
+
+class ShoppingListTotal(models.Model):
+    """Сумма ингредиента у пользователя: корзина (day пуст) или день плана."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name="Пользователь",
+        related_name="shopping_totals",
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        verbose_name="Ингредиент",
+        related_name="+",
+    )
+    day = models.DateField("День плана", null=True, blank=True)
+    amount = models.DecimalField("Количество", max_digits=14, decimal_places=2)
+
+    objects = ShoppingListTotalManager()
+
+    class Meta:
+        verbose_name = "Сумма ингредиента"
+        verbose_name_plural = "Суммы ингредиентов"
+        constraints = [
+            models.UniqueConstraint(
+                fields=("user", "ingredient"),
+                condition=models.Q(day__isnull=True),
+                name="unique_cart_total",
+            ),
+            models.UniqueConstraint(
+                fields=("user", "day", "ingredient"),
+                condition=models.Q(day__isnull=False),
+                name="unique_meal_plan_total",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.ingredient_id}: {self.amount}"
+
+
+class TimelineEntry(models.Model):
+    """
+    Строка ленты подписок: рецепт автора, на которого подписан пользователь.
+    Пишется при публикации рецепта (fan-out-on-write).
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name="Подписчик",
+        related_name="timeline",
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        verbose_name="Рецепт",
+        related_name="+",
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name="Автор",
+        related_name="+",
+    )
+
+    class Meta:
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Лента подписок"
+        constraints = [
+            # Индекс (user, recipe) обслуживает чтение ленты диапазоном.
+            models.UniqueConstraint(
+                fields=("user", "recipe"), name="unique_timeline_entry"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["user", "author"], name="timeline_user_author_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} ← {self.recipe_id}"
+
+
+class RecipeSimilarity(models.Model):
+    """Похожий рецепт из top-K соседей; считается командой compute_recommendations."""
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        verbose_name="Рецепт",
+        related_name="similar_recipes",
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        verbose_name="Похожий рецепт",
+        related_name="+",
+    )
+    score = models.FloatField("Сходство")
+
+    class Meta:
+        verbose_name = "Похожий рецепт"
+        verbose_name_plural = "Похожие рецепты"
+        constraints = [
+            models.UniqueConstraint(
+                fields=("recipe", "similar"), name="unique_recipe_similarity"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["recipe", "-score"], name="similarity_recipe_score_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.recipe_id} ~ {self.similar_id}: {self.score:.3f}"
+
+
+class ShortLink(models.Model):
+    code = models.CharField("Код", max_length=12, unique=True)
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="short_link",
+        verbose_name="Рецепт",
+    )
+
+    class Meta:
+        verbose_name = "Короткая ссылка"
+        verbose_name_plural = "Короткие ссылки"
+
+    def __str__(self):
+        return f"{self.code} → {self.recipe_id}"
@@ -0,0 +1,134 @@
+"""
+Короткие ссылки на рецепты.
+
+Код — base62 от перемешанного id рецепта: умножение на число, взаимно
+простое с 62**6, даёт биекцию, поэтому коды из 6 символов не пересекаются
+и не идут подряд. Для id от 62**6 и выше код длиннее и тоже уникален.
+Таблица ShortLink — источник истины, редирект отвечает из отдельного кеша
+"shortlinks" (CACHES в settings.py).
+"""
+
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import IntegrityError, transaction
+from django.utils.connection import ConnectionProxy
+
+from .models import Recipe, ShortLink
+
+ALPHABET = "0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
+CODE_LENGTH = 6
+MODULUS = len(ALPHABET) ** CODE_LENGTH
+MULTIPLIER = 48_271_597_003  # нечётное и не кратно 31 — взаимно просто с 62**6
+
+CODE_CACHE_KEY = "shortlink:code:{}"
+RECIPE_CACHE_KEY = "shortlink:recipe:{}"
+PRELOAD_BATCH = 1000
+
+cache = ConnectionProxy(caches, "shortlinks")
+
+
+def encode(number, length=CODE_LENGTH):
+    chars = []
+    while number:
+        number, remainder = divmod(number, len(ALPHABET))
+        chars.append(ALPHABET[remainder])
+    return "".join(reversed(chars)).rjust(length, ALPHABET[0])
+
+
+def code_for(recipe_id):
+    if recipe_id < MODULUS:
+        return encode(recipe_id * MULTIPLIER % MODULUS)
+    return encode(recipe_id, CODE_LENGTH + 1)
+
+
+def remember(code, recipe_id):
+    cache.set_many(
+        {
+            CODE_CACHE_KEY.format(code): recipe_id,
+            RECIPE_CACHE_KEY.format(recipe_id): code,
+        },
+        timeout=None,
+    )
+
+
+def capacity():
+    """
+    Сколько ссылок прогрева поместится в локальный кеш (None — кеш общий):
+    LocMemCache сверх MAX_ENTRIES вытесняет записи, и прогрев вытеснил бы
+    сам себя. Половина места остаётся ссылкам, запрошенным после прогрева.
+    """
+    local = caches["shortlinks"]
+    if isinstance(local, LocMemCache):
+        # Две записи на ссылку.
+        return local._max_entries // 4
+    return None
+
+
+def preload(limit):
+    """
+    Кладёт в кеш ссылки limit последних рецептов (None — всех), но не
+    больше capacity().
+    """
+    room = capacity()
+    if room is not None:
+        limit = room if limit is None else min(limit, room)
+    links = ShortLink.objects.order_by("-recipe_id").values_list("code", "recipe_id")
+    batch = {}
+    for code, recipe_id in links[:limit].iterator(chunk_size=PRELOAD_BATCH):
+        batch[CODE_CACHE_KEY.format(code)] = recipe_id
+        batch[RECIPE_CACHE_KEY.format(recipe_id)] = code
+        if len(batch) >= 2 * PRELOAD_BATCH:
+            cache.set_many(batch, timeout=None)
+            batch = {}
+    if batch:
+        cache.set_many(batch, timeout=None)
+
+
+def resolve(code):
+    """id рецепта по коду или None; таблицы рецептов не затрагивает."""
+    recipe_id = cache.get(CODE_CACHE_KEY.format(code))
+    if recipe_id is None:
+        recipe_id = (
+            ShortLink.objects.filter(code=code)
+            .values_list("recipe_id", flat=True)
+            .first()
+        )
+        if recipe_id is not None:
+            remember(code, recipe_id)
+    return recipe_id
+
+
+def create(recipe_id):
+    code = code_for(recipe_id)
+    try:
+        # Точка сохранения: ошибка вставки не должна обрывать внешнюю
+        # транзакцию (в PostgreSQL она после ошибки отклоняет все запросы).
+        with transaction.atomic():
+            ShortLink.objects.create(code=code, recipe_id=recipe_id)
+    except IntegrityError:
+        pass
+    remember(code, recipe_id)
+    return code
+
+
+def get_code(recipe_id):
+    """Код рецепта (создаётся при необходимости) или None, если рецепта нет."""
+    code = cache.get(RECIPE_CACHE_KEY.format(recipe_id))
+    if code is not None:
+        return code
+    code = (
+        ShortLink.objects.filter(recipe_id=recipe_id)
+        .values_list("code", flat=True)
+        .first()
+    )
+    if code is not None:
+        remember(code, recipe_id)
+        return code
+    if not Recipe.objects.filter(pk=recipe_id).exists():
+        return None
+    return create(recipe_id)
+
+
+def forget(recipe_id):
+    code = cache.get(RECIPE_CACHE_KEY.format(recipe_id)) or code_for(recipe_id)
+    cache.delete_many([CODE_CACHE_KEY.format(code), RECIPE_CACHE_KEY.format(recipe_id)])
@@ -0,0 +1,207 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+from users.models import Subscription
+
+from . import feed, matcher, shortlinks
+from .models import (
+    Ingredient,
+    MealPlanEntry,
+    Recipe,
+    ShoppingList,
+    ShoppingListTotal,
+    UnitConversion,
+)
+
+User = get_user_model()
+
+# Состав рецепта заменён целиком; аргумент recipe_id.
+recipe_ingredients_changed = Signal()
+
+# Поля автора в карточке рецепта.
+AUTHOR_CARD_FIELDS = {"email", "username", "first_name", "last_name", "avatar"}
+
+
+def is_direct_delete(sender, origin):
+    """Удаление начато с самой модели, а не каскадом от рецепта/пользователя."""
+    return getattr(origin, "model", type(origin)) is sender
+
+
+@receiver(post_save, sender=Recipe)
+def create_short_link(sender, instance, created, **kwargs):
+    if created:
+        shortlinks.create(instance.id)
+
+
+@receiver(post_delete, sender=Recipe)
+def forget_short_link(sender, instance, **kwargs):
+    shortlinks.forget(instance.id)
+
+
+# --- Дата изменения рецепта ---
+# Карточка меняется и без сохранения самого рецепта.
+
+
+def touch_recipes(recipes):
+    recipes.update(updated_at=timezone.now())
+
+
+@receiver(recipe_ingredients_changed)
+def touch_recipe_ingredients(sender, recipe_id, **kwargs):
+    touch_recipes(Recipe.objects.filter(pk=recipe_id))
+
+
+@receiver(post_save, sender=User)
+def touch_author_recipes(sender, instance, created, update_fields=None, **kwargs):
+    if (
+        created
+        or update_fields is not None
+        and not (AUTHOR_CARD_FIELDS & set(update_fields))
+    ):
+        return
+    touch_recipes(Recipe.objects.filter(author=instance))
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Ingredient)
+def touch_ingredient_recipes(sender, instance, created=False, **kwargs):
+    if not created:
+        touch_recipes(
+            Recipe.objects.filter(
+                id__in=instance.ingredient_recipes.values("recipe_id")
+            )
+        )
+
+
+# --- Лента подписок ---
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_recipe(sender, instance, created, **kwargs):
+    if created:
+        feed.fan_out(instance.id, instance.author_id)
+
+
+@receiver(post_save, sender=Subscription)
+def backfill_timeline(sender, instance, created, **kwargs):
+    if created:
+        feed.subscribed(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Subscription)
+def clear_timeline(sender, instance, origin=None, **kwargs):
+    if is_direct_delete(sender, origin):
+        feed.unsubscribed(instance.user_id, instance.author_id)
+
+
+# --- Суммы ингредиентов для списка покупок ---
+# Менеджер корзины применяет изменения сам; сигналы ловят админку и ORM.
+
+
+@receiver(post_save, sender=ShoppingList)
+def add_cart_totals(sender, instance, created, **kwargs):
+    if created:
+        ShoppingListTotal.objects.apply(instance.user_id, [instance.recipe_id], 1)
+
+
+@receiver(post_delete, sender=ShoppingList)
+def remove_cart_totals(sender, instance, origin=None, **kwargs):
+    if is_direct_delete(sender, origin):
+        ShoppingListTotal.objects.apply(instance.user_id, [instance.recipe_id], -1)
+
+
+@receiver(pre_save, sender=MealPlanEntry)
+def remember_meal_plan_entry(sender, instance, **kwargs):
+    instance._previous = (
+        sender.objects.filter(pk=instance.pk)
+        .values("user_id", "recipe_id", "day", "servings")
+        .first()
+        if instance.pk
+        else None
+    )
+
+
+@receiver(post_save, sender=MealPlanEntry)
+def apply_meal_plan_totals(sender, instance, **kwargs):
+    previous = getattr(instance, "_previous", None)
+    if previous is not None:
+        ShoppingListTotal.objects.apply(
+            previous["user_id"],
+            [previous["recipe_id"]],
+            -previous["servings"],
+            previous["day"],
+        )
+    ShoppingListTotal.objects.apply(
+        instance.user_id, [instance.recipe_id], instance.servings, instance.day
+    )
+
+
+@receiver(post_delete, sender=MealPlanEntry)
+def remove_meal_plan_totals(sender, instance, origin=None, **kwargs):
+    if is_direct_delete(sender, origin):
+        ShoppingListTotal.objects.apply(
+            instance.user_id, [instance.recipe_id], -instance.servings, instance.day
+        )
+
+
+@receiver(pre_delete, sender=Recipe)
+def remember_recipe_users(sender, instance, **kwargs):
+    instance._total_users = ShoppingListTotal.objects.users_with_recipe(instance.id)
+
+
+@receiver(post_delete, sender=Recipe)
+def rebuild_recipe_users_totals(sender, instance, **kwargs):
+    # К этому моменту каскад уже удалил строки корзин и плана с рецептом.
+    ShoppingListTotal.objects.rebuild(getattr(instance, "_total_users", ()))
+
+
+@receiver(recipe_ingredients_changed)
+def rebuild_totals_for_recipe(sender, recipe_id, **kwargs):
+    ShoppingListTotal.objects.rebuild(
+        ShoppingListTotal.objects.users_with_recipe(recipe_id)
+    )
+
+
+# --- Индекс подбора по ингредиентам ---
+
+
+@receiver(recipe_ingredients_changed)
+def update_matcher(sender, recipe_id, **kwargs):
+    matcher.index.update(recipe_id)
+
+
+@receiver(post_delete, sender=Recipe)
+def drop_from_matcher(sender, instance, **kwargs):
+    matcher.index.update(instance.id)
+
+
+# --- Канонические единицы ингредиентов ---
+
+
+def refresh_ingredient_units(*units):
+    for unit in set(units):
+        canonical_unit, unit_factor = UnitConversion.objects.canonical(unit)
+        Ingredient.objects.filter(measurement_unit=unit).update(
+            canonical_unit=canonical_unit, unit_factor=unit_factor
+        )
+
+
+@receiver(pre_save, sender=UnitConversion)
+def remember_conversion_unit(sender, instance, **kwargs):
+    instance._previous_unit = (
+        sender.objects.filter(pk=instance.pk).values_list("unit", flat=True).first()
+        if instance.pk
+        else None
+    )
+
+
+@receiver(post_save, sender=UnitConversion)
+def apply_unit_conversion(sender, instance, **kwargs):
+    previous = getattr(instance, "_previous_unit", None)
+    refresh_ingredient_units(instance.unit, *([previous] if previous else []))
+
+
+@receiver(post_delete, sender=UnitConversion)
+def drop_unit_conversion(sender, instance, **kwargs):
+    refresh_ingredient_units(instance.unit)
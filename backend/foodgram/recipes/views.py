@@ -1,8 +1,18 @@
+from django.http import Http404, HttpResponseRedirect
 from django.shortcuts import render
 from recipes.models import Recipe
 
+from . import shortlinks
+
 
 def recipe_list(request):
     recipes = Recipe.objects.all()
     context = {"recipes": recipes}
     return render(request, "recipes/recipe_list.html", context)
+
+
+def short_link_redirect(request, code):
+    recipe_id = shortlinks.resolve(code)
+    if recipe_id is None:
+        raise Http404("Короткая ссылка не найдена")
+    return HttpResponseRedirect(f"/recipes/{recipe_id}/")